@@ -4,8 +4,17 @@ from platformdirs import user_cache_dir
 
 from anime_rpc import __author__
 
-__all__: tuple[str, ...] = ("BASE_CACHE_DIR", "METADATA_CACHE_DIR")
+__all__: tuple[str, ...] = (
+    "APPLICATION_IDS_PATH",
+    "BASE_CACHE_DIR",
+    "FFI_CACHE_DIR",
+    "MEDIA_INFO_CACHE_PATH",
+    "METADATA_CACHE_DIR",
+)
 
 BASE_CACHE_DIR = Path(user_cache_dir("anime_rpc", __author__))
 METADATA_CACHE_DIR = BASE_CACHE_DIR / "metadata"
 METADATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+MEDIA_INFO_CACHE_PATH = BASE_CACHE_DIR / "media_info.json"
+FFI_CACHE_DIR = BASE_CACHE_DIR / "ffi"
+APPLICATION_IDS_PATH = BASE_CACHE_DIR / "application_ids.json"
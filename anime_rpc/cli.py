@@ -1,12 +1,33 @@
 import argparse
 import logging
 import shlex
+from pathlib import Path
 
 from anime_rpc import __version__
+from anime_rpc.discord_client import BACKENDS, BackendName
 from anime_rpc.pollers import BasePoller
 
 _LOGGER = logging.getLogger("cli")
 _MINIMUM_INTERVAL = 5
+_MINIMUM_POLL_INTERVAL = 0.1
+
+
+def _parse_rate_limit(value: str) -> tuple[int, float] | None:
+    if value.lower() in ("0", "off", "none"):
+        return None
+
+    try:
+        updates, _, seconds = value.partition("/")
+        burst, period = int(updates), float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected UPDATES/SECONDS (e.g., 5/20) or off, got {value!r}"
+        ) from None
+
+    if burst < 1 or period <= 0:
+        raise argparse.ArgumentTypeError("the rate limit must be positive")
+
+    return burst, period
 
 
 class CLIArgs(argparse.Namespace):
@@ -15,9 +36,21 @@ class CLIArgs(argparse.Namespace):
     pollers: list[BasePoller]
     fetch_episode_titles: bool
     interval: int
+    poll_interval: float
     periodic_forced_updates: bool
     use_oauth2: bool
     verbose: bool
+    observe: bool
+    trace: Path | None
+    record: Path | None
+    replay: Path | None
+    replay_fast: bool
+    discord_backend: BackendName
+    discord_pool_size: int
+    rate_limit: tuple[int, float] | None
+    clear_hold_down: int
+    seek_settle: int
+    watch_debounce: int
 
 
 _parser = argparse.ArgumentParser(
@@ -79,6 +112,16 @@ _parser.add_argument(
     default=[],
     type=parse_poller,
 )
+_parser.add_argument(
+    "--observe",
+    action="store_true",
+    help=(
+        "let pollers that support it push changes as they happen "
+        "instead of polling every second; supported by: "
+        f"{', '.join(k for k, v in POLLERS.items() if v.supports_observe)}"
+    ),
+    default=False,
+)
 _parser.add_argument(
     "--fetch-episode-titles",
     action="store_true",
@@ -100,6 +143,98 @@ _parser.add_argument(
     "if both are running at the same time",
     default=0,
 )
+_parser.add_argument(
+    "--poll-interval",
+    type=float,
+    help="specify how often (in seconds) pollers check the player during playback; "
+    "pollers speed up briefly after a change (e.g., seeking) "
+    "and back off while the player isn't running; defaults to 1",
+    default=1.0,
+)
+_parser.add_argument(
+    "--trace",
+    type=Path,
+    metavar="FILE",
+    help="write a span per pipeline stage of every state to FILE "
+    "in the Chrome trace-event format (open it in chrome://tracing or Perfetto)",
+    default=None,
+)
+_parser.add_argument(
+    "--record",
+    type=Path,
+    metavar="FILE",
+    help="append every state sent to the presence pipeline to FILE, "
+    "which can be fed back with --replay",
+    default=None,
+)
+_parser.add_argument(
+    "--replay",
+    type=Path,
+    metavar="FILE",
+    help="feed the states recorded with --record back into the presence pipeline "
+    "at their original pace",
+    default=None,
+)
+_parser.add_argument(
+    "--replay-fast",
+    action="store_true",
+    help="replay as fast as the presence pipeline can consume the states",
+    default=False,
+)
+_parser.add_argument(
+    "--discord-backend",
+    choices=BACKENDS,
+    help="send the presence through the Discord Social SDK (default), "
+    "or to an in-process loopback that only logs and acknowledges updates, "
+    "useful for testing and benchmarking without Discord",
+    default="sdk",
+)
+_parser.add_argument(
+    "--discord-pool-size",
+    type=int,
+    metavar="N",
+    help="keep a Discord client connected for each of the last N application IDs, "
+    "so that switching between, e.g., a local file and a browser tab with "
+    "different IDs doesn't reconnect and reauthorise; e.g., 3; "
+    "defaults to 1, a single client",
+    default=1,
+)
+_parser.add_argument(
+    "--rate-limit",
+    type=_parse_rate_limit,
+    metavar="UPDATES/SECONDS",
+    help="allow at most UPDATES presence updates every SECONDS, "
+    "holding back all but the latest update in between, "
+    "e.g., 5/20 for Discord's own limit; off by default",
+    default=None,
+)
+_parser.add_argument(
+    "--clear-hold-down",
+    type=int,
+    metavar="MS",
+    help="wait this many milliseconds before clearing the presence when "
+    "the player briefly reports nothing, e.g., between episodes; "
+    "stopping playback still clears right away; 0 disables it; defaults to 1500",
+    default=1_500,
+)
+_parser.add_argument(
+    "--seek-settle",
+    type=int,
+    metavar="MS",
+    help="when scrubbing through a video, update the presence once the "
+    "position has stayed put for this many milliseconds instead of on "
+    "every jump; a single seek is still shown right away; defaults to 1000",
+    default=1_000,
+)
+_parser.add_argument(
+    "--watch-debounce",
+    type=int,
+    metavar="MS",
+    help="reload watched files (e.g., .rpc) once they haven't changed for "
+    "this many milliseconds, so that editors saving in several writes only "
+    "trigger one reload; defaults to 100",
+    default=100,
+)
 _parser.add_argument(
     "--verbose",
     "-V",
@@ -109,12 +244,26 @@ _parser.add_argument(
 )
 CLI_ARGS, _unknown_args = _parser.parse_known_args(namespace=CLIArgs)
 CLI_ARGS.periodic_forced_updates = CLI_ARGS.interval >= _MINIMUM_INTERVAL
+_requested_poll_interval = CLI_ARGS.poll_interval
+CLI_ARGS.poll_interval = max(CLI_ARGS.poll_interval, _MINIMUM_POLL_INTERVAL)
+
+for _poller in CLI_ARGS.pollers:
+    _poller.observing = CLI_ARGS.observe and _poller.supports_observe
 
 
 def print_cli_args() -> None:
     _LOGGER.info("Starting anime_rpc ver: %s", __version__)
     _LOGGER.info("Using OAuth2: %s", CLI_ARGS.use_oauth2)
+    _LOGGER.info("Discord backend: %s", CLI_ARGS.discord_backend)
+    _LOGGER.info("Discord client pool size: %d", CLI_ARGS.discord_pool_size)
+    if CLI_ARGS.rate_limit:
+        _LOGGER.info("Presence rate limit: %d updates per %gs", *CLI_ARGS.rate_limit)
+    else:
+        _LOGGER.info("Presence rate limit: off")
     _LOGGER.info("Clear presence on pause: %s", CLI_ARGS.clear_on_pause)
+    _LOGGER.info("Clear hold-down: %dms", CLI_ARGS.clear_hold_down)
+    _LOGGER.info("Seek settle time: %dms", CLI_ARGS.seek_settle)
+    _LOGGER.info("File watch debounce: %dms", CLI_ARGS.watch_debounce)
     _LOGGER.info(
         "Pollers used: %s",
         ", ".join(
@@ -123,16 +272,40 @@ def print_cli_args() -> None:
         )
         or "none",
     )
+    _LOGGER.info("Observe player changes: %s", CLI_ARGS.observe)
     _LOGGER.info(
         "Webserver: %s",
         (CLI_ARGS.enable_webserver and "enabled") or "disabled",
     )
     _LOGGER.info("Fetch missing episode titles: %s", CLI_ARGS.fetch_episode_titles)
     _LOGGER.info("Update interval: %ds", CLI_ARGS.interval)
+    _LOGGER.info("Poll interval: %.2fs", CLI_ARGS.poll_interval)
     _LOGGER.info("Verbose logging: %s", CLI_ARGS.verbose)
+    _LOGGER.info("Trace file: %s", CLI_ARGS.trace or "none")
+    _LOGGER.info("Record states to: %s", CLI_ARGS.record or "none")
+    _LOGGER.info(
+        "Replay states from: %s%s",
+        CLI_ARGS.replay or "none",
+        " (as fast as possible)"
+        * (CLI_ARGS.replay is not None and CLI_ARGS.replay_fast),
+    )
 
     if 0 < CLI_ARGS.interval < _MINIMUM_INTERVAL:
         _LOGGER.warning("Interval is set too low (<%d), ignoring...", _MINIMUM_INTERVAL)
 
+    if _requested_poll_interval < _MINIMUM_POLL_INTERVAL:
+        _LOGGER.warning(
+            "Poll interval is set too low (<%.1f), clamping...",
+            _MINIMUM_POLL_INTERVAL,
+        )
+
+    if CLI_ARGS.observe and (
+        unsupported := [p.origin() for p in CLI_ARGS.pollers if not p.observing]
+    ):
+        _LOGGER.warning(
+            "Observing isn't supported by %s, polling instead...",
+            ", ".join(unsupported),
+        )
+
     if _unknown_args:
         _LOGGER.warning("Unknown arguments: %s", shlex.join(_unknown_args))
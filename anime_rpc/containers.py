@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import os
+import struct
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO
+
+# reads are bounded so that we never pull in more than a few KiB,
+# titles live in the container headers anyway
+MAX_READ = 64 * 1024
+MAX_STRING = 4 * 1024
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+MKV_SEGMENT = 0x18538067
+MKV_SEEK_HEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_INFO = 0x1549A966
+MKV_TITLE = 0x7BA9
+MKV_CLUSTER = 0x1F43B675
+UNKNOWN_SIZE = -1
+
+MP4_NAME = b"\xa9nam"
+_ATOM_HEADER = struct.Struct(">I4s")
+_LARGE_SIZE = struct.Struct(">Q")
+
+
+class ContainerError(ValueError):
+    """The container isn't supported or is malformed."""
+
+
+# Matroska
+
+
+def _read_vint(buf: bytes, pos: int, *, keep_marker: bool) -> tuple[int, int]:
+    if pos >= len(buf):
+        raise ContainerError("Truncated EBML variable-size integer")
+
+    if not (first := buf[pos]):
+        raise ContainerError("Invalid EBML variable-size integer")
+
+    length = 9 - first.bit_length()
+    if pos + length > len(buf):
+        raise ContainerError("Truncated EBML variable-size integer")
+
+    value = int.from_bytes(buf[pos : pos + length], "big")
+    if keep_marker:
+        return value, pos + length
+
+    mask = (1 << (7 * length)) - 1
+    value &= mask
+    return (UNKNOWN_SIZE if value == mask else value), pos + length
+
+
+def _iter_elements(
+    buf: bytes, pos: int, end: int
+) -> Iterator[tuple[int, int, int, int]]:
+    """Yield (id, header offset, data offset, data end) of each element."""
+    end = min(end, len(buf))
+    while pos < end:
+        header = pos
+        id_, pos = _read_vint(buf, pos, keep_marker=True)
+        size, pos = _read_vint(buf, pos, keep_marker=False)
+        data_end = end if size == UNKNOWN_SIZE else pos + size
+        yield id_, header, pos, data_end
+        pos = data_end
+
+
+def _find_info_position(buf: bytes, start: int, end: int) -> int | None:
+    for id_, _, seek_start, seek_end in _iter_elements(buf, start, end):
+        if id_ != MKV_SEEK:
+            continue
+
+        seek_id = position = None
+        for child, _, child_start, child_end in _iter_elements(
+            buf, seek_start, seek_end
+        ):
+            if child == MKV_SEEK_ID:
+                seek_id = int.from_bytes(buf[child_start:child_end], "big")
+            elif child == MKV_SEEK_POSITION:
+                position = int.from_bytes(buf[child_start:child_end], "big")
+
+        if seek_id == MKV_INFO:
+            return position
+
+    return None
+
+
+def _read_info_title(f: BinaryIO, offset: int) -> str:
+    f.seek(offset)
+    buf = f.read(MAX_READ)
+    id_, _, start, end = next(_iter_elements(buf, 0, len(buf)), (None, 0, 0, 0))
+    if id_ != MKV_INFO:
+        raise ContainerError("Seek head doesn't point to the segment info")
+
+    for child, _, child_start, child_end in _iter_elements(buf, start, end):
+        if child == MKV_TITLE:
+            return buf[child_start:child_end].decode("utf-8", "replace").strip()
+
+    return ""
+
+
+def read_matroska_title(f: BinaryIO) -> str:
+    buf = f.read(MAX_READ)
+    if not buf.startswith(EBML_MAGIC):
+        raise ContainerError("Not a Matroska file")
+
+    segment_start = None
+    for id_, _, start, _ in _iter_elements(buf, 0, len(buf)):
+        if id_ == MKV_SEGMENT:
+            segment_start = start
+            break
+
+    if segment_start is None:
+        raise ContainerError("Missing Matroska segment")
+
+    info_position = None
+    try:
+        for id_, header, start, end in _iter_elements(buf, segment_start, len(buf)):
+            if id_ == MKV_INFO:
+                return _read_info_title(f, header)
+            if id_ == MKV_SEEK_HEAD:
+                info_position = _find_info_position(buf, start, end)
+            elif id_ == MKV_CLUSTER:
+                break
+    except ContainerError:
+        # ran past the end of what we've read
+        pass
+
+    if info_position is None:
+        raise ContainerError("Missing Matroska segment info")
+
+    return _read_info_title(f, segment_start + info_position)
+
+
+# MP4/QuickTime
+
+
+def _iter_atoms(f: BinaryIO, pos: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Yield (type, data offset, data end) of each atom."""
+    while pos + _ATOM_HEADER.size <= end:
+        f.seek(pos)
+        header = f.read(_ATOM_HEADER.size)
+        if len(header) < _ATOM_HEADER.size:
+            return
+
+        size, type_ = _ATOM_HEADER.unpack(header)
+        header_size = _ATOM_HEADER.size
+        if size == 1:
+            if len(large := f.read(_LARGE_SIZE.size)) < _LARGE_SIZE.size:
+                raise ContainerError(f"Truncated atom {type_!r}")
+            (size,) = _LARGE_SIZE.unpack(large)
+            header_size += _LARGE_SIZE.size
+        elif size == 0:
+            size = end - pos
+
+        if size < header_size:
+            raise ContainerError(f"Invalid size for atom {type_!r}")
+
+        yield type_, pos + header_size, min(pos + size, end)
+        pos += size
+
+
+def _find_atom(
+    f: BinaryIO, start: int, end: int, type_: bytes
+) -> tuple[int, int] | None:
+    for t, data_start, data_end in _iter_atoms(f, start, end):
+        if t == type_:
+            return data_start, data_end
+
+    return None
+
+
+def _read_string(f: BinaryIO, start: int, end: int) -> str:
+    f.seek(start)
+    return f.read(min(end - start, MAX_STRING)).decode("utf-8", "replace").strip()
+
+
+def _read_ilst_title(f: BinaryIO, start: int, end: int) -> str:
+    # ISO meta is a full box (version + flags), QuickTime's isn't
+    f.seek(start)
+    peek = f.read(8)
+    if len(peek) == 8 and peek[4:8] != b"hdlr":
+        start += 4
+
+    if not (ilst := _find_atom(f, start, end, b"ilst")):
+        return ""
+
+    if not (name := _find_atom(f, *ilst, MP4_NAME)):
+        return ""
+
+    if not (data := _find_atom(f, *name, b"data")):
+        return ""
+
+    # skip the type indicator and the locale
+    return _read_string(f, data[0] + 8, data[1])
+
+
+def read_mp4_title(f: BinaryIO) -> str:
+    f.seek(0)
+    head = f.read(_ATOM_HEADER.size)
+    if head[4:8] != b"ftyp":
+        raise ContainerError("Not an MP4 file")
+
+    # moov may come after mdat, but we only ever read atom headers
+    size = os.fstat(f.fileno()).st_size
+    if not (moov := _find_atom(f, 0, size, b"moov")):
+        raise ContainerError("Missing moov atom")
+
+    if not (udta := _find_atom(f, *moov, b"udta")):
+        return ""
+
+    for type_, start, end in _iter_atoms(f, *udta):
+        if type_ == MP4_NAME:
+            # QuickTime-style: 16-bit length and language code, then the text
+            return _read_string(f, start + 4, end)
+
+        if type_ == b"meta" and (title := _read_ilst_title(f, start, end)):
+            return title
+
+    return ""
+
+
+def read_title(path: Path) -> str:
+    """Read the container title of a Matroska or MP4 file.
+
+    Raises ContainerError for anything else.
+    """
+    with path.open("rb") as f:
+        magic = f.read(8)
+        f.seek(0)
+
+        if magic.startswith(EBML_MAGIC):
+            return read_matroska_title(f)
+
+        if magic[4:8] == b"ftyp":
+            return read_mp4_title(f)
+
+    raise ContainerError("Unsupported container")
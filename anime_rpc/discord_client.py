@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from asyncio import Future
+from typing import Any, Literal
+
+DEFAULT_ANIME_APPLICATION_ID = 1088900742523392133
+GENERIC_STREAM_APPLICATION_ID = 1337621628179316848
+
+# can't make my mind up on the naming
+# so allow for aliases
+APPLICATION_ID_REPLACE_MAP: dict[str, int] = {
+    "default": DEFAULT_ANIME_APPLICATION_ID,
+    "anime": DEFAULT_ANIME_APPLICATION_ID,
+    "stream": GENERIC_STREAM_APPLICATION_ID,
+    "generic": GENERIC_STREAM_APPLICATION_ID,
+}
+MAX_BUTTONS = 2
+
+BackendName = Literal["sdk", "loopback"]
+BACKENDS: tuple[BackendName, ...] = ("sdk", "loopback")
+
+
+def resolve_application_id(application_id: int | str) -> int:
+    try:
+        return int(
+            APPLICATION_ID_REPLACE_MAP.get(str(application_id).lower(), application_id)
+        )
+    except (ValueError, TypeError):
+        return DEFAULT_ANIME_APPLICATION_ID
+
+
+class DiscordClient(ABC):
+    """What the presence needs from a Discord backend.
+
+    `set_activity` resolves the given future with whether Discord accepted
+    the activity, from whichever thread the backend runs its callbacks on.
+    """
+
+    current_activity: dict[str, Any]
+
+    @abstractmethod
+    def start(self) -> None: ...
+
+    @abstractmethod
+    def stop(self) -> None: ...
+
+    @abstractmethod
+    def set_application_id(self, application_id: int | str) -> None: ...
+
+    @abstractmethod
+    def set_activity(
+        self,
+        state: str,
+        details: str,
+        state_url: str = "",
+        details_url: str = "",
+        type_: int = 0,
+        small_text: str = "",
+        small_image: str = "",
+        small_url: str = "",
+        large_text: str = "",
+        large_image: str = "",
+        large_url: str = "",
+        buttons: list[dict[str, str]] | None = None,
+        start: int = 0,
+        end: int = 0,
+        status_display_type: int = 0,
+        *,
+        future: Future[bool] | None = None,
+    ) -> Future[bool] | None: ...
+
+    @abstractmethod
+    def clear_activity(self) -> None: ...
+
+    def dump_logs(self) -> None:
+        """Log whatever the backend has been holding back, if anything."""
+
+
+def get_client(backend: BackendName = "sdk", *, pool_size: int = 1) -> DiscordClient:
+    # imported lazily, the SDK needs the proprietary library
+    if backend == "loopback":
+        from anime_rpc.loopback import LoopbackClient
+
+        return LoopbackClient()
+
+    if pool_size > 1:
+        from anime_rpc.social_sdk import DiscordPool
+
+        return DiscordPool(pool_size)
+
+    from anime_rpc.social_sdk import Discord
+
+    return Discord()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import TYPE_CHECKING, TypeVar
+
+from anime_rpc.states import State
+from anime_rpc.tracing import TRACER
+
+if TYPE_CHECKING:
+    from anime_rpc.mailbox import Mailbox
+    from anime_rpc.metadata_providers import BaseMetadataProvider
+
+_LOGGER = logging.getLogger("enrichment")
+
+METADATA_FIELDS = ("title", "image_url")
+# how long each provider call may take before it's abandoned
+STAGE_TIMEOUT = 15.0
+# cached metadata usually resolves within this, which saves publishing
+# the presence twice in a row
+INLINE_GRACE = 0.1
+# how long to wait before retrying a provider that failed or timed out
+RETRY_AFTER = 60.0
+# fetched metadata kept around, by url and by (url, episode)
+MAX_CACHED_METADATA = 64
+MAX_CACHED_EPISODE_TITLES = 512
+
+EnrichmentKey = tuple[str, str]
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def _lookup(cache: OrderedDict[K, V], key: K) -> V | None:
+    if (value := cache.get(key)) is not None:
+        cache.move_to_end(key)
+
+    return value
+
+
+def _remember(cache: OrderedDict[K, V], key: K, value: V, max_entries: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+
+
+class MetadataEnricher:
+    """Fills scraped metadata into states without blocking the presence.
+
+    Missing fields are fetched in the background, one task per (url, episode).
+    Once the results arrive, the origin's latest state is re-delivered through
+    the mailbox so that the consumer publishes a follow-up update. Providers
+    keep per-query state, so each one only gets one call at a time.
+    """
+
+    def __init__(
+        self,
+        providers: dict[str, BaseMetadataProvider],
+        mailbox: Mailbox,
+        *,
+        fetch_episode_titles: bool,
+        stage_timeout: float = STAGE_TIMEOUT,
+        inline_grace: float = INLINE_GRACE,
+    ) -> None:
+        self._providers = providers
+        self._mailbox = mailbox
+        self._fetch_episode_titles = fetch_episode_titles
+        self._stage_timeout = stage_timeout
+        self._inline_grace = inline_grace
+        # least recently used first
+        self._metadata: OrderedDict[str, dict[str, str]] = OrderedDict()
+        self._episode_titles: OrderedDict[EnrichmentKey, str] = OrderedDict()
+        self._tasks: dict[EnrichmentKey, asyncio.Task[None]] = {}
+        self._failed_at: dict[EnrichmentKey, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        # provider calls that timed out but are left to finish
+        self._stragglers: set[asyncio.Future[State]] = set()
+
+    def _get_provider(self, url: str) -> BaseMetadataProvider | None:
+        for provider in self._providers.values():
+            # the naming may be unclear but this checks if the provider can
+            # handle the url
+            if provider.extract_id(url):
+                return provider
+
+        return None
+
+    def apply(self, state: State) -> State:
+        """Return a copy of `state` with everything fetched so far filled in."""
+        url = state.get("url", "")
+        metadata = _lookup(self._metadata, url) or {}
+        episode_title = _lookup(
+            self._episode_titles, (url, str(state.get("episode", "")))
+        )
+
+        if not (metadata or episode_title):
+            return state
+
+        state = State({**state})
+        for m in METADATA_FIELDS:
+            if not state.get(m) and (value := metadata.get(m)):
+                state[m] = value
+
+        if state.get("episode_title") is None and episode_title:
+            state["episode_title"] = episode_title
+
+        return state
+
+    def _needs(self, state: State, key: EnrichmentKey) -> tuple[bool, bool]:
+        url, episode = key
+        needs_metadata = url not in self._metadata and any(
+            not state.get(m) for m in METADATA_FIELDS
+        )
+        needs_episode_title = (
+            self._fetch_episode_titles
+            and bool(episode)
+            and state.get("episode_title") is None
+            and key not in self._episode_titles
+        )
+        return needs_metadata, needs_episode_title
+
+    async def enrich(self, state: State) -> State:
+        """Fill in what's known and fetch the rest in the background."""
+        if not (url := state.get("url", "")):
+            return state
+
+        if not (provider := self._get_provider(url)):
+            return state
+
+        state = self.apply(state)
+        key = url, str(state.get("episode", ""))
+        needs_metadata, needs_episode_title = self._needs(state, key)
+
+        if not (needs_metadata or needs_episode_title):
+            return state
+
+        if (task := self._tasks.get(key)) is None:
+            failed_at = self._failed_at.get(key)
+            if failed_at is not None and perf_counter() - failed_at < RETRY_AFTER:
+                return state
+
+            task = self._tasks[key] = asyncio.create_task(
+                self._fetch(
+                    provider,
+                    State({**state}),
+                    key,
+                    fetch_metadata=needs_metadata,
+                    fetch_episode_title=needs_episode_title,
+                ),
+                name=f"enrich-{key[0]}-{key[1]}",
+            )
+
+        # unlike wait_for, this leaves the fetch running past the grace period
+        _, pending = await asyncio.wait({task}, timeout=self._inline_grace)
+        if pending:
+            _LOGGER.debug("Publishing %s before its metadata is ready", url)
+            return state
+
+        return self.apply(state)
+
+    async def _call(
+        self, provider: BaseMetadataProvider, call: Callable[[], Awaitable[State]]
+    ) -> State:
+        """Make a provider call, once the provider's previous call is done."""
+        lock = self._locks.setdefault(provider.name, asyncio.Lock())
+        await lock.acquire()
+        task = asyncio.ensure_future(call())
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(task), timeout=self._stage_timeout
+            )
+        except asyncio.TimeoutError:
+            # interrupting it could leave the provider's subscription half set
+            # up, so the next call waits for this one to finish instead
+            self._stragglers.add(task)
+            task.add_done_callback(lambda _: self._release(task, lock))
+            raise
+        except BaseException:
+            task.cancel()
+            raise
+        finally:
+            if task not in self._stragglers:
+                lock.release()
+
+    def _release(self, task: asyncio.Future[State], lock: asyncio.Lock) -> None:
+        self._stragglers.discard(task)
+        lock.release()
+        if not task.cancelled() and (e := task.exception()):
+            _LOGGER.debug("Timed out provider call failed: %s", e)
+
+    async def _fetch(
+        self,
+        provider: BaseMetadataProvider,
+        state: State,
+        key: EnrichmentKey,
+        *,
+        fetch_metadata: bool,
+        fetch_episode_title: bool,
+    ) -> None:
+        url, _ = key
+        origin = state.get("origin", "")
+
+        try:
+            if fetch_episode_title:
+                with TRACER.span(f"{provider.name}.episode_title", state):
+                    enriched = await self._call(
+                        provider,
+                        lambda: provider.update_episode_title_in(State({**state})),
+                    )
+                _remember(
+                    self._episode_titles,
+                    key,
+                    enriched.get("episode_title", ""),
+                    MAX_CACHED_EPISODE_TITLES,
+                )
+
+            if fetch_metadata:
+                with TRACER.span(f"{provider.name}.metadata", state):
+                    enriched = await self._call(
+                        provider,
+                        lambda: provider.update_missing_metadata_in(State({**state})),
+                    )
+                _remember(
+                    self._metadata,
+                    url,
+                    {m: value for m in METADATA_FIELDS if (value := enriched.get(m))},
+                    MAX_CACHED_METADATA,
+                )
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                "%s took longer than %.1fs for %s, retrying in %ds",
+                provider.name,
+                self._stage_timeout,
+                url,
+                RETRY_AFTER,
+            )
+            self._failed_at[key] = perf_counter()
+        except Exception:
+            _LOGGER.exception("Failed to fetch metadata for %s", url)
+            self._failed_at[key] = perf_counter()
+        else:
+            self._failed_at.pop(key, None)
+            # nudge the consumer; a no-op if the presence already has it
+            self._mailbox.touch(origin)
+        finally:
+            del self._tasks[key]
+
+    async def close(self) -> None:
+        tasks = [*self._tasks.values(), *self._stragglers]
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
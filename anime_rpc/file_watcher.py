@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
 import logging
 import sys
 import threading
@@ -10,15 +9,18 @@ from collections import defaultdict
 from io import TextIOWrapper
 from pathlib import Path
 from queue import Empty as QueueEmptyError
-from queue import Queue as ThreadSafeQueue
-from typing import Any, Callable, Generic, Literal, TypeAlias, TypeVar, cast
+from time import perf_counter
+from typing import Any, Callable, Generic, Literal, NamedTuple, TypeAlias, TypeVar, cast
 
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 from watchdog.observers.api import ObservedWatch
 
 _LOGGER = logging.getLogger("file_watcher")
-DEBOUNCE_SECONDS = 1
+# a file is dispatched once it hasn't changed for this long
+DEBOUNCE_SECONDS = 0.1
+# but no later than this after the first change, if it keeps changing
+MAX_DEBOUNCE_SECONDS = 1.0
 
 T = TypeVar("T")
 ParserFunction: TypeAlias = Callable[[TextIOWrapper], T | None]
@@ -41,16 +43,37 @@ class Empty:
         return False
 
 
+class PendingEvent(NamedTuple):
+    event: Literal["modified", "deleted"]
+    first_seen: float
+    due: float
+
+
 class EventHandler(FileSystemEventHandler):
-    def __init__(self, file_watcher_manager: FileWatcherManager) -> None:
+    """Dispatches file events once the file has been quiet for `debounce`.
+
+    Bursts of events for the same file, e.g., from editors saving in several
+    writes, are merged into one dispatch of the latest event. The dispatch
+    thread sleeps until there's something due, so it doesn't wake up at all
+    while nothing changes.
+    """
+
+    def __init__(
+        self,
+        file_watcher_manager: FileWatcherManager,
+        *,
+        debounce: float = DEBOUNCE_SECONDS,
+        max_debounce: float = MAX_DEBOUNCE_SECONDS,
+    ) -> None:
         super().__init__()
         self.file_watcher_manager = file_watcher_manager
-        self.parser_queues: defaultdict[
-            Path, ThreadSafeQueue[Literal["modified", "deleted"] | Empty]
-        ] = defaultdict(ThreadSafeQueue)
+        self.debounce = debounce
+        self.max_debounce = max(max_debounce, debounce)
+        self.pending: dict[Path, PendingEvent] = {}
 
-        self._thread = threading.Thread(target=self._consume_parser_queue, daemon=True)
-        self._event = threading.Event()
+        self._thread = threading.Thread(target=self._dispatch_pending, daemon=True)
+        self._condition = threading.Condition()
+        self._stopped = False
         self._running = False
 
     @staticmethod
@@ -79,20 +102,50 @@ class EventHandler(FileSystemEventHandler):
                     continue
                 s.put(parsed, threaded=True)
 
-    def _consume_parser_queue(self) -> None:
+    def put(self, file_path: Path, event: Literal["modified", "deleted"]) -> None:
+        now = perf_counter()
+        with self._condition:
+            first_seen = (
+                pending.first_seen if (pending := self.pending.get(file_path)) else now
+            )
+            due = min(now + self.debounce, first_seen + self.max_debounce)
+            self.pending[file_path] = PendingEvent(event, first_seen, due)
+            self._condition.notify()
+
+    def discard(self, file_path: Path) -> None:
+        with self._condition:
+            self.pending.pop(file_path, None)
+
+    def _take_due(self) -> list[tuple[Path, Literal["modified", "deleted"]]] | None:
+        """Wait for events to be due and take them, None once stopped."""
+        with self._condition:
+            while not self._stopped:
+                now = perf_counter()
+                if due := [
+                    (file_path, pending.event)
+                    for file_path, pending in self.pending.items()
+                    if pending.due <= now
+                ]:
+                    for file_path, _ in due:
+                        del self.pending[file_path]
+                    return due
+
+                self._condition.wait(
+                    min(p.due for p in self.pending.values()) - now
+                    if self.pending
+                    else None
+                )
+
+        return None
+
+    def _dispatch_pending(self) -> None:
         _LOGGER.debug("Starting config event handler thread")
-        while not self._event.wait(DEBOUNCE_SECONDS):
-            for file_path in {*self.parser_queues}:
-                event = Empty()
-                with contextlib.suppress(QueueEmptyError):
-                    while True:
-                        event = self.parser_queues[file_path].get_nowait()
-
-                if event is Empty():
-                    continue
-
+        while (due := self._take_due()) is not None:
+            for file_path, event in due:
                 if not (
-                    subscriptions := self.file_watcher_manager.subscriptions[file_path]
+                    subscriptions := self.file_watcher_manager.subscriptions.get(
+                        file_path
+                    )
                 ):
                     _LOGGER.warning(
                         "Received an event with no subscriptions: %s",
@@ -112,8 +165,12 @@ class EventHandler(FileSystemEventHandler):
             self._thread.start()
 
     def stop(self) -> None:
-        self._event.set()
-        self._thread.join()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        if self._running:
+            self._thread.join()
 
     @staticmethod
     def _cast_path(path: str | bytes) -> Path:
@@ -146,17 +203,17 @@ class EventHandler(FileSystemEventHandler):
         _LOGGER.debug("Received an event for file %s (%s)", src_path, event.event_type)
 
         if event.event_type in (MODIFIED, CREATED):
-            self.parser_queues[src_path].put(MODIFIED)
+            self.put(src_path, MODIFIED)
             return
 
         if (
             event.event_type == MOVED
             and dest_path in self.file_watcher_manager.subscriptions
         ):
-            self.parser_queues[dest_path].put(MODIFIED)
+            self.put(dest_path, MODIFIED)
             return
 
-        self.parser_queues[src_path].put(DELETED)
+        self.put(src_path, DELETED)
 
 
 # this class needs to be instantiated in an async context
@@ -174,9 +231,15 @@ class Subscription(Generic[T]):
         # assume loop has been running at this point
         self.queue: AsyncQueue[T | None] = AsyncQueue()
         self.loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    async def wait(self) -> None:
+        """Wait until there's something to consume."""
+        await self._ready.wait()
 
     def consume(self) -> T | None:
         ret = Empty()
+        self._ready.clear()
 
         while self.queue.qsize():
             ret = self.queue.get_nowait()
@@ -187,18 +250,24 @@ class Subscription(Generic[T]):
         assert not isinstance(ret, Empty)
         return ret
 
+    def _put(self, item: T | None) -> None:
+        self.queue.put_nowait(item)
+        self._ready.set()
+
     def put(self, item: T | None, threaded: bool = False) -> None:
         if threaded:
-            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+            self.loop.call_soon_threadsafe(self._put, item)
             return
 
-        self.queue.put_nowait(item)
+        self._put(item)
 
 
 class FileWatcherManager:
-    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, *, debounce: float = DEBOUNCE_SECONDS
+    ) -> None:
         self.subscriptions: defaultdict[Path, set[Subscription[Any]]] = defaultdict(set)
-        self.event_handler = EventHandler(self)
+        self.event_handler = EventHandler(self, debounce=debounce)
         self.observer = Observer()
         self.loop = loop
 
@@ -240,4 +309,4 @@ class FileWatcherManager:
                 "No watchers left for %s, removing set...", subscription.observed.path
             )
             self.subscriptions.pop(file_path, None)
-            self.event_handler.parser_queues.pop(file_path, None)
+            self.event_handler.discard(file_path)
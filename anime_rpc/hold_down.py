@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from anime_rpc.states import State
+
+_LOGGER = logging.getLogger("hold_down")
+
+
+class ClearHoldDown:
+    """Holds back clearing the presence for a moment.
+
+    Players report nothing (or a file that doesn't match) for a tick or two
+    while moving on to the next episode. Clearing right away would flicker
+    the presence and reset its elapsed time, so the clear only goes through
+    if nothing valid shows up within `hold` seconds. Explicit stops, i.e.,
+    states marked as `stopped`, aren't held back.
+    """
+
+    def __init__(self, hold: float) -> None:
+        self.hold = hold
+        self._deadline: float | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._deadline is not None
+
+    @property
+    def expired(self) -> bool:
+        return self._deadline is not None and perf_counter() >= self._deadline
+
+    def defer(self, state: State) -> bool:
+        """Whether the clear `state` asks for should still be held back."""
+        if self.hold <= 0 or state.get("stopped"):
+            return False
+
+        now = perf_counter()
+        if self._deadline is None:
+            _LOGGER.debug("Holding the clear back for %.2fs", self.hold)
+            self._deadline = now + self.hold
+
+        return now < self._deadline
+
+    def cancel(self) -> None:
+        if self._deadline is not None and not self.expired:
+            _LOGGER.debug("Cancelled the held clear")
+
+        self._deadline = None
+
+    def timeout(self, timeout: float | None) -> float | None:
+        """Shorten `timeout` so that the consumer wakes up for the clear."""
+        if self._deadline is None:
+            return timeout
+
+        remaining = max(0.0, self._deadline - perf_counter())
+        return remaining if timeout is None else min(timeout, remaining)
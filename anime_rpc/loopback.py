@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+from asyncio import Future
+from time import perf_counter
+from typing import Any, Literal, NamedTuple
+
+from anime_rpc.discord_client import DiscordClient, resolve_application_id
+
+_LOGGER = logging.getLogger("loopback")
+
+
+class LoopbackCall(NamedTuple):
+    method: Literal["set_application_id", "set_activity", "clear_activity"]
+    args: dict[str, Any]
+    time: float  # perf_counter()
+
+
+def _resolve(future: Future[bool], result: bool) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+class LoopbackClient(DiscordClient):
+    """An in-process stand-in for the Discord SDK.
+
+    Records every call and acknowledges activities from its own callback
+    thread after `latency` (plus up to `jitter`) seconds. A `failure_rate`
+    share of updates fails, and so does everything while disconnected.
+    Reconnecting restores the current activity, like the SDK does.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.02,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.connected = True
+        self.application_id: int | None = None
+        self.current_activity: dict[str, Any] = {}
+        self.calls: list[LoopbackCall] = []
+        self._random = random.Random(seed)
+        # (due, tiebreaker, future, result)
+        self._pending: list[tuple[float, int, Future[bool] | None, bool]] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running = False
+
+    def start(self) -> None:
+        if self._thread is not None:
+            raise RuntimeError("Loopback client is already running")
+
+        _LOGGER.debug("Starting loopback callback thread")
+        self._running = True
+        self._thread = threading.Thread(target=self._run_callbacks, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _record(
+        self,
+        method: Literal["set_application_id", "set_activity", "clear_activity"],
+        args: dict[str, Any],
+    ) -> None:
+        self.calls.append(LoopbackCall(method, args, perf_counter()))
+
+    def set_application_id(self, application_id: int | str) -> None:
+        if (application_id := resolve_application_id(application_id)) != (
+            self.application_id
+        ):
+            self.application_id = application_id
+            self._record("set_application_id", {"application_id": application_id})
+
+    def set_activity(
+        self,
+        state: str,
+        details: str,
+        state_url: str = "",
+        details_url: str = "",
+        type_: int = 0,
+        small_text: str = "",
+        small_image: str = "",
+        small_url: str = "",
+        large_text: str = "",
+        large_image: str = "",
+        large_url: str = "",
+        buttons: list[dict[str, str]] | None = None,
+        start: int = 0,
+        end: int = 0,
+        status_display_type: int = 0,
+        *,
+        future: Future[bool] | None = None,
+    ) -> Future[bool] | None:
+        self.current_activity = {
+            "state": state,
+            "state_url": state_url,
+            "details": details,
+            "details_url": details_url,
+            "type_": type_,
+            "small_text": small_text,
+            "small_image": small_image,
+            "small_url": small_url,
+            "large_text": large_text,
+            "large_image": large_image,
+            "large_url": large_url,
+            "buttons": buttons,
+            "start": start,
+            "end": end,
+            "status_display_type": status_display_type,
+        }
+        self._record("set_activity", self.current_activity)
+
+        result = self.connected and self._random.random() >= self.failure_rate
+        due = perf_counter() + self.latency + self._random.uniform(0, self.jitter)
+        with self._cond:
+            heapq.heappush(self._pending, (due, next(self._counter), future, result))
+            self._cond.notify()
+
+        return future
+
+    def clear_activity(self) -> None:
+        self.current_activity = {}
+        self._record("clear_activity", {})
+
+    def disconnect(self) -> None:
+        _LOGGER.debug("Simulating a disconnection")
+        self.connected = False
+
+    def reconnect(self) -> None:
+        _LOGGER.debug("Simulating a reconnection")
+        self.connected = True
+        if self.current_activity:
+            self.set_activity(**self.current_activity)
+
+    def activities(self) -> list[dict[str, Any]]:
+        return [c.args for c in self.calls if c.method == "set_activity"]
+
+    def _run_callbacks(self) -> None:
+        with self._cond:
+            while self._running:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+
+                if (delay := self._pending[0][0] - perf_counter()) > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                _, _, future, result = heapq.heappop(self._pending)
+                if future is not None:
+                    # same as _update_presence_callback
+                    future.get_loop().call_soon_threadsafe(_resolve, future, result)
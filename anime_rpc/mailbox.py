@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from anime_rpc.metrics import QUEUE_WAIT
+from anime_rpc.states import State
+from anime_rpc.tracing import TRACE_KEYS
+
+if TYPE_CHECKING:
+    from anime_rpc.replay import StateRecorder
+
+_LOGGER = logging.getLogger("mailbox")
+
+
+_IDENTITY_KEYS = {"origin", *TRACE_KEYS}
+
+
+def is_empty_state(state: State) -> bool:
+    # an empty state only carries its origin (and trace)
+    return state.keys() <= _IDENTITY_KEYS
+
+
+class Mailbox:
+    """Keeps only the latest state of each origin.
+
+    Producers overwrite their previous state instead of queueing behind
+    it, so memory stays constant no matter how far behind the consumer
+    is, and the consumer always acts on the freshest data.
+    """
+
+    def __init__(self, recorder: StateRecorder | None = None) -> None:
+        # ordered from the least to the most recently updated origin
+        self._latest: dict[str, tuple[int, State]] = {}
+        self._consumed: dict[str, int] = {}
+        self._posted_at: dict[str, float] = {}
+        self._event = asyncio.Event()
+        self._consumed_event = asyncio.Event()
+        self._consumed_event.set()
+        self._recorder = recorder
+
+    def put(self, state: State) -> None:
+        if not (origin := state.get("origin", "")):
+            return
+
+        if self._recorder:
+            self._recorder.write(state)
+
+        seq = self._latest.pop(origin, (0, state))[0] + 1
+        self._latest[origin] = seq, state
+        self._posted_at.setdefault(origin, perf_counter())
+        self._consumed_event.clear()
+        self._event.set()
+
+    def touch(self, origin: str) -> None:
+        """Re-deliver the latest state of `origin` without reordering origins."""
+        if origin not in self._latest:
+            return
+
+        seq, state = self._latest[origin]
+        self._latest[origin] = seq + 1, state
+        self._posted_at.setdefault(origin, perf_counter())
+        self._consumed_event.clear()
+        self._event.set()
+
+    async def wait(self) -> None:
+        """Wait until an origin has posted a new state."""
+        await self._event.wait()
+
+    async def wait_consumed(self) -> None:
+        """Wait until the consumer has taken every posted state."""
+        await self._consumed_event.wait()
+
+    def _take_updates(self) -> dict[str, State]:
+        self._event.clear()
+        updates: dict[str, State] = {}
+        now = perf_counter()
+
+        for origin, (seq, state) in self._latest.items():
+            consumed = self._consumed.get(origin, 0)
+            if seq == consumed:
+                continue
+
+            if skipped := seq - consumed - 1:
+                _LOGGER.debug("Coalesced %d stale states from %s", skipped, origin)
+
+            self._consumed[origin] = seq
+            updates[origin] = state
+            # measured from the oldest state that's been waiting
+            QUEUE_WAIT.observe(now - self._posted_at.pop(origin, now))
+
+        self._consumed_event.set()
+        return updates
+
+    def arbitrate(self, active_origin: str) -> tuple[State | None, str]:
+        """Pick the state to act on and the origin that owns the presence.
+
+        Since multiple pollers can be used, one of them may post empty states,
+        which must not interrupt the "active" one, i.e., clear its presence.
+        Exactly one origin can occupy the rich presence at a time.
+        """
+        updates = self._take_updates()
+        state = None
+
+        if active_origin in updates:
+            state = updates[active_origin]
+            # an empty state means it's given up control
+            if is_empty_state(state):
+                active_origin = ""
+
+        if active_origin:
+            return state, active_origin
+
+        # hand over to the most recently updated origin that has something to show
+        for origin, (_, latest) in reversed(self._latest.items()):
+            if not is_empty_state(latest):
+                return latest, origin
+
+        return state, active_origin
@@ -3,11 +3,10 @@ import errno
 import logging
 import signal
 import sys
-from collections.abc import Coroutine
 from contextlib import suppress
 from pathlib import Path
 from queue import Empty as QueueEmptyError
-from typing import Any, Awaitable, Callable
+from typing import Any
 
 import aiohttp
 from aiohttp.web_app import Application
@@ -15,31 +14,81 @@ from aiohttp.web_app import Application
 from anime_rpc.asyncio_helper import Bail, wait
 from anime_rpc.cli import CLI_ARGS, print_cli_args
 from anime_rpc.config import Config, parse_rpc_config
+from anime_rpc.discord_client import DiscordClient, get_client
+from anime_rpc.enrichment import MetadataEnricher
 from anime_rpc.file_watcher import FileWatcherManager, Subscription
+from anime_rpc.hold_down import ClearHoldDown
+from anime_rpc.mailbox import Mailbox
 from anime_rpc.matcher import generate_regex_pattern
-from anime_rpc.pollers import BasePoller
+from anime_rpc.media_info import flush_media_titles
+from anime_rpc.metrics import POLL_DURATION
+from anime_rpc.pollers import BasePoller, PollScheduler, Vars, clear_match_caches
 from anime_rpc.presence import Presence, UpdateFlag
+from anime_rpc.rate_limit import RateLimitedClient
+from anime_rpc.replay import StateRecorder, replay_states
 from anime_rpc.metadata_providers import (
     BaseMetadataProvider,
     MALMetadataProvider,
     AniListMetadataProvider,
 )
-from anime_rpc.social_sdk import Discord
 from anime_rpc.states import State, get_states_logger, validate_state
 from anime_rpc.timer import Timer
+from anime_rpc.tracing import TRACER, new_trace
 from anime_rpc.ux import init_logging
 from anime_rpc.webserver import PORT, get_app, start_app
 
-# fetch vars every 1 second
-POLLING_INTERVAL = 1.0
-
 _LOGGER = logging.getLogger("main")
 
 
+def update_poller_status(
+    app: Application,
+    poller: BasePoller,
+    vars_: Vars | None,
+    filedir: Path | None,
+    scheduler: PollScheduler,
+) -> None:
+    current = app["pollers"][poller.origin()]
+    new_active = bool(vars_)
+    new_filedir_str = str(filedir) if filedir else None
+    new_schedule = scheduler.reason.value
+    current["interval"] = round(scheduler.interval, 2)
+
+    if (
+        current["active"] != new_active
+        or current["filedir"] != new_filedir_str
+        or current["schedule"] != new_schedule
+    ):
+        current["active"] = new_active
+        current["filedir"] = new_filedir_str
+        current["schedule"] = new_schedule
+
+        for cq in app["sse_clients"]:
+            cq.put_nowait(app["pollers"])
+
+
+async def wait_for_change(
+    poller: BasePoller, subscription: Subscription[Config] | None, timeout: float
+) -> None:
+    waiters: list[asyncio.Task[None]] = [
+        asyncio.create_task(poller.wait_for_change(timeout))
+    ]
+    if subscription:
+        # .rpc changes need to be picked up too
+        waiters.append(asyncio.create_task(subscription.wait()))
+
+    try:
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for w in waiters:
+            w.cancel()
+
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+
 async def poll_player(
     poller: BasePoller,
     event: asyncio.Event,
-    queue: asyncio.Queue[State],
+    mailbox: Mailbox,
     session: aiohttp.ClientSession,
     file_watcher_manager: FileWatcherManager,
     app: Application | None,
@@ -47,11 +96,17 @@ async def poll_player(
     config: Config | None = None
     filedir: Path | None = None
     subscription: Subscription[Config] | None = None
+    scheduler = PollScheduler(poller.origin(), CLI_ARGS.poll_interval)
 
     while not event.is_set():
+        new_trace()
         state: State = poller.get_empty_state()
         try:
-            vars_ = await wait(poller.get_vars(session), event)
+            with (
+                POLL_DURATION.time(poller=poller.origin()),
+                TRACER.span("get_vars", state),
+            ):
+                vars_ = await wait(poller.get_vars(session), event)
         except Bail:
             break
         except Exception as e:
@@ -65,22 +120,18 @@ async def poll_player(
 
             # assume the player is dead
             # clear presence now
-            await queue.put(state)
+            state["stopped"] = True
+            mailbox.put(state)
+            interval = scheduler.schedule(None, failed=True)
+            _ = app and update_poller_status(app, poller, None, None, scheduler)
+
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(event.wait(), timeout=interval)
             continue
 
         new_filedir = vars_ and (fd := vars_.get("filedir")) and Path(fd) or None
-
-        if app:
-            current = app["pollers"][poller.origin()]
-            new_active = bool(vars_)
-            new_filedir_str = str(new_filedir) if new_filedir else None
-
-            if current["active"] != new_active or current["filedir"] != new_filedir_str:
-                current["active"] = new_active
-                current["filedir"] = new_filedir_str
-
-                for cq in app["sse_clients"]:
-                    cq.put_nowait(app["pollers"])
+        interval = scheduler.schedule(vars_)
+        _ = app and update_poller_status(app, poller, vars_, new_filedir, scheduler)
 
         # user switches folder
         if filedir != new_filedir:
@@ -97,6 +148,9 @@ async def poll_player(
         # drain the queue and get the latest change
         with suppress(QueueEmptyError):
             config = subscription and subscription.consume()
+            # the .rpc has changed, don't hold onto stale matches
+            if subscription:
+                clear_match_caches()
 
         if (
             config
@@ -107,63 +161,56 @@ async def poll_player(
             config["match"] = match
 
         if vars_ and config:
-            state = poller.get_state(vars_, config)
+            with TRACER.span("get_state", state):
+                state = await poller.get_state(vars_, config)
+        elif vars_ is None and not poller.reachable:
+            # the player has exited
+            state["stopped"] = True
+
+        mailbox.put(state)
 
-        await queue.put(state)
+        if poller.observing:
+            try:
+                await wait(wait_for_change(poller, subscription, interval), event)
+            except Bail:
+                break
+            continue
 
         with suppress(asyncio.TimeoutError):
-            await asyncio.wait_for(event.wait(), timeout=POLLING_INTERVAL)
+            await asyncio.wait_for(event.wait(), timeout=interval)
 
 
 async def drain_queue(
     event: asyncio.Event,
-    queue: asyncio.Queue[State],
-    queue_getter: Callable[[], Awaitable[State]],
+    mailbox: Mailbox,
     last_origin: str,
     last_state: State,
+    *,
+    timeout: float | None = None,
+    replay: bool = True,
 ) -> tuple[State | None, str]:
     try:
-        first_state = await wait(queue_getter(), event)
+        await wait(asyncio.wait_for(mailbox.wait(), timeout=timeout), event)
     except asyncio.TimeoutError:
-        first_state = State({**last_state, "origin": last_origin})
-
-    batch: list[State] = [first_state]
-    while not queue.empty():
-        batch.append(queue.get_nowait())
+        # nothing new, replay the last state so that periodic updates go through
+        if replay and last_origin:
+            return State({**last_state, "origin": last_origin}), last_origin
 
-    origin = last_origin
-    state = None
+    state, last_origin = mailbox.arbitrate(last_origin)
+    if state is not None:
+        TRACER.record_since_last("queue", state)
 
-    for s in batch:
-        s_origin = s.get("origin", "")
-        if not s_origin:
-            continue
-
-        is_empty = len(s) <= 1
-
-        if not is_empty and not origin:
-            origin = s_origin
-
-        # since multiple pollers can be used, one of them may return empty states,
-        # which will interrupt an "active" poller, i.e., clear its presence.
-        # ensure that exactly only one origin can occupy the rich presence at a time.
-        if s_origin == origin:
-            state = s
-            # if last_state is empty
-            # it's given up control
-            if is_empty:
-                origin = ""
-
-    return state, origin
+    return state, last_origin
 
 
 async def consumer_loop(
     event: asyncio.Event,
-    queue: asyncio.Queue[State],
+    mailbox: Mailbox,
     metadata_providers: dict[str, BaseMetadataProvider],
-    discord: Discord,
+    discord: DiscordClient,
 ) -> None:
-    presence = Presence(discord)
+    # a held back update must not stall newer states
+    presence = Presence(discord, wait_for_ack=not CLI_ARGS.rate_limit)
     timer = Timer()
 
     # internal states
@@ -171,60 +218,88 @@ async def consumer_loop(
     last_origin: str = ""
     flags = UpdateFlag(0)
 
-    def _queue_get_with_timeout() -> Coroutine[Any, Any, State]:
-        return asyncio.wait_for(queue.get(), timeout=1)
-
     states_logger = get_states_logger(verbose=CLI_ARGS.verbose)
-    queue_get = (
-        _queue_get_with_timeout if CLI_ARGS.periodic_forced_updates else queue.get
+    timeout = 1 if CLI_ARGS.periodic_forced_updates else None
+    enricher = MetadataEnricher(
+        metadata_providers,
+        mailbox,
+        fetch_episode_titles=CLI_ARGS.fetch_episode_titles,
     )
 
-    while not event.is_set():
-        state, last_origin = await drain_queue(
-            event, queue, queue_get, last_origin, last_state
-        )
+    hold_down = ClearHoldDown(CLI_ARGS.clear_hold_down / 1_000)
 
-        if state is None:
-            continue
+    try:
+        while not event.is_set():
+            state, last_origin = await drain_queue(
+                event,
+                mailbox,
+                last_origin,
+                last_state,
+                timeout=hold_down.timeout(timer.timeout(timeout)),
+                # the last valid state isn't what the player reports anymore,
+                # only a new one may cancel the held clear
+                replay=not hold_down.pending,
+            )
 
-        states_logger.send(state)
+            if state is None:
+                if not hold_down.expired:
+                    continue
 
-        url = state.get("url", "")
-        for provider in metadata_providers.values():
-            # the naming may be unclear but this checks if the provider can
-            # handle the url
-            if not provider.extract_id(url):
-                continue
+                # nothing valid came back in time
+                state = State()
+            else:
+                states_logger.send(state)
 
-            if CLI_ARGS.fetch_episode_titles:
-                state = await wait(provider.update_episode_title_in(state), event)
+                with TRACER.span("enrich", state):
+                    state = await wait(enricher.enrich(state), event)
 
-            state = await wait(provider.update_missing_metadata_in(state), event)
-            break
+            if state and not validate_state(state):
+                # most likely the player moving on to the next file,
+                # unless the player has gone away
+                if last_state and hold_down.defer(state):
+                    continue
 
-        if state and not validate_state(state):
-            _LOGGER.debug("Invalid state received: %s", state)
-            _LOGGER.debug("Overriding invalid state with an empty one...")
-            state = State()
+                _LOGGER.debug("Invalid state received: %s", state)
+                _LOGGER.debug("Overriding invalid state with an empty one...")
+                state = State()
 
-        flags = timer.tick(state, flags)
+            hold_down.cancel()
 
-        try:
-            last_state = await presence.update(state, last_state, flags=flags)
-        except Exception as e:
-            _LOGGER.exception("Failed to update presence: %s", e)
-            event.set()
-            break
+            with TRACER.span("timer", state):
+                flags = timer.tick(state, flags)
+
+            try:
+                last_state = await presence.update(state, last_state, flags=flags)
+            except Exception as e:
+                _LOGGER.exception("Failed to update presence: %s", e)
+                event.set()
+                break
+
+            flags = UpdateFlag(0)
+    finally:
+        await enricher.close()
 
-        flags = UpdateFlag(0)
+
+async def replay(mailbox: Mailbox, event: asyncio.Event, path: Path) -> None:
+    await replay_states(path, mailbox, event, fast=CLI_ARGS.replay_fast)
+
+    # nothing else is feeding the consumer
+    if not (CLI_ARGS.pollers or CLI_ARGS.enable_webserver):
+        event.set()
 
 
 async def async_main() -> None:
-    discord = Discord()
-    queue: asyncio.Queue[State] = asyncio.Queue()
+    discord = get_client(CLI_ARGS.discord_backend, pool_size=CLI_ARGS.discord_pool_size)
+    if CLI_ARGS.rate_limit:
+        burst, period = CLI_ARGS.rate_limit
+        discord = RateLimitedClient(discord, burst=burst, period=period)
+    recorder = StateRecorder(CLI_ARGS.record) if CLI_ARGS.record else None
+    mailbox = Mailbox(recorder)
     event = asyncio.Event()
     session = aiohttp.ClientSession()
-    file_watcher_manager = FileWatcherManager(loop=asyncio.get_running_loop())
+    file_watcher_manager = FileWatcherManager(
+        loop=asyncio.get_running_loop(), debounce=CLI_ARGS.watch_debounce / 1_000
+    )
 
     _metadata_providers = [
         MALMetadataProvider(session, file_watcher_manager),
@@ -236,12 +311,15 @@ async def async_main() -> None:
 
     webserver, app = None, None
     signal.signal(signal.SIGINT, lambda *_: _sigint_callback(event))  # type: ignore[reportUnknownArgumentType]
+    if sigusr1 := getattr(signal, "SIGUSR1", None):
+        # kill -USR1 dumps the SDK logs that were held back
+        signal.signal(sigusr1, lambda *_: discord.dump_logs())
     tasks: list[asyncio.Task[Any]] = []
 
     try:
         if CLI_ARGS.enable_webserver:
             try:
-                app = await get_app(queue, metadata_providers)
+                app = await get_app(mailbox, metadata_providers)
                 webserver = await start_app(app)
             except OSError as exc:
                 if exc.errno != errno.EADDRINUSE:
@@ -253,12 +331,18 @@ async def async_main() -> None:
                     PORT,
                 )
 
+        if CLI_ARGS.trace:
+            TRACER.open(CLI_ARGS.trace)
+
+        if recorder:
+            recorder.open()
+
         discord.start()
         file_watcher_manager.start()
 
         tasks.append(
             asyncio.create_task(
-                consumer_loop(event, queue, metadata_providers, discord),
+                consumer_loop(event, mailbox, metadata_providers, discord),
                 name="consumer",
             )
         )
@@ -266,7 +350,7 @@ async def async_main() -> None:
             [
                 asyncio.create_task(
                     poll_player(
-                        poller, event, queue, session, file_watcher_manager, app
+                        poller, event, mailbox, session, file_watcher_manager, app
                     ),
                     name=poller.__class__.__name__,
                 )
@@ -274,6 +358,13 @@ async def async_main() -> None:
             ]
         )
 
+        if CLI_ARGS.replay:
+            tasks.append(
+                asyncio.create_task(
+                    replay(mailbox, event, CLI_ARGS.replay), name="replay"
+                )
+            )
+
         _LOGGER.info("Waiting for activity feed updates...")
         _LOGGER.info("Press CTRL+C to exit")
 
@@ -287,6 +378,7 @@ async def async_main() -> None:
             t.cancel()
 
         await asyncio.gather(*tasks, return_exceptions=True)
+        await flush_media_titles()
 
         if webserver is not None:
             await webserver.stop()
@@ -294,6 +386,8 @@ async def async_main() -> None:
         await session.close()
         file_watcher_manager.stop()
         discord.stop()
+        TRACER.close()
+        _ = recorder and recorder.close()
 
 
 def _sigint_callback(event: asyncio.Event) -> None:
@@ -305,9 +399,9 @@ def main() -> None:
     init_logging()
     print_cli_args()
 
-    if not (CLI_ARGS.pollers or CLI_ARGS.enable_webserver):
+    if not (CLI_ARGS.pollers or CLI_ARGS.enable_webserver or CLI_ARGS.replay):
         _LOGGER.error(
-            "Nothing to run: use --pollers or --enable-webserver. "
+            "Nothing to run: use --pollers, --enable-webserver or --replay. "
             "Try --help for usage details."
         )
         sys.exit(1)
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from time import perf_counter
+from typing import TypeAlias, cast
+
+from anime_rpc.cache import MEDIA_INFO_CACHE_PATH
+from anime_rpc.containers import ContainerError, read_title
+
+try:
+    # only needed for containers other than Matroska and MP4
+    from pymediainfo import MediaInfo
+except ImportError:
+    MediaInfo = None
+
+_LOGGER = logging.getLogger("media_info")
+
+MAX_MEMORY_ENTRIES = 256
+MAX_DISK_ENTRIES = 4096
+# a file asked for again within this many seconds isn't stat'd again
+RECHECK_INTERVAL = 10.0
+# newly parsed titles are written to disk together, this long after the first
+SAVE_DELAY = 5.0
+
+# path, size, mtime
+CacheKey: TypeAlias = tuple[str, int, int]
+
+
+def _get_cache_key(path: Path) -> CacheKey:
+    stat = path.stat()
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+def _get_disk_key(key: CacheKey) -> str:
+    path, size, mtime = key
+    return f"{size}:{mtime}:{path}"
+
+
+def parse_title(path: Path) -> str:
+    with suppress(ContainerError):
+        return read_title(path)
+
+    if MediaInfo is None:
+        _LOGGER.debug("pymediainfo isn't installed, can't parse %s", path)
+        return ""
+
+    metadata = MediaInfo.parse(path)
+    if metadata.general_tracks:
+        return cast(str, metadata.general_tracks[0].title or "").strip()
+
+    return ""
+
+
+class MediaTitleCache:
+    """Container titles, parsed in a worker thread.
+
+    Titles are kept in a bounded LRU keyed by path, size and mtime,
+    and persisted to disk so restarts don't re-parse the library.
+    The file being played is only stat'd every `recheck_interval`
+    seconds, and new titles are saved in batches.
+    """
+
+    def __init__(
+        self,
+        path: Path = MEDIA_INFO_CACHE_PATH,
+        *,
+        max_entries: int = MAX_MEMORY_ENTRIES,
+        max_disk_entries: int = MAX_DISK_ENTRIES,
+        recheck_interval: float = RECHECK_INTERVAL,
+        save_delay: float = SAVE_DELAY,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.recheck_interval = recheck_interval
+        self.save_delay = save_delay
+        self._memory: OrderedDict[CacheKey, str] = OrderedDict()
+        # path -> when it was last stat'd and its title
+        self._checked: OrderedDict[Path, tuple[float, str]] = OrderedDict()
+        self._disk: dict[str, str] | None = None
+        self._dirty = False
+        self._save_task: asyncio.Task[None] | None = None
+        self._inflight: dict[CacheKey, asyncio.Future[str]] = {}
+        self._disk_lock = asyncio.Lock()
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            _LOGGER.warning("Failed to load %s, starting afresh...", self.path)
+            return {}
+
+        if not isinstance(entries, dict):
+            return {}
+
+        return cast("dict[str, str]", entries)
+
+    def _save(self, entries: dict[str, str]) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def _remember(self, key: CacheKey, title: str) -> None:
+        self._memory[key] = title
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _checked_now(self, path: Path, title: str) -> None:
+        self._checked[path] = perf_counter(), title
+        self._checked.move_to_end(path)
+        while len(self._checked) > self.max_entries:
+            self._checked.popitem(last=False)
+
+    async def _get_disk(self) -> dict[str, str]:
+        if self._disk is None:
+            self._disk = await asyncio.to_thread(self._load)
+            _LOGGER.debug("Loaded %d media titles from %s", len(self._disk), self.path)
+
+        return self._disk
+
+    async def _persist(self, key: CacheKey, title: str) -> None:
+        async with self._disk_lock:
+            disk = await self._get_disk()
+            disk[_get_disk_key(key)] = title
+
+            # dicts keep insertion order, evict the oldest entries first
+            for stale in list(disk)[: max(len(disk) - self.max_disk_entries, 0)]:
+                del disk[stale]
+
+        self._dirty = True
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        await self._save_dirty()
+
+    async def flush(self) -> None:
+        """Save the titles parsed since the last save, if any."""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+
+        await self._save_dirty()
+
+    async def _save_dirty(self) -> None:
+        async with self._disk_lock:
+            if not self._dirty or self._disk is None:
+                return
+
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._save, dict(self._disk))
+            except OSError as e:
+                _LOGGER.warning("Failed to save %s: %s", self.path, e)
+
+    async def _resolve(self, key: CacheKey, path: Path) -> str:
+        async with self._disk_lock:
+            disk = await self._get_disk()
+
+        if (title := disk.get(_get_disk_key(key))) is not None:
+            return title
+
+        _LOGGER.debug("Parsing media info of %s", path)
+        title = await asyncio.to_thread(parse_title, path)
+        await self._persist(key, title)
+        return title
+
+    async def get(self, path: Path) -> str:
+        # the same file is asked for on every poll while it's playing
+        if (checked := self._checked.get(path)) is not None and (
+            perf_counter() - checked[0] < self.recheck_interval
+        ):
+            return checked[1]
+
+        # sometimes "file" and "filedir" are out of sync when fetching from MPC
+        # so we may get the old file name with the new filedir, or vice versa
+        # in that case, treat it as untitled
+        try:
+            key = await asyncio.to_thread(_get_cache_key, path)
+        except OSError:
+            return ""
+
+        if (title := self._memory.get(key)) is not None:
+            self._memory.move_to_end(key)
+            self._checked_now(path, title)
+            return title
+
+        # another poller may be parsing the same file already
+        if (future := self._inflight.get(key)) is not None:
+            return await asyncio.shield(future)
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            title = await self._resolve(key, path)
+        except OSError:
+            title = ""
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark as retrieved, it's re-raised here anyway
+            future.exception()
+            raise
+        else:
+            self._remember(key, title)
+            self._checked_now(path, title)
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(title)
+        return title
+
+
+_MEDIA_TITLES: MediaTitleCache | None = None
+
+
+def get_media_titles() -> MediaTitleCache:
+    """The cache shared by all pollers, created on first use."""
+    global _MEDIA_TITLES
+
+    if _MEDIA_TITLES is None:
+        _MEDIA_TITLES = MediaTitleCache()
+
+    return _MEDIA_TITLES
+
+
+async def flush_media_titles() -> None:
+    if _MEDIA_TITLES is not None:
+        await _MEDIA_TITLES.flush()
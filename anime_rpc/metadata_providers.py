@@ -10,7 +10,7 @@ from abc import ABC, abstractmethod
 from contextlib import suppress
 from http import HTTPStatus
 from pathlib import Path
-from time import time
+from time import perf_counter, time
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -28,6 +28,7 @@ from bs4 import BeautifulSoup
 
 from anime_rpc.cache import METADATA_CACHE_DIR
 from anime_rpc.file_watcher import FileWatcherManager, Subscription
+from anime_rpc.metrics import API_CALLS, CACHE_HITS, PROVIDER_DURATION
 
 if TYPE_CHECKING:
     import aiohttp
@@ -272,6 +273,13 @@ class _CachingMetadataProvider(BaseMetadataProvider):
         _LOGGER.debug("Spawning new consumer task %s", self._consumer_task.get_name())
         await self.wait_for_cache_ready()
 
+    def _observe(self, kind: str, source: str, start: float) -> None:
+        counter = CACHE_HITS if source == "cache" else API_CALLS
+        counter.inc(provider=self.name, kind=kind)
+        PROVIDER_DURATION.observe(
+            perf_counter() - start, provider=self.name, kind=kind, source=source
+        )
+
     async def wait_for_cache_ready(self) -> None:
         await self._cache_ready_event.wait()
 
@@ -279,6 +287,7 @@ class _CachingMetadataProvider(BaseMetadataProvider):
         if not (id_ := self.extract_id(url)):
             return Metadata()
 
+        start = perf_counter()
         path = self.get_cache_path(id_)
         task = asyncio.create_task(self.subscribe(id_, path))
 
@@ -288,6 +297,7 @@ class _CachingMetadataProvider(BaseMetadataProvider):
         if path.exists():
             await task  # wait until we get the intial value
             if self._last_queried is not None:
+                self._observe("metadata", "cache", start)
                 return self._last_queried
 
         _LOGGER.info("[API CALL] Fetching metadata from %s", url)
@@ -308,16 +318,19 @@ class _CachingMetadataProvider(BaseMetadataProvider):
             )
             json.dump(metadata, f)
         await self.wait_for_cache_ready()
+        self._observe("metadata", "api", start)
         return metadata
 
     async def get_episodes(
         self: "_CachingMetadataProvider", url: str, episode: str
     ) -> dict[str, str]:
+        start = perf_counter()
         if not (metadata := await self.get_metadata(url)):
             _LOGGER.debug("Failed to get metadata for %s. Is URL valid?", url)
             return {}
 
         if episode in (episodes := metadata.get("episodes", {})):
+            self._observe("episodes", "cache", start)
             return episodes
 
         if episodes:
@@ -362,6 +375,7 @@ class _CachingMetadataProvider(BaseMetadataProvider):
             )
             json.dump(metadata, f)
         await self.wait_for_cache_ready()
+        self._observe("episodes", "api", start)
         return episodes
 
 
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from time import perf_counter
+
+# seconds, from a cache hit up to a slow scrape
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    type_ = ""
+
+    def __init__(self, name: str, help_: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_
+        self.labels = labels
+        # updated from the SDK and pump threads while rendered on the loop
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {labels}")
+
+        return tuple(labels[name] for name in self.labels)
+
+    @abstractmethod
+    def _render_samples(self) -> Iterator[str]: ...
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type_}"
+        yield from self._render_samples()
+
+
+class Counter(_Metric):
+    type_ = "counter"
+
+    def __init__(self, name: str, help_: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_, labels)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+
+        for key, value in values:
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labels: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: per-bucket counts (+Inf last), sum
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if (counts := self._counts.get(key)) is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+
+            counts[bucket] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Generator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def _render_samples(self) -> Iterator[str]:
+        with self._lock:
+            samples = [
+                (key, [*counts], self._sums[key])
+                for key, counts in self._counts.items()
+            ]
+
+        for key, counts, sum_ in samples:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, le=_format_value(bound))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {_format_value(sum_)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "".join(
+            f"{line}\n" for metric in self._metrics.values() for line in metric.render()
+        )
+
+
+REGISTRY = Registry()
+
+POLL_DURATION = Histogram(
+    "anime_rpc_poll_duration_seconds",
+    "Time taken by a poller to fetch the player variables.",
+    ("poller",),
+)
+QUEUE_WAIT = Histogram(
+    "anime_rpc_queue_wait_seconds",
+    "Time a state spent in the mailbox before the consumer took it.",
+)
+PROVIDER_DURATION = Histogram(
+    "anime_rpc_provider_duration_seconds",
+    "Time taken by a metadata provider lookup.",
+    ("provider", "kind", "source"),
+)
+RENDER_DURATION = Histogram(
+    "anime_rpc_presence_render_seconds",
+    "Time taken to turn a state into activity arguments.",
+)
+ACK_DURATION = Histogram(
+    "anime_rpc_presence_ack_seconds",
+    "Time from setting the activity until Discord acknowledged it.",
+)
+API_CALLS = Counter(
+    "anime_rpc_api_calls_total",
+    "Metadata provider requests that hit the network.",
+    ("provider", "kind"),
+)
+CACHE_HITS = Counter(
+    "anime_rpc_cache_hits_total",
+    "Metadata provider lookups served from the cache.",
+    ("provider", "kind"),
+)
+RATE_LIMITED = Counter(
+    "anime_rpc_presence_rate_limited_total",
+    "Presence updates held back by the rate limiter (deferred), "
+    "and the ones replaced by a newer update before being sent (coalesced).",
+    ("outcome",),
+)
+PRESENCE_UPDATES = Counter(
+    "anime_rpc_presence_updates_total",
+    "Presence updates by outcome.",
+    ("result",),
+)
+PUMP_WAKEUPS = Counter(
+    "anime_rpc_callback_pump_wakeups_total",
+    "Discord SDK callback pump wakeups, by what woke it up.",
+    ("reason",),
+)
+SDK_CALL_DURATION = Histogram(
+    "anime_rpc_sdk_call_seconds",
+    "Time taken by a Discord SDK call on the SDK thread.",
+    ("call",),
+)
+RECONNECTS = Counter(
+    "anime_rpc_discord_reconnects_total",
+    "Reconnections to Discord after losing the connection.",
+)
+RESTORE_DURATION = Histogram(
+    "anime_rpc_discord_restore_seconds",
+    "Time from losing the connection to Discord until the activity was restored.",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
@@ -1,12 +1,18 @@
 from typing import TypedDict
 from anime_rpc.pollers.base_poller import BasePoller as BasePoller
 from anime_rpc.pollers.base_poller import Vars as Vars
+from anime_rpc.pollers.base_poller import clear_match_caches as clear_match_caches
 from anime_rpc.pollers.mpc_poller import MPCPoller as MPCPoller
 from anime_rpc.pollers.mpv_poller import MPVIPCPoller as MPVIPCPoller
 from anime_rpc.pollers.mpv_poller import MPVWebUIPoller as MPVWebUIPoller
+from anime_rpc.pollers.scheduler import PollScheduler as PollScheduler
+from anime_rpc.pollers.scheduler import ScheduleReason as ScheduleReason
 
 
 class PollerStatus(TypedDict):
     active: bool
     filedir: str | None
     display_name: str
+    # seconds until the next poll and why
+    interval: float
+    schedule: str
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import re
 from abc import ABC, abstractmethod
-from contextlib import suppress
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING, TypedDict, cast
-
-from pymediainfo import MediaInfo
+from typing import TYPE_CHECKING, ClassVar, TypeAlias, TypedDict
 
 from anime_rpc.config import validate_config
+from anime_rpc.media_info import get_media_titles
 from anime_rpc.states import State, WatchingState
+from anime_rpc.tracing import stamp
 
 if TYPE_CHECKING:
     import aiohttp
@@ -20,6 +21,36 @@ if TYPE_CHECKING:
 EP_TEMPLATE = ("%ep%", r"(?P<ep>\d+(?:\.\d+)?)")
 EP_TITLE_TEMPLATE = ("%title%", r"(?P<title>.+)")
 EP_NORMALIZER = re.compile(r"^0+(?=\d)")
+EpTitle: TypeAlias = "tuple[str, str | None]"
+
+
+@lru_cache(maxsize=64)
+def compile_match_pattern(pattern: str) -> re.Pattern[str]:
+    return re.compile(pattern.replace(*EP_TEMPLATE, 1).replace(*EP_TITLE_TEMPLATE, 1))
+
+
+# the same file is matched every tick, so memoise the outcome
+@lru_cache(maxsize=256)
+def match_ep_title(pattern: str, media_title: str, file: str) -> EpTitle | None:
+    compiled = compile_match_pattern(pattern)
+
+    for f in (media_title, file):
+        if not f:
+            continue
+        if match := compiled.search(f):
+            break
+    else:
+        return None
+
+    groups = match.groupdict()
+    ep = groups["ep"]
+    title = groups.get("title")
+    return EP_NORMALIZER.sub("", ep), title.strip() if title else None
+
+
+def clear_match_caches() -> None:
+    compile_match_pattern.cache_clear()
+    match_ep_title.cache_clear()
 
 
 class Vars(TypedDict):
@@ -32,10 +63,13 @@ class Vars(TypedDict):
 
 class BasePoller(ABC):
     default_port = None
+    # whether the player can notify us of changes instead of being polled
+    supports_observe: ClassVar[bool] = False
 
     def __init__(self, port: int | None = None) -> None:
         self.port = port if port is not None else self.default_port
-        self._last_parsed_media_info: tuple[Path, str] = (Path("/"), "")
+        self.observing = False
+        self._reachable = True
 
     @classmethod
     @abstractmethod
@@ -48,53 +82,39 @@ class BasePoller(ABC):
     @abstractmethod
     def display_name(self) -> str: ...
 
-    def parse_media_info(self, file: str, filedir: str) -> str:
-        path = Path(filedir) / file
-        if self._last_parsed_media_info[0] == path:
-            return self._last_parsed_media_info[1]
+    @property
+    def reachable(self) -> bool:
+        """Whether the player answered the last poll, it has exited if not."""
+        return self._reachable
 
-        title = ""
+    async def wait_for_change(self, timeout: float) -> None:
+        """Block until the player reports a change.
 
-        # sometimes "file" and "filedir" are out of sync when fetching from MPC
-        # so we may get the old file name with the new filedir, or vice versa
-        # in that case, suppress FileNotFoundError
-        with suppress(FileNotFoundError):
-            metadata = MediaInfo.parse(Path(filedir) / file)
-            if metadata.general_tracks:
-                title = cast(str, metadata.general_tracks[0].title or "").strip()
+        Only used when observing, `timeout` is how long to back off
+        if the player can't be reached. Pollers that can't observe
+        just wait it out.
+        """
+        await asyncio.sleep(timeout)
 
-        self._last_parsed_media_info = (path, title)
-        return title
+    async def parse_media_info(self, file: str, filedir: str) -> str:
+        return await get_media_titles().get(Path(filedir) / file)
 
-    def get_ep_title(
+    async def get_ep_title(
         self,
         pattern: str,
         file: str,
         filedir: str,
-    ) -> tuple[str, str | None] | None:
+    ) -> EpTitle | None:
         if pattern.lower() == "movie":
             return "Movie", None
 
-        pattern = pattern.replace(*EP_TEMPLATE, 1).replace(*EP_TITLE_TEMPLATE, 1)
-        candidates: list[str] = [self.parse_media_info(file, filedir), file]
-
-        for f in candidates:
-            if not f:
-                continue
-            if match := re.search(pattern, f):
-                break
-        else:
-            return None
-
-        groups = match.groupdict()
-        ep = groups["ep"]
-        title = groups.get("title")
-        return EP_NORMALIZER.sub("", ep), title.strip() if title else None
+        media_title = await self.parse_media_info(file, filedir)
+        return match_ep_title(pattern, media_title, file)
 
     def get_empty_state(self) -> State:
-        return State(origin=self.origin())
+        return stamp(State(origin=self.origin()))
 
-    def get_state(self, vars_: Vars, config: Config) -> State:
+    async def get_state(self, vars_: Vars, config: Config) -> State:
         state: State = self.get_empty_state()
 
         if validate_config(config):
@@ -104,7 +124,7 @@ class BasePoller(ABC):
         state["position"] = vars_["position"]
         state["duration"] = vars_["duration"]
         state["display_name"] = self.display_name
-        maybe_ep_title = self.get_ep_title(
+        maybe_ep_title = await self.get_ep_title(
             config["match"],
             vars_["file"],
             vars_["filedir"],
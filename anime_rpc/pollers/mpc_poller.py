@@ -66,6 +66,7 @@ class MPCPoller(BasePoller):
             async with client.get(
                 f"http://127.0.0.1:{self.port}/variables.html",
             ) as response:
+                self._reachable = True
                 if response.status != HTTPStatus.OK:
                     self._reset_edition()
                     return None
@@ -74,4 +75,5 @@ class MPCPoller(BasePoller):
                 return MPCPoller._get_vars_html(data)
         except aiohttp.ClientConnectionError:
             self._reset_edition()
+            self._reachable = False
             return None
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 import json
+import logging
 import os
+from contextlib import suppress
 from http import HTTPStatus
 from pathlib import Path
-from typing import Callable, TypedDict, TypeVar
+from typing import Any, Callable, TypedDict, TypeVar, cast
 
 import aiohttp
 
@@ -13,6 +16,15 @@ from anime_rpc.pollers.base_poller import BasePoller, Vars
 from anime_rpc.states import WatchingState
 
 T = TypeVar("T")
+_LOGGER = logging.getLogger("mpv_poller")
+IPC_TIMEOUT_SECONDS = 1.0
+IPC_PROPERTIES = ("playlist", "working-directory", "pause", "time-pos", "duration")
+# time-pos is deliberately left out as it changes every frame,
+# it's fetched on demand whenever one of these changes instead
+OBSERVED_PROPERTIES = ("pause", "duration", "playlist", "working-directory")
+OBSERVED_EVENTS = frozenset({"file-loaded", "seek", "playback-restart"})
+# property changes come in bursts, e.g., when switching files
+OBSERVE_SETTLE_SECONDS = 0.05
 MISSING_WORKING_DIR_MSG = (
     "Missing working-dir entry in mpv-webui response.\n"
     "Please add the following line to your simple-mpv-webui/main.lua's"
@@ -26,7 +38,7 @@ class MPVCommand(TypedDict):
     command: list[str]
 
 
-class MPVResponse(TypedDict):
+class MPVResponse(TypedDict, total=False):
     error: str
     data: str | None
     request_id: int
@@ -84,6 +96,7 @@ class MPVWebUIPoller(BasePoller):
             async with client.get(
                 f"http://127.0.0.1:{self.port}/api/status",
             ) as response:
+                self._reachable = True
                 if response.status != HTTPStatus.OK:
                     return None
 
@@ -100,55 +113,193 @@ class MPVWebUIPoller(BasePoller):
                     duration=data["duration"],
                 )
         except aiohttp.ClientConnectionError:
+            self._reachable = False
             return None
 
 
-# TODO: maybe consider switching to a hook-based approach
-class MPVIPCPoller(BasePoller):
-    # TODO: allow for custom paths
-    ipc_path = "\\\\.\\pipe\\mpv-pipe" if os.name == "nt" else "/tmp/mpvsocket"  # noqa: S108
+async def _open_ipc_connection(
+    path: str,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if os.name != "nt":
+        return await asyncio.open_unix_connection(path)
 
-    if os.name == "nt":
+    # The following code is untested
+    # named pipes are only supported by the proactor event loop
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    protocol = asyncio.StreamReaderProtocol(reader)
+    transport, _ = await loop.create_pipe_connection(  # type: ignore[reportAttributeAccessIssue, reportUnknownMemberType, reportUnknownVariableType]
+        lambda: protocol, path
+    )
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)  # type: ignore[reportUnknownArgumentType]
+    return reader, writer
+
+
+class MPVIPCClient:
+    """Long-lived connection to mpv's JSON IPC.
+
+    Commands are tagged with a unique request_id so that several of them
+    can be written at once and their replies matched as they come in.
+    The connection is re-established lazily if mpv goes away.
+    Asynchronous events (e.g., from observe_property) go to `on_event`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        on_event: Callable[[dict[str, Any]], None] | None = None,
+        on_disconnect: Callable[[], None] | None = None,
+    ) -> None:
+        self.path = path
+        self.on_event = on_event
+        self.on_disconnect = on_disconnect
+        # bumped on every new connection, observers are per connection
+        self.generation = 0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._pending: dict[int, asyncio.Future[MPVResponse]] = {}
+        self._request_ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
 
-        @staticmethod
-        async def _send_command(command: bytes) -> bytes:
-            # The following code is untested
-            try:
-                # FIXME: write in a another thread
-                with open(MPVIPCPoller.ipc_path, "w+b", buffering=0) as pipe:
-                    pipe.write(command)
-                    return pipe.readline()
-            except FileNotFoundError:
-                return b"{}"
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is not None and self.connected:
+                return self._writer
+
+            self._reader, self._writer = await _open_ipc_connection(self.path)
+            self.generation += 1
+            self._reader_task = asyncio.create_task(
+                self._read_loop(self._reader), name="mpv-ipc-reader"
+            )
+            _LOGGER.debug("Connected to mpv IPC at %s", self.path)
+            return self._writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    _LOGGER.debug("Ignoring malformed mpv IPC message: %r", line)
+                    continue
+
+                self._dispatch(message)
+        except OSError as e:
+            _LOGGER.debug("mpv IPC connection lost: %s", e)
+        finally:
+            # don't tear down a connection that has already replaced this one
+            if self._reader is reader:
+                self._reset(ConnectionResetError("mpv IPC connection closed"))
+
+    def _dispatch(self, message: dict[str, Any]) -> None:
+        if "event" in message:
+            _ = self.on_event and self.on_event(message)
+            return
+
+        request_id = message.get("request_id")
+        if request_id is None or "error" not in message:
+            return
+
+        future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(cast("MPVResponse", message))
+
+    def _reset(self, exc: BaseException) -> None:
+        was_connected = self._writer is not None
+
+        if self._writer is not None:
+            self._writer.close()
+
+        self._reader = self._writer = None
+        _ = was_connected and self.on_disconnect and self.on_disconnect()
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+        self._pending.clear()
+
+    async def _send(self, commands: list[list[Any]]) -> list[MPVResponse]:
+        writer = await self._ensure_connected()
+        loop = asyncio.get_running_loop()
+        request_ids: list[int] = []
+        payload: list[bytes] = []
 
-    else:
+        for command in commands:
+            request_id = next(self._request_ids)
+            self._pending[request_id] = loop.create_future()
+            request_ids.append(request_id)
+            payload.append(
+                json.dumps({"command": command, "request_id": request_id}).encode()
+                + b"\n"
+            )
 
-        @staticmethod
-        async def _send_command(command: bytes) -> bytes:
+        futures = [self._pending[i] for i in request_ids]
+
+        try:
+            # pipeline everything in a single write
+            writer.write(b"".join(payload))
+            await writer.drain()
+            return await asyncio.wait_for(
+                asyncio.gather(*futures), timeout=IPC_TIMEOUT_SECONDS
+            )
+        finally:
+            for request_id, future in zip(request_ids, futures):
+                self._pending.pop(request_id, None)
+                # mark sibling failures as retrieved
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    async def send_commands(
+        self, commands: list[list[Any]]
+    ) -> list[MPVResponse] | None:
+        # a stale connection gets retried once,
+        # this is how a restarted mpv is picked up transparently
+        for _ in range(2 if self.connected else 1):
             try:
-                reader, writer = await asyncio.open_unix_connection(
-                    MPVIPCPoller.ipc_path,
-                )
-                writer.write(command)
-                await writer.drain()
-
-                while not (
-                    b"error" in (response := await reader.readline())
-                    and b'"request_id":0' in response
-                    and b'"data"' in response
-                ):
-                    continue
+                return await self._send(commands)
+            except (asyncio.TimeoutError, TimeoutError):
+                _LOGGER.debug("mpv IPC request timed out, dropping connection")
+                self._reset(ConnectionResetError("mpv IPC request timed out"))
+                break
+            except OSError as e:
+                _LOGGER.debug("mpv IPC request failed: %s", e)
+                self._reset(e)
+
+        return None
+
+    async def close(self) -> None:
+        self._reset(ConnectionResetError("mpv IPC client closed"))
+
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._reader_task
+            self._reader_task = None
+
 
-                writer.close()
-                await writer.wait_closed()
-            except (
-                ConnectionRefusedError,
-                ConnectionResetError,
-                FileNotFoundError,
-            ):
-                return b"{}"
-            else:
-                return response
+class MPVIPCPoller(BasePoller):
+    # TODO: allow for custom paths
+    ipc_path = "\\\\.\\pipe\\mpv-pipe" if os.name == "nt" else "/tmp/mpvsocket"  # noqa: S108
+
+    supports_observe = True
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.client = MPVIPCClient(
+            self.ipc_path,
+            on_event=self._on_event,
+            on_disconnect=self._on_disconnect,
+        )
+        self._observed: dict[str, Any] = {}
+        self._observed_generation = 0
+        self._changed = asyncio.Event()
 
     @classmethod
     def origin(cls) -> str:
@@ -158,39 +309,128 @@ class MPVIPCPoller(BasePoller):
     def display_name(self) -> str:
         return "mpv"
 
-    @staticmethod
-    async def send_command(command: MPVCommand) -> MPVResponse:
-        cmd_json = json.dumps(command) + "\n"
-        response = await MPVIPCPoller._send_command(cmd_json.encode("utf-8"))
-        return json.loads(response.decode("utf-8"))
+    @property
+    def reachable(self) -> bool:
+        return self.client.connected
+
+    async def send_command(self, command: MPVCommand) -> MPVResponse | None:
+        responses = await self.client.send_commands([command["command"]])
+        return responses[0] if responses else None
 
     @staticmethod
+    def _typecast_response(
+        response: MPVResponse,
+        typecast: Callable[[str], T],
+    ) -> T | None:
+        return typecast(data) if (data := response.get("data")) is not None else None
+
     async def get_property(
+        self,
         property_: str,
         /,
         typecast: Callable[[str], T] = str,
     ) -> T | None:
         command: MPVCommand = {"command": ["get_property_string", property_]}
-        response = await MPVIPCPoller.send_command(command)
-        if not response:
+        if not (response := await self.send_command(command)):
             return None
 
-        return typecast(data) if (data := response["data"]) is not None else None
+        return self._typecast_response(response, typecast)
 
     @staticmethod
     def _typecast_playlist(data: str) -> list[MPVPlaylistEntry]:
         return json.loads(data)
 
+    def _on_event(self, message: dict[str, Any]) -> None:
+        event = message["event"]
+        if event == "property-change":
+            if (name := message.get("name")) not in OBSERVED_PROPERTIES:
+                return
+            self._observed[name] = message.get("data")
+        elif event not in OBSERVED_EVENTS:
+            return
+
+        self._changed.set()
+
+    def _on_disconnect(self) -> None:
+        self._observed.clear()
+        self._changed.set()
+
+    async def _ensure_observing(self) -> bool:
+        if (
+            self.client.connected
+            and self._observed_generation == self.client.generation
+        ):
+            return True
+
+        # mpv sends the current value of each property right away
+        responses = await self.client.send_commands(
+            [
+                ["observe_property", i, name]
+                for i, name in enumerate(OBSERVED_PROPERTIES, 1)
+            ]
+        )
+        if not responses:
+            return False
+
+        _LOGGER.debug("Observing mpv properties: %s", ", ".join(OBSERVED_PROPERTIES))
+        self._observed_generation = self.client.generation
+        return True
+
+    async def wait_for_change(self, timeout: float) -> None:
+        if not await self._ensure_observing():
+            # mpv isn't running, check again later
+            await asyncio.sleep(timeout)
+            return
+
+        await self._changed.wait()
+        await asyncio.sleep(OBSERVE_SETTLE_SECONDS)
+        self._changed.clear()
+
+    async def _get_observed_vars(self) -> Vars | None:
+        if not await self._ensure_observing():
+            return None
+
+        observed = self._observed
+        playlist = observed.get("playlist")
+        working_dir = observed.get("working-directory")
+        paused = observed.get("pause")
+        duration = observed.get("duration")
+
+        if (
+            playlist is None
+            or working_dir is None
+            or paused is None
+            or duration is None
+        ):
+            return None
+
+        if (position := await self.get_property("time-pos", float)) is None:
+            return None
+
+        return _get_mpv_vars(
+            playlist=playlist,
+            working_dir=working_dir,
+            paused=paused,
+            position=position,
+            duration=duration,
+        )
+
     async def get_vars(self, client: aiohttp.ClientSession) -> Vars | None:
-        # FIXME: is there a way to do this in batch?
-        playlist = await MPVIPCPoller.get_property(
-            "playlist",
-            MPVIPCPoller._typecast_playlist,
+        if self.observing:
+            return await self._get_observed_vars()
+
+        responses = await self.client.send_commands(
+            [["get_property_string", p] for p in IPC_PROPERTIES]
         )
-        working_dir = await MPVIPCPoller.get_property("working-directory", str)
-        paused = await MPVIPCPoller.get_property("pause", lambda x: x == "yes")
-        position = await MPVIPCPoller.get_property("time-pos", float)
-        duration = await MPVIPCPoller.get_property("duration", float)
+        if not responses:
+            return None
+
+        typecast = self._typecast_response
+        playlist = typecast(responses[0], MPVIPCPoller._typecast_playlist)
+        working_dir = typecast(responses[1], str)
+        paused = typecast(responses[2], lambda x: x == "yes")
+        position = typecast(responses[3], float)
+        duration = typecast(responses[4], float)
 
         if (
             playlist is None
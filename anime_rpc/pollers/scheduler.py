@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import logging
+import random
+from enum import StrEnum, auto
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from anime_rpc.states import WatchingState
+
+if TYPE_CHECKING:
+    from anime_rpc.pollers.base_poller import Vars
+
+_LOGGER = logging.getLogger("scheduler")
+
+# how fast to poll right after a transition (file change, seek, pause)
+FAST_INTERVAL = 0.25
+# upper bound for the backoff while the player is absent or failing
+MAX_BACKOFF = 15.0
+# anything beyond this is considered a seek
+SEEK_TOLERANCE_MS = 2_000
+
+
+class ScheduleReason(StrEnum):
+    STEADY = auto()
+    TRANSITION = auto()
+    ABSENT = auto()
+    FAILING = auto()
+
+
+class PollScheduler:
+    """Decides how long a poller should wait before its next poll.
+
+    Backs off exponentially (with jitter) while the player is absent or
+    failing, polls fast right after a transition and then settles
+    geometrically back to the steady interval.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        steady_interval: float,
+        *,
+        fast_interval: float = FAST_INTERVAL,
+        max_backoff: float = MAX_BACKOFF,
+    ) -> None:
+        self.name = name
+        self.steady_interval = steady_interval
+        self.fast_interval = min(fast_interval, steady_interval)
+        self.max_backoff = max(max_backoff, steady_interval)
+        self.interval = steady_interval
+        self.reason = ScheduleReason.STEADY
+        self._misses = 0
+        self._last_vars: Vars | None = None
+        self._last_time = 0.0
+
+    def _is_transition(self, vars_: Vars, now: float) -> bool:
+        if (last := self._last_vars) is None:
+            return True
+
+        if (last["file"], last["filedir"], last["state"]) != (
+            vars_["file"],
+            vars_["filedir"],
+            vars_["state"],
+        ):
+            return True
+
+        expected = last["position"]
+        if vars_["state"] == WatchingState.PLAYING:
+            expected += (now - self._last_time) * 1_000
+
+        return abs(vars_["position"] - expected) > SEEK_TOLERANCE_MS
+
+    def _backoff(self) -> float:
+        self._misses += 1
+        ceiling = min(
+            self.max_backoff, self.steady_interval * 2 ** min(self._misses, 16)
+        )
+        # jitter so that absent pollers don't wake up in lockstep
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def schedule(self, vars_: Vars | None, *, failed: bool = False) -> float:
+        now = perf_counter()
+
+        if failed or vars_ is None:
+            reason = ScheduleReason.FAILING if failed else ScheduleReason.ABSENT
+            interval = self._backoff()
+        elif self._is_transition(vars_, now):
+            self._misses = 0
+            reason = ScheduleReason.TRANSITION
+            interval = self.fast_interval
+        elif self.reason is ScheduleReason.TRANSITION:
+            interval = min(self.interval * 2, self.steady_interval)
+            reason = (
+                ScheduleReason.TRANSITION
+                if interval < self.steady_interval
+                else ScheduleReason.STEADY
+            )
+        else:
+            reason = ScheduleReason.STEADY
+            interval = self.steady_interval
+
+        if reason is not ScheduleReason.STEADY or self.reason != reason:
+            _LOGGER.debug(
+                "Next %s poll in %.2fs (%s)", self.name, interval, reason.value
+            )
+
+        self._last_vars = vars_
+        self._last_time = now
+        self.reason = reason
+        self.interval = interval
+        return interval
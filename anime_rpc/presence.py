@@ -4,14 +4,17 @@ import logging
 import time
 from asyncio import Future
 from enum import Flag, IntEnum, auto
+from time import perf_counter
 from typing import Any, TypedDict, cast
 
 from typing_extensions import Unpack
 
 from anime_rpc.cli import CLI_ARGS
+from anime_rpc.discord_client import DEFAULT_ANIME_APPLICATION_ID, DiscordClient
 from anime_rpc.formatting import ms2timestamp, quote
-from anime_rpc.social_sdk import DEFAULT_ANIME_APPLICATION_ID, Discord
+from anime_rpc.metrics import ACK_DURATION, PRESENCE_UPDATES, RENDER_DURATION
 from anime_rpc.states import State, WatchingState, compare_states
+from anime_rpc.tracing import TRACER
 
 ASSETS = {
     "PLAYING": "https://raw.githubusercontent.com/norinorin/anime_rpc/refs/heads/main/assets/play.png?raw=true",
@@ -81,19 +84,36 @@ class UpdateFlag(Flag):
 
 
 class Presence:
-    def __init__(self, client: Discord) -> None:
+    """Renders states into activities for the Discord client.
+
+    Updates wait for Discord's acknowledgement unless `wait_for_ack` is off,
+    which a rate limited client needs so that newer states can replace
+    an update it's holding back. The update is `last_update` either way.
+    """
+
+    def __init__(self, client: DiscordClient, *, wait_for_ack: bool = True) -> None:
         self._client = client
+        self._wait_for_ack = wait_for_ack
         self._last_kwargs: dict[str, Any] = {}
         self._append_space = False
+        self.last_update: Future[bool] | None = None
 
     def _update(
         self,
         application_id: int | str,
         *args: tuple[Any, ...],
+        trace: State,
         **kwargs: Unpack[ActivityOptions],
     ) -> Future[bool]:
         self._client.set_application_id(application_id)
         future: Future[bool] = Future()
+        start = perf_counter()
+
+        def _on_ack(_: Future[bool]) -> None:
+            ACK_DURATION.observe(perf_counter() - start)
+            TRACER.record("ack", trace, start)
+
+        future.add_done_callback(_on_ack)
         self._client.set_activity(*args, **kwargs, future=future)  # type: ignore[reportCallIssue]
         return future
 
@@ -101,6 +121,7 @@ class Presence:
         # only clear activity if last state is not empty
         if last_state:
             _LOGGER.info("Clearing presence...")
+            PRESENCE_UPDATES.inc(result="cleared")
             self._client.clear_activity()
             self._last_kwargs = {}
 
@@ -211,6 +232,7 @@ class Presence:
         if not state:
             return self._clear(last_state)
 
+        start = perf_counter()
         if not all(
             k in state
             for k in ("title", "episode", "position", "duration", "rewatching")
@@ -270,6 +292,7 @@ class Presence:
             # if the two are the same
             # ignore update request unless flags are set
             if not flags:
+                PRESENCE_UPDATES.inc(result="suppressed")
                 return state
 
             if UpdateFlag.PERIODIC_UPDATE in flags:
@@ -290,28 +313,38 @@ class Presence:
                     kwargs["small_text"].rstrip() + " " * self._append_space
                 )
 
-        _LOGGER.debug("Updating presence with kwargs: %s", kwargs)
-        _LOGGER.debug(
-            "Setting presence to [%s] %s @ %s",
-            watching_state.name,
-            f"{state['title']}"
-            + f" E{state['episode']}" * (not state_opts["is_movie"]),
-            ms2timestamp(state["position"]),
-        )
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Updating presence with kwargs: %s", kwargs)
+            _LOGGER.debug(
+                "Setting presence to [%s] %s @ %s",
+                watching_state.name,
+                f"{state['title']}"
+                + f" E{state['episode']}" * (not state_opts["is_movie"]),
+                ms2timestamp(state["position"]),
+            )
 
-        success = await self._update(application_id, **kwargs)
+        RENDER_DURATION.observe(perf_counter() - start)
+        TRACER.record("render", state, start)
+        PRESENCE_UPDATES.inc(result="sent")
+        self.last_update = self._update(application_id, trace=state, **kwargs)
         self._last_kwargs = kwargs
+        if self._wait_for_ack:
+            await self.last_update
 
         # if it's seeking or a periodic update,
         # do not log as it's either spammy or
         # has already been logged
-        if success and not flags:
-            _LOGGER.info(
-                "Presence set to [%s] %s @ %s",
-                watching_state.name,
-                f"{state['title']}"
-                + f" E{state['episode']}" * (not state_opts["is_movie"]),
-                ms2timestamp(state["position"]),
+        if not flags:
+            message = (
+                f"[{watching_state.name}] {state['title']}"
+                + f" E{state['episode']}" * (not state_opts["is_movie"])
+                + f" @ {ms2timestamp(state['position'])}"
             )
 
+            def _log(future: Future[bool]) -> None:
+                if not future.cancelled() and future.result():
+                    _LOGGER.info("Presence set to %s", message)
+
+            self.last_update.add_done_callback(_log)
+
         return state
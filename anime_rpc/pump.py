@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable
+
+from anime_rpc.metrics import PUMP_WAKEUPS
+
+_LOGGER = logging.getLogger("pump")
+
+# while requests are in flight, callbacks are run this often
+BUSY_INTERVAL = 1 / 500
+# otherwise just often enough to keep the SDK's own connection going
+IDLE_INTERVAL = 0.5
+
+
+class CallbackPump:
+    """Runs the SDK callbacks only as often as there's something to run.
+
+    Callbacks are pumped every `busy_interval` seconds while requests are in
+    flight (see `begin` and `done`) or while `busy` says so, and every
+    `idle_interval` seconds otherwise. `wake` runs them right away, e.g.,
+    after submitting new work.
+    """
+
+    def __init__(
+        self,
+        run_callbacks: Callable[[], None],
+        *,
+        busy: Callable[[], bool] = lambda: False,
+        busy_interval: float = BUSY_INTERVAL,
+        idle_interval: float = IDLE_INTERVAL,
+    ) -> None:
+        self.busy_interval = busy_interval
+        self.idle_interval = idle_interval
+        self._run_callbacks = run_callbacks
+        self._busy = busy
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    @property
+    def busy(self) -> bool:
+        return self._in_flight > 0 or self._busy()
+
+    def begin(self) -> None:
+        """A request was submitted, its callback is yet to run."""
+        with self._lock:
+            self._in_flight += 1
+
+        self._wakeup.set()
+
+    def done(self) -> None:
+        """The callback of a request has run."""
+        with self._lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def run(self, alive: Callable[[], bool]) -> None:
+        """Pump callbacks until `alive` returns False, call `wake` to stop."""
+        _LOGGER.debug("Pumping callbacks")
+        while alive():
+            self._run_callbacks()
+
+            busy = self.busy
+            kicked = self._wakeup.wait(
+                self.busy_interval if busy else self.idle_interval
+            )
+            self._wakeup.clear()
+            PUMP_WAKEUPS.inc(reason="kicked" if kicked else "busy" if busy else "idle")
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from asyncio import Future
+from time import perf_counter
+from typing import Any
+
+from anime_rpc.discord_client import DiscordClient
+from anime_rpc.metrics import RATE_LIMITED
+
+_LOGGER = logging.getLogger("rate_limit")
+
+# Discord allows 5 activity updates every 20 seconds
+DEFAULT_BURST = 5
+DEFAULT_PERIOD = 20.0
+
+
+class TokenBucket:
+    def __init__(self, burst: int, period: float) -> None:
+        self.burst = burst
+        # seconds it takes to earn a single token back
+        self.refill_time = period / burst
+        self._tokens = float(burst)
+        self._last = perf_counter()
+
+    def _refill(self) -> None:
+        now = perf_counter()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._last) / self.refill_time
+        )
+        self._last = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+        return True
+
+    def time_until_token(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self._tokens) * self.refill_time)
+
+
+class RateLimitedClient(DiscordClient):
+    """Keeps presence updates within Discord's rate limit.
+
+    While the bucket is empty, only the latest update (or clear) is kept,
+    superseded ones resolve to False. It's sent as soon as a token frees up
+    so the final state always goes through.
+    """
+
+    def __init__(
+        self,
+        client: DiscordClient,
+        *,
+        burst: int = DEFAULT_BURST,
+        period: float = DEFAULT_PERIOD,
+    ) -> None:
+        self._client = client
+        self._bucket = TokenBucket(burst, period)
+        self._application_id: int | str | None = None
+        # (application ID, activity or None to clear, future)
+        self._pending: (
+            tuple[int | str | None, dict[str, Any] | None, Future[bool] | None] | None
+        ) = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    @property
+    def current_activity(self) -> dict[str, Any]:  # type: ignore[reportIncompatibleVariableOverride]
+        return self._client.current_activity
+
+    def start(self) -> None:
+        self._client.start()
+
+    def stop(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self._supersede()
+        self._client.stop()
+
+    def dump_logs(self) -> None:
+        self._client.dump_logs()
+
+    def set_application_id(self, application_id: int | str) -> None:
+        # applied right before the activity it belongs to is sent
+        self._application_id = application_id
+
+    def set_activity(
+        self,
+        state: str,
+        details: str,
+        state_url: str = "",
+        details_url: str = "",
+        type_: int = 0,
+        small_text: str = "",
+        small_image: str = "",
+        small_url: str = "",
+        large_text: str = "",
+        large_image: str = "",
+        large_url: str = "",
+        buttons: list[dict[str, str]] | None = None,
+        start: int = 0,
+        end: int = 0,
+        status_display_type: int = 0,
+        *,
+        future: Future[bool] | None = None,
+    ) -> Future[bool] | None:
+        activity: dict[str, Any] = {
+            "state": state,
+            "details": details,
+            "state_url": state_url,
+            "details_url": details_url,
+            "type_": type_,
+            "small_text": small_text,
+            "small_image": small_image,
+            "small_url": small_url,
+            "large_text": large_text,
+            "large_image": large_image,
+            "large_url": large_url,
+            "buttons": buttons,
+            "start": start,
+            "end": end,
+            "status_display_type": status_display_type,
+        }
+        self._submit(activity, future)
+        return future
+
+    def clear_activity(self) -> None:
+        self._submit(None, None)
+
+    def _send(
+        self,
+        application_id: int | str | None,
+        activity: dict[str, Any] | None,
+        future: Future[bool] | None,
+    ) -> None:
+        if activity is None:
+            self._client.clear_activity()
+            return
+
+        if application_id is not None:
+            self._client.set_application_id(application_id)
+
+        self._client.set_activity(**activity, future=future)
+
+    def _supersede(self) -> None:
+        if self._pending is None:
+            return
+
+        if (future := self._pending[2]) and not future.done():
+            future.set_result(False)
+
+        self._pending = None
+
+    def _submit(
+        self, activity: dict[str, Any] | None, future: Future[bool] | None
+    ) -> None:
+        # anything queued is stale now, and sending this one right away would
+        # overtake it anyway
+        if self._pending is not None:
+            RATE_LIMITED.inc(outcome="coalesced")
+            self._supersede()
+        elif self._bucket.try_acquire():
+            self._send(self._application_id, activity, future)
+            return
+        else:
+            RATE_LIMITED.inc(outcome="deferred")
+
+        self._pending = self._application_id, activity, future
+        if self._flush_handle is None:
+            delay = self._bucket.time_until_token()
+            _LOGGER.debug("Rate limited, sending the latest update in %.2fs", delay)
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                delay, self._flush
+            )
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        if self._pending is None:
+            return
+
+        if not self._bucket.try_acquire():
+            # woke up a hair early
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._bucket.time_until_token(), self._flush
+            )
+            return
+
+        pending, self._pending = self._pending, None
+        self._send(*pending)
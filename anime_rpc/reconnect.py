@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import logging
+import random
+from time import perf_counter
+
+_LOGGER = logging.getLogger("reconnect")
+
+# first retry after this many seconds, doubling on every failed attempt
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+
+class Reconnector:
+    """Tracks whether Discord is reachable and when to try again.
+
+    `online` is None until the first connection or disconnection is seen.
+    Retries back off exponentially with jitter, so that restarting Discord
+    doesn't get hammered by every client at once.
+    """
+
+    def __init__(self, *, base: float = BASE_DELAY, cap: float = MAX_DELAY) -> None:
+        self.base = base
+        self.cap = cap
+        self.online: bool | None = None
+        self.attempts = 0
+        self._disconnected_at: float | None = None
+        self._deadline: float | None = None
+
+    def connected(self) -> float | None:
+        """Mark Discord as reachable, returns the downtime if it was a reconnect."""
+        downtime = None
+        if self._disconnected_at is not None:
+            downtime = perf_counter() - self._disconnected_at
+
+        self.online = True
+        self.attempts = 0
+        self._disconnected_at = None
+        self._deadline = None
+        return downtime
+
+    def disconnected(self, *, retry: bool) -> None:
+        """Mark Discord as unreachable, scheduling a retry if `retry` is set."""
+        now = perf_counter()
+        if self._disconnected_at is None:
+            self._disconnected_at = now
+
+        self.online = False
+        if not retry or self._deadline is not None:
+            return
+
+        ceiling = min(self.cap, self.base * 2 ** min(self.attempts, 16))
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        self.attempts += 1
+        _LOGGER.debug("Reconnecting in %.2fs (attempt %d)", delay, self.attempts)
+        self._deadline = now + delay
+
+    def forget(self) -> None:
+        """Stop retrying, the next attempt is up to whoever calls `connected`."""
+        self.online = None
+        self._deadline = None
+
+    def due(self) -> bool:
+        """Whether it's time to try connecting again."""
+        if self._deadline is None or perf_counter() < self._deadline:
+            return False
+
+        self._deadline = None
+        return True
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Iterator
+from time import perf_counter
+from typing import TYPE_CHECKING, TextIO
+
+from anime_rpc.asyncio_helper import Bail, wait
+from anime_rpc.states import State, WatchingState
+from anime_rpc.tracing import TRACE_KEYS, new_trace, stamp
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from anime_rpc.mailbox import Mailbox
+
+_LOGGER = logging.getLogger("replay")
+
+
+class StateRecorder:
+    """Appends every state posted to the mailbox to a JSON-lines log.
+
+    Each line is `[seconds since the recording started, state]`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._file: TextIO | None = None
+        self._start = 0.0
+
+    def open(self) -> None:
+        # line buffered so that a crash keeps everything up to it
+        self._file = self._path.open("a", encoding="utf-8", buffering=1)
+        self._start = perf_counter()
+        _LOGGER.info("Recording states to %s", self._path)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, state: State) -> None:
+        if self._file is None:
+            return
+
+        # traces are regenerated on replay
+        state = State(**state)
+        for key in TRACE_KEYS:
+            state.pop(key, None)
+
+        t = round(perf_counter() - self._start, 4)
+        self._file.write(json.dumps([t, state], separators=(",", ":")) + "\n")
+
+
+def read_recording(path: Path) -> Iterator[tuple[float, State]]:
+    # a recording may span several sessions, each starting over at 0
+    offset = last = 0.0
+
+    with path.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+
+            try:
+                t, state = json.loads(line)
+            except ValueError:
+                _LOGGER.warning("Skipping malformed line %d in %s", lineno, path)
+                continue
+
+            if t < last:
+                offset += last
+            last = t
+
+            if "watching_state" in state:
+                state["watching_state"] = WatchingState(state["watching_state"])
+
+            yield offset + t, state
+
+
+async def replay_states(
+    path: Path, mailbox: Mailbox, event: asyncio.Event, *, fast: bool = False
+) -> None:
+    """Feed a recording back into the mailbox.
+
+    At real speed, states are posted with their original spacing. Otherwise
+    they're posted as soon as the consumer has taken the previous one, so
+    nothing gets coalesced and the consumer path runs at full throughput.
+    """
+    count = 0
+    start = perf_counter()
+
+    try:
+        for t, state in read_recording(path):
+            if fast:
+                await wait(mailbox.wait_consumed(), event)
+            elif (delay := t - (perf_counter() - start)) > 0:
+                await wait(asyncio.sleep(delay), event)
+
+            new_trace()
+            mailbox.put(stamp(state))
+            count += 1
+
+        await wait(mailbox.wait_consumed(), event)
+    except Bail:
+        return
+
+    elapsed = perf_counter() - start
+    _LOGGER.info(
+        "Replayed %d states in %.2fs (%.1f states/s)",
+        count,
+        elapsed,
+        count / elapsed if elapsed else 0,
+    )
@@ -1,29 +1,39 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import itertools
+import json
 import logging
+import os
 import re
 import sys
 import threading
 import time
 from asyncio import Future
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntEnum
-from typing import Any, Callable, overload
+from functools import partial
+from typing import Any, Callable, NamedTuple, overload
 from importlib.resources import files
+from pathlib import Path
+from time import perf_counter
 
 import cffi
 import keyring
 
+from anime_rpc.cache import APPLICATION_IDS_PATH, FFI_CACHE_DIR
 from anime_rpc.cli import CLI_ARGS
-
-DEFAULT_ANIME_APPLICATION_ID = 1088900742523392133
-GENERIC_STREAM_APPLICATION_ID = 1337621628179316848
-
-# can't make my mind up on the naming
-# so allow for aliases
-APPLICATION_ID_REPLACE_MAP: dict[str, int] = {
-    "default": DEFAULT_ANIME_APPLICATION_ID,
-    "anime": DEFAULT_ANIME_APPLICATION_ID,
-    "stream": GENERIC_STREAM_APPLICATION_ID,
-    "generic": GENERIC_STREAM_APPLICATION_ID,
-}
+from anime_rpc.discord_client import (
+    DEFAULT_ANIME_APPLICATION_ID,
+    MAX_BUTTONS,
+    DiscordClient,
+    resolve_application_id,
+)
+from anime_rpc.metrics import RECONNECTS, RESTORE_DURATION, SDK_CALL_DURATION
+from anime_rpc.pump import CallbackPump
+from anime_rpc.reconnect import Reconnector
 
 DISCORD_API_PATTERN = re.compile(r"\bDISCORD_API\b")
 PREPROCESSOR_LINE_PATTERN = re.compile("^#.*$", re.MULTILINE)
@@ -32,7 +42,17 @@ CPPLUS_BLOCK_PATTERN = re.compile(
 )
 SCOPES = "sdk.social_layer_presence openid"
 SERVICE_NAME = "anime_rpc"
-MAX_BUTTONS = 2
+# access tokens are refreshed this long before they expire,
+# or halfway through if they don't last much longer than this
+TOKEN_REFRESH_MARGIN = 300
+# clients kept around by DiscordPool
+DEFAULT_POOL_SIZE = 3
+# encoded strings kept around for reuse, see CStringCache
+MAX_CACHED_STRINGS = 64
+# these replace each other, see Discord._run_commands
+ACTIVITY_COMMANDS = frozenset(("set_activity", "clear_activity"))
+# SDK log lines that don't make it to logging are kept around for dumping
+SDK_LOG_SIZE = 500
 
 
 def strip_preprocessor_directives(header_text: str) -> str:
@@ -60,9 +80,54 @@ LIB_NAME = (
 if not LIB_NAME:
     raise RuntimeError(f"Unsupported platform: {sys.platform}")
 
-ffi = cffi.FFI()
-ffi.cdef(strip_preprocessor_directives((INCLUDE_PATH / "cdiscord.h").read_text()))
-C = ffi.dlopen(str(LIB_PATH / LIB_NAME))
+
+def load_ffi() -> Any:
+    """Get the FFI for the SDK header without parsing it every time.
+
+    The parsed header is saved as an out-of-line (ABI mode) module in the
+    cache directory, keyed by the hash of the header and the cffi version.
+    """
+    header = (INCLUDE_PATH / "cdiscord.h").read_text()
+    digest = hashlib.sha256(f"{cffi.__version__}\0{header}".encode()).hexdigest()
+    module_name = f"_cdiscord_{digest[:16]}"
+    path = FFI_CACHE_DIR / f"{module_name}.py"
+
+    if not path.exists():
+        _LOGGER.debug("Parsing %s, caching it to %s", "cdiscord.h", path)
+        builder = cffi.FFI()
+        builder.cdef(strip_preprocessor_directives(header))
+        builder.set_source(module_name, None, compiler_verbose=False)
+        try:
+            FFI_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # another instance could be writing it too
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            builder.emit_python_code(str(tmp))
+            os.replace(tmp, path)
+        except OSError as e:
+            _LOGGER.warning("Failed to cache the parsed SDK header: %s", e)
+            return builder
+
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ffi
+
+
+ffi = load_ffi()
+# the library is only loaded once a client starts so that this module
+# (and the callbacks below) can be imported without it
+C: Any = None
+
+
+def load_library() -> Any:
+    global C
+
+    if C is None:
+        _LOGGER.debug("Loading %s", LIB_NAME)
+        C = ffi.dlopen(str(LIB_PATH / LIB_NAME))  # type: ignore[reportConstantRedefinition]
+
+    return C
 
 
 def _dec_c_str(msg: cffi.FFI.CData) -> str:
@@ -88,6 +153,48 @@ def _enc_c_str(msg: str) -> tuple[cffi.FFI.CData, cffi.FFI.CData]:
     return discord_string_ptr, buffer  # type: ignore
 
 
+class CStringCache:
+    """Encoded `Discord_String`s, keyed by the Python string they hold.
+
+    The SDK copies whatever it keeps, so a buffer only has to outlive the
+    call it's passed to. Titles, image URLs and display names rarely change,
+    so most fields of an activity reuse the buffers of the previous one.
+    """
+
+    def __init__(self, maxsize: int = MAX_CACHED_STRINGS) -> None:
+        self.maxsize = maxsize
+        self._strings: OrderedDict[str, tuple[cffi.FFI.CData, cffi.FFI.CData]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def get(self, text: str) -> cffi.FFI.CData:
+        """Get a `Discord_String *` holding `text`, NULL if it's empty."""
+        if not text:
+            return ffi.NULL
+
+        if (entry := self._strings.get(text)) is not None:
+            self._strings.move_to_end(text)
+            return entry[0]
+
+        entry = self._strings[text] = _enc_c_str(text)
+        if len(self._strings) > self.maxsize:
+            self._strings.popitem(last=False)
+
+        return entry[0]
+
+
+def _resolve(future: Future[bool], result: bool) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _resolve_threadsafe(future: Future[bool], result: bool) -> None:
+    future.get_loop().call_soon_threadsafe(_resolve, future, result)
+
+
 def _handle_discord_error(
     scope: str, error: cffi.FFI.CData, convert: cffi.FFI.CData
 ) -> None:
@@ -104,31 +211,76 @@ class LoggingSeverity(IntEnum):
     ERROR = 4
     NONE = 5
 
+    @classmethod
+    def for_level(cls, level: int) -> LoggingSeverity:
+        """The least severe SDK logs worth having at the given logging level."""
+        if level <= logging.DEBUG:
+            return cls.VERBOSE
+        if level <= logging.INFO:
+            return cls.INFO
+        if level <= logging.WARNING:
+            return cls.WARNING
+        return cls.ERROR
+
+
+class SDKLog:
+    """Ring buffer of the SDK log lines that don't go through logging.
+
+    Lines are kept as bytes and only decoded when dumped, on errors
+    or on demand.
+    """
+
+    def __init__(self, size: int = SDK_LOG_SIZE) -> None:
+        self._lines: deque[tuple[int, bytes]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def append(self, severity: int, line: bytes) -> None:
+        with self._lock:
+            self._lines.append((severity, line))
+
+    def dump(self) -> None:
+        with self._lock:
+            lines, self._lines = self._lines, deque(maxlen=self._lines.maxlen)
+
+        if not lines:
+            return
+
+        _LOGGER.info(
+            "Last %d SDK log lines:\n%s",
+            len(lines),
+            "\n".join(
+                f"[{LoggingSeverity(severity).name}] "
+                + line.decode("utf-8", "replace").strip()
+                for severity, line in lines
+            ),
+        )
+
+
+SDK_LOG = SDKLog()
+
 
 @ffi.callback("void(Discord_String, Discord_LoggingSeverity, void *)")
 def _log_callback(message_struct, severity, user_data) -> None:  # type: ignore
-    message = _dec_c_str(message_struct).strip()  # type: ignore
-    severity = LoggingSeverity(severity)
-    instance = ffi.from_handle(user_data)  # type: ignore
+    instance, ceiling = ffi.from_handle(user_data)  # type: ignore
+    # lines this severe are delivered to an earlier registered callback too
+    if severity >= ceiling or not message_struct.ptr:
+        return
 
-    assert isinstance(message, str)
-    if severity == LoggingSeverity.ERROR:
-        _LOGGER.error("Log callback: %s", message)
+    # raised since this callback was registered
+    if severity < instance.log_severity:
+        return
+
+    line: bytes = ffi.buffer(message_struct.ptr, message_struct.size)[:]  # type: ignore
+    if severity >= LoggingSeverity.ERROR:
+        SDK_LOG.dump()
+        _LOGGER.error("Log callback: %s", line.decode("utf-8", "replace").strip())
+    elif severity > LoggingSeverity.VERBOSE and _LOGGER.isEnabledFor(logging.DEBUG):
+        _LOGGER.debug("Log callback: %s", line.decode("utf-8", "replace").strip())
     else:
-        _LOGGER.debug("Log callback: %s", message)
-
-    if (
-        "RPC Connect error: -4058" in message
-        and not instance.sent_disconnection_warning
-    ):
-        _LOGGER.error("Disconnected! Is Discord running?")
-        instance.sent_disconnection_warning = True
-    elif "RPC manager connected" in message:
-        instance.sent_disconnection_warning = False
-        _LOGGER.info("Connected to Discord!")
-        if instance.current_activity:
-            _LOGGER.info("Restoring current activity...")
-            instance.set_activity(**instance.current_activity)  # type: ignore
+        SDK_LOG.append(severity, line)
 
 
 @ffi.callback("void(Discord_Client_Status, Discord_Client_Error, int32_t, void *)")
@@ -136,18 +288,26 @@ def _status_changed_callback(status, error, error_detail, user_data):  # type: i
     status_ptr = ffi.new("Discord_String *")  # type: ignore
     C.Discord_Client_StatusToString(status, status_ptr)  # type: ignore
     _LOGGER.debug("Status changed: %s", _dec_c_str(status_ptr[0]))  # type: ignore
+    instance = ffi.from_handle(user_data)  # type: ignore
+    instance.status = status
 
-    if status == C.Discord_Client_Status_Ready:  # type: ignore
-        _LOGGER.info("Discord client is ready")
-    elif status == C.Discord_Client_Status_Disconnected:  # type: ignore
-        _LOGGER.info("Discord client is disconnected")
-    elif error != C.Discord_Client_Error_None:  # type: ignore
+    if error != C.Discord_Client_Error_None:  # type: ignore
         _handle_discord_error(
             "Status changed",
             error,  # type: ignore
             C.Discord_Client_ErrorToString,  # type: ignore
         )
 
+    if status == C.Discord_Client_Status_Ready:  # type: ignore
+        _LOGGER.info("Discord client is ready")
+        instance.on_connected()
+    elif status == C.Discord_Client_Status_Disconnected:  # type: ignore
+        _LOGGER.info("Discord client is disconnected")
+        # the gateway connection is only made once there's a token,
+        # the status says nothing about the local RPC connection
+        if instance.token_ready:
+            instance.on_disconnected()
+
 
 @ffi.callback("void(Discord_ClientResult *, Discord_String, Discord_String, void *)")
 def _authorize_callback(result_ptr, code, redirect_uri, user_data):  # type: ignore
@@ -156,6 +316,7 @@ def _authorize_callback(result_ptr, code, redirect_uri, user_data):  # type: ign
     try:
         if C.Discord_ClientResult_Successful(result_ptr):  # type: ignore
             _LOGGER.info("Getting access token...")
+            instance.begin_request()
 
             verifier_str_ptr = ffi.new("Discord_String *")  # type: ignore
             C.Discord_AuthorizationCodeVerifier_Verifier(  # type: ignore
@@ -177,6 +338,7 @@ def _authorize_callback(result_ptr, code, redirect_uri, user_data):  # type: ign
     finally:
         C.Discord_AuthorizationCodeVerifier_Drop(instance.code_verifier)  # type: ignore
         instance.code_verifier = None
+        instance.end_request()
 
 
 @ffi.callback(
@@ -192,9 +354,11 @@ def _token_exchange_callback(
     user_data,  # type: ignore
 ):
     instance = ffi.from_handle(user_data)  # type: ignore
+    instance.end_request()
 
     if C.Discord_ClientResult_Successful(result_ptr):  # type: ignore
-        _LOGGER.info("Access token received! Connecting...")
+        _LOGGER.info("Access token received! Updating...")
+        instance.begin_request()
         C.Discord_Client_UpdateToken(  # type: ignore
             instance.client,
             token_type,
@@ -203,11 +367,8 @@ def _token_exchange_callback(
             ffi.NULL,
             instance.self_handle,
         )
-        keyring.set_password(
-            SERVICE_NAME,
-            f"refresh_token:{instance.last_application_id}",
-            _dec_c_str(refresh_token),  # type: ignore
-        )
+        instance.save_refresh_token(_dec_c_str(refresh_token))  # type: ignore
+        instance.schedule_refresh(expires_in)
         return
 
     _handle_discord_error("Get token", result_ptr, C.Discord_ClientResult_Error)  # type: ignore
@@ -216,19 +377,49 @@ def _token_exchange_callback(
 @ffi.callback("void(Discord_ClientResult *, void *)")
 def _update_token_callback(result_ptr, user_data):  # type: ignore
     instance = ffi.from_handle(user_data)  # type: ignore
+    instance.end_request()
 
     if C.Discord_ClientResult_Successful(result_ptr):  # type: ignore
+        if instance.status != C.Discord_Client_Status_Disconnected:  # type: ignore
+            _LOGGER.info("Token refreshed")
+            return
+
         _LOGGER.info("Token updated, connecting to Discord...")
+        instance.token_ready = True
         C.Discord_Client_Connect(instance.client)  # type: ignore
         return
 
     _handle_discord_error("Update token", result_ptr, C.Discord_ClientResult_Error)  # type: ignore
 
 
+# presence updates waiting for their callback, keyed by the integer passed
+# as the user data. cheaper than a new handle for every update
+_PENDING_UPDATES: dict[int, tuple[Discord, Future[bool] | None]] = {}
+_update_keys = itertools.count(1)
+
+
+def _lost_connection(result: cffi.FFI.CData) -> bool:
+    """Whether `result` failed for want of a connection, not for its content."""
+    return C.Discord_ClientResult_Type(result) in (  # type: ignore
+        C.Discord_ErrorType_NetworkError,  # type: ignore
+        C.Discord_ErrorType_ClientNotReady,  # type: ignore
+    )
+
+
 @ffi.callback("void(Discord_ClientResult *, void *)")
 def _update_presence_callback(result_ptr, user_data):  # type: ignore
+    key = int(ffi.cast("uintptr_t", user_data))  # type: ignore
+    if (pending := _PENDING_UPDATES.pop(key, None)) is None:
+        # the client was dropped in the meantime
+        return
+
+    client, future = pending
+    client.end_request()
+
     if C.Discord_ClientResult_Successful(result_ptr):  # type: ignore
         _LOGGER.debug("Presence updated!")
+        # whatever was held back while offline still needs restoring
+        client.on_connected(restore=False)
         res = True
     else:
         _handle_discord_error(
@@ -236,100 +427,359 @@ def _update_presence_callback(result_ptr, user_data):  # type: ignore
             result_ptr,  # type: ignore
             C.Discord_ClientResult_Error,  # type: ignore
         )
+        # without OAuth2 the presence goes through the local RPC connection,
+        # which doesn't change the client status, this is all there is to go by
+        if not CLI_ARGS.use_oauth2 and _lost_connection(result_ptr):
+            client.on_disconnected()
         res = False
 
-    if not user_data:
+    if future is None:
         return
 
-    future: Future[bool] = ffi.from_handle(user_data)  # type: ignore
-    future.get_loop().call_soon_threadsafe(future.set_result, res)
+    _resolve_threadsafe(future, res)
+
 
+class _Command(NamedTuple):
+    name: str
+    run: Callable[[], None]
+    future: Future[bool] | None = None
 
-class Discord:
-    def __init__(self) -> None:
+
+class Discord(DiscordClient):
+    """Discord Social SDK backend.
+
+    The SDK is only ever called from its own thread, which runs the commands
+    submitted by the public methods before pumping the callbacks. Keyring
+    I/O has a thread of its own so that neither blocks on it.
+    """
+
+    def __init__(self, *, pump: CallbackPump | None = None) -> None:
         self.last_application_id = None
         self.client = None  # type: ignore
         self.thread: threading.Thread | None = None
         self.code_verifier = None
-        self.sent_disconnection_warning = False
+        self.token_ready = False
+        self.link = Reconnector()
+        # the latest activity command that came in while offline
+        self._held: _Command | None = None
+        # SDK logs less severe than this are dropped, see _sync_log_severity
+        self.log_severity = LoggingSeverity.NONE
+        self._log_floor = LoggingSeverity.NONE
+        self._log_handles: list[Any] = []
         self.current_activity: dict[str, Any] = {}
         self.self_handle = None
+        self.status = 0  # Discord_Client_Status_Disconnected
+        # a pool's clients share the pump (and thread) of the pool
+        self.pump = pump or CallbackPump(self._run, busy=self._connecting)
+        # reused for every activity, only touched on the SDK thread
+        self._strings = CStringCache()
+        self._activity = ffi.new("Discord_Activity *")  # type: ignore
+        self._timestamps = ffi.new("Discord_ActivityTimestamps *")  # type: ignore
+        self._assets = ffi.new("Discord_ActivityAssets *")  # type: ignore
+        self._buttons = [
+            ffi.new("Discord_ActivityButton *")  # type: ignore
+            for _ in range(MAX_BUTTONS)
+        ]
+        self._display_type = ffi.new("Discord_StatusDisplayTypes *")  # type: ignore
+        self._commands: list[_Command] = []
+        self._commands_lock = threading.Lock()
+        self._keyring = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keyring")
+        # None if the keyring has none either
+        self._refresh_tokens: dict[int, str | None] = {}
+        self._refresh_deadline: float | None = None
+        # requests of this client the pump is waiting on
+        self._in_flight = 0
+
+    def _connecting(self) -> bool:
+        return self.client is not None and self.status not in (
+            C.Discord_Client_Status_Disconnected,  # type: ignore
+            C.Discord_Client_Status_Ready,  # type: ignore
+        )
+
+    def begin_request(self) -> None:
+        self._in_flight += 1
+        self.pump.begin()
+
+    def end_request(self) -> None:
+        if self._in_flight > 0:
+            self._in_flight -= 1
+            self.pump.done()
+
+    def _submit(
+        self, name: str, run: Callable[[], None], future: Future[bool] | None = None
+    ) -> None:
+        with self._commands_lock:
+            self._commands.append(_Command(name, run, future))
+
+        self.pump.wake()
+
+    def _run_commands(self) -> None:
+        with self._commands_lock:
+            if not self._commands:
+                return
+
+            commands, self._commands = self._commands, []
+
+        # only the latest activity command in a batch matters,
+        # e.g., a clear followed by a set collapses to the set
+        last_activity = max(
+            (i for i, c in enumerate(commands) if c.name in ACTIVITY_COMMANDS),
+            default=-1,
+        )
+
+        for i, command in enumerate(commands):
+            if (
+                i == last_activity
+                and self.client is not None
+                and self.link.online is False
+            ):
+                # sent once Discord is back
+                _LOGGER.debug("Holding %s until reconnected", command.name)
+                self._hold(command)
+                continue
+
+            if self.client is None or (
+                i < last_activity and command.name in ACTIVITY_COMMANDS
+            ):
+                _LOGGER.debug("Skipping %s, superseded", command.name)
+                _ = command.future and _resolve_threadsafe(command.future, False)
+                continue
+
+            self._execute(command)
+
+    def _execute(self, command: _Command) -> None:
+        try:
+            with SDK_CALL_DURATION.time(call=command.name):
+                command.run()
+        except Exception:
+            _LOGGER.exception("SDK call %s failed", command.name)
+            _ = command.future and _resolve_threadsafe(command.future, False)
+
+    def _hold(self, command: _Command | None) -> None:
+        superseded, self._held = self._held, command
+        if superseded is not None and superseded.future:
+            _resolve_threadsafe(superseded.future, False)
+
+    def _step(self) -> None:
+        self._run_commands()
+        self._check_refresh()
+        self._sync_log_severity()
+        if self.client is None or not self.link.due():
+            return
+
+        _LOGGER.info("Reconnecting to Discord...")
+        if self.token_ready:
+            C.Discord_Client_Connect(self.client)  # type: ignore
+        elif not self._restore():
+            # the SDK reconnects to the local client on its own and only an
+            # update tells whether it has, the next one can do that instead
+            self.link.forget()
+
+    def _sync_log_severity(self) -> None:
+        severity = LoggingSeverity.for_level(_LOGGER.getEffectiveLevel())
+        if severity == self.log_severity or self.client is None:
+            return
+
+        _LOGGER.debug("SDK log severity: %s", severity.name)
+        self.log_severity = severity
+        if severity >= self._log_floor:
+            # the SDK can't take callbacks back, raising the severity
+            # is left to _log_callback
+            return
+
+        # the new callback only gets what the others don't
+        handle = ffi.new_handle((self, self._log_floor))  # type: ignore
+        self._log_handles.append(handle)
+        C.Discord_Client_AddLogCallback(  # type: ignore
+            self.client, _log_callback, ffi.NULL, handle, severity
+        )
+        self._log_floor = severity
+
+    def dump_logs(self) -> None:
+        SDK_LOG.dump()
+
+    def on_connected(self, *, restore: bool = True) -> None:
+        """Discord is reachable, `restore` the current activity if need be."""
+        if self.link.online:
+            return
+
+        downtime = self.link.connected()
+        _LOGGER.info("Connected to Discord!")
+        if downtime is not None:
+            RECONNECTS.inc()
+
+        if (
+            (restore or self._held is not None)
+            and self._restore()
+            and downtime is not None
+        ):
+            RESTORE_DURATION.observe(downtime)
+
+    def on_disconnected(self) -> None:
+        if self.link.online is not False:
+            _LOGGER.error("Disconnected! Is Discord running?")
+
+        self.link.disconnected(retry=self.client is not None)
+
+    def _restore(self) -> bool:
+        held, self._held = self._held, None
+        activity = self.current_activity
+        # the timestamps are absolute, so they're still accurate unless
+        # whatever was playing should've ended by now
+        if activity and 0 < activity["end"] < time.time():
+            _LOGGER.info("Current activity has ended in the meantime, not restoring")
+            _ = held and held.future and _resolve_threadsafe(held.future, False)
+            return False
+
+        if held is not None:
+            _LOGGER.info("Sending the activity held back while offline...")
+            self._execute(held)
+            return held.name == "set_activity"
+
+        if not activity:
+            return False
+
+        _LOGGER.info("Restoring current activity...")
+        self._set_activity(**activity)
+        return True
+
+    def _run(self) -> None:
+        self._step()
+        if self.client is not None:
+            C.Discord_RunCallbacks()  # type: ignore
 
     def _create_options(self) -> cffi.FFI.CData:
         options = ffi.new("Discord_ClientCreateOptions*")  # type: ignore
         C.Discord_ClientCreateOptions_Init(options)  # type: ignore
         return options
 
-    def init(self) -> None:
+    def init(self, application_id: int = DEFAULT_ANIME_APPLICATION_ID) -> None:
         if self.client is not None:
             raise RuntimeError("Discord client is already initialised")
 
+        load_library()
+
         if self.self_handle is None:
             self.self_handle = ffi.new_handle(self)  # type: ignore
 
-        _LOGGER.debug(
-            "Initializing Discord client, with app id: %d", DEFAULT_ANIME_APPLICATION_ID
-        )
+        _LOGGER.debug("Initializing Discord client, with app id: %d", application_id)
         self.client = ffi.new("Discord_Client*")  # type: ignore
         options = self._create_options()
         try:
             C.Discord_Client_InitWithOptions(self.client, options)  # type: ignore
-            C.Discord_Client_AddLogCallback(  # type: ignore
-                self.client,
-                _log_callback,
-                ffi.NULL,
-                self.self_handle,
-                C.Discord_LoggingSeverity_Verbose,  # type: ignore
-            )
+            self._sync_log_severity()
             C.Discord_Client_SetStatusChangedCallback(  # type: ignore
                 self.client,
                 _status_changed_callback,
                 ffi.NULL,
                 self.self_handle,
             )
-            self.set_application_id(DEFAULT_ANIME_APPLICATION_ID)
+            self._set_application_id(application_id)
         finally:
             C.Discord_ClientCreateOptions_Drop(options)  # type: ignore
 
     def set_application_id(self, application_id: int | str) -> None:
+        application_id = resolve_application_id(application_id)
+        self._submit(
+            "set_application_id", partial(self._set_application_id, application_id)
+        )
+
+    def _set_application_id(self, application_id: int) -> None:
         if self.client is None:
             raise RuntimeError("Discord client is not initialised")
 
-        try:
-            application_id = int(
-                APPLICATION_ID_REPLACE_MAP.get(
-                    str(application_id).lower(), application_id
-                )
-            )
-        except (ValueError, TypeError):
-            application_id = DEFAULT_ANIME_APPLICATION_ID
-
         if application_id != self.last_application_id:
             _LOGGER.debug("Setting application id: %d", application_id)
             C.Discord_Client_SetApplicationId(self.client, application_id)  # type: ignore
             self.last_application_id = application_id
-            _ = (
-                CLI_ARGS.use_oauth2
-                and not self.try_authorize_with_stored_token()
-                and self.authorize()
+            # the refresh scheduled for the previous application is moot
+            self._refresh_deadline = None
+            if CLI_ARGS.use_oauth2:
+                self._request_authorization(application_id)
+
+    def _request_authorization(self, application_id: int) -> None:
+        if application_id in self._refresh_tokens:
+            self._authorize(application_id, self._refresh_tokens[application_id])
+            return
+
+        self._keyring.submit(self._load_refresh_token, application_id)
+
+    def _load_refresh_token(self, application_id: int) -> None:
+        # on the keyring thread
+        try:
+            refresh_token = keyring.get_password(
+                SERVICE_NAME, f"refresh_token:{application_id}"
             )
+        except Exception:
+            _LOGGER.exception("Failed to read the stored refresh token")
+            refresh_token = None
+        else:
+            self._refresh_tokens[application_id] = refresh_token
+
+        self._submit(
+            "authorize", partial(self._authorize, application_id, refresh_token)
+        )
 
-    def try_authorize_with_stored_token(self) -> bool:
-        if self.client is None:
-            raise RuntimeError("Discord client is not initialised")
+    def save_refresh_token(self, refresh_token: str) -> None:
         if self.last_application_id is None:
-            raise RuntimeError("Application ID is not set")
+            return
+
+        self._refresh_tokens[self.last_application_id] = refresh_token
+        key = f"refresh_token:{self.last_application_id}"
+
+        def save() -> None:
+            try:
+                keyring.set_password(SERVICE_NAME, key, refresh_token)
+            except Exception:
+                _LOGGER.exception("Failed to store the refresh token")
+
+        self._keyring.submit(save)
+
+    def schedule_refresh(self, expires_in: int) -> None:
+        """Refresh the access token before it expires in `expires_in` seconds."""
+        if expires_in <= 0:
+            return
 
-        refresh_token = keyring.get_password(
-            SERVICE_NAME, f"refresh_token:{self.last_application_id}"
+        delay = (
+            expires_in - TOKEN_REFRESH_MARGIN
+            if expires_in > 2 * TOKEN_REFRESH_MARGIN
+            else expires_in / 2
         )
-        if not refresh_token:
+        _LOGGER.debug("Refreshing the access token in %ds", delay)
+        self._refresh_deadline = perf_counter() + delay
+
+    def _check_refresh(self) -> None:
+        if self._refresh_deadline is None or perf_counter() < self._refresh_deadline:
+            return
+
+        self._refresh_deadline = None
+        if self.client is None or self.last_application_id is None:
+            return
+
+        if refresh_token := self._refresh_tokens.get(self.last_application_id):
+            _LOGGER.info("Access token is about to expire, refreshing...")
+            self.authorize_with_refresh_token(refresh_token)
+
+    def _authorize(self, application_id: int, refresh_token: str | None) -> None:
+        if application_id != self.last_application_id:
+            # switched to another application in the meantime
+            return
+
+        if refresh_token:
+            _LOGGER.info("Stored refresh token found, trying to authorise...")
+            self.authorize_with_refresh_token(refresh_token)
+        else:
             _LOGGER.info("No stored refresh token found")
-            return False
+            self.authorize()
 
-        _LOGGER.info("Stored refresh token found, trying to authorise...")
+    def authorize_with_refresh_token(self, refresh_token: str) -> None:
+        if self.client is None:
+            raise RuntimeError("Discord client is not initialised")
+        if self.last_application_id is None:
+            raise RuntimeError("Application ID is not set")
 
         ptr, _buf = _enc_c_str(refresh_token)
+        self.begin_request()
         C.Discord_Client_RefreshToken(  # type: ignore
             self.client,
             self.last_application_id,
@@ -338,7 +788,6 @@ class Discord:
             ffi.NULL,
             self.self_handle,
         )
-        return True
 
     def drop(self) -> None:
         _LOGGER.debug("Dropping Discord client")
@@ -346,30 +795,55 @@ class Discord:
             C.Discord_Client_Drop(self.client)  # type: ignore
             self.client = None
 
+        with self._commands_lock:
+            commands, self._commands = self._commands, []
+
+        for command in commands:
+            _ = command.future and _resolve_threadsafe(command.future, False)
+
+        self._hold(None)
+        for key, (client, future) in list(_PENDING_UPDATES.items()):
+            if client is self:
+                del _PENDING_UPDATES[key]
+                _ = future and _resolve_threadsafe(future, False)
+
+        # these callbacks won't run anymore
+        while self._in_flight:
+            self.end_request()
+
         self.self_handle = None
+        self.log_severity = self._log_floor = LoggingSeverity.NONE
+        self._log_handles.clear()
 
     def start(self, threaded: bool = True) -> None:
-        if self.client is None:
-            self.init()
-
         if threaded:
+            if self.thread is not None:
+                raise RuntimeError("Discord client is already running")
+
+            # fail early if the library is missing
+            load_library()
             _LOGGER.debug("Starting internal loop")
             self.thread = threading.Thread(target=self.start, args=(False,))
             self.thread.start()
             return
 
-        while self.client is not None:  # type: ignore
-            C.Discord_RunCallbacks()  # type: ignore
-            time.sleep(1 / 100)
+        if self.client is None:
+            self.init()
+
+        self.pump.run(lambda: self.client is not None)  # type: ignore
 
     def stop(self) -> None:
-        if self.client is None:
+        if self.client is None and self.thread is None:
             raise RuntimeError("Discord client is not initialised")
         _LOGGER.debug("Stopping internal loop")
-        self.drop()  # type: ignore
         if self.thread is not None:
+            self._submit("drop", self.drop)
             self.thread.join()
             self.thread = None
+        else:
+            self.drop()
+
+        self._keyring.shutdown()
 
     def authorize(self) -> None:
         if self.client is None:
@@ -397,6 +871,7 @@ class Discord:
                 self.code_verifier, challenge_ptr
             )
             C.Discord_AuthorizationArgs_SetCodeChallenge(args, challenge_ptr)  # type: ignore
+            self.begin_request()
             C.Discord_Client_Authorize(  # type: ignore
                 self.client, args, _authorize_callback, ffi.NULL, self.self_handle
             )
@@ -465,9 +940,6 @@ class Discord:
         *,
         future: Future[bool] | None = None,
     ) -> Future[bool] | None:
-        if self.client is None:
-            raise RuntimeError("Discord client is not initialised")
-
         self.current_activity = {
             "state": state,
             "state_url": state_url,
@@ -486,89 +958,89 @@ class Discord:
             "status_display_type": status_display_type,
         }
         _LOGGER.debug("Current activity: %s", self.current_activity)
+        self._submit(
+            "set_activity",
+            partial(self._set_activity, **self.current_activity, future=future),
+            future,
+        )
+        return future
+
+    def _set_activity(
+        self,
+        state: str,
+        details: str,
+        state_url: str = "",
+        details_url: str = "",
+        type_: int = 0,
+        small_text: str = "",
+        small_image: str = "",
+        small_url: str = "",
+        large_text: str = "",
+        large_image: str = "",
+        large_url: str = "",
+        buttons: list[dict[str, str]] | None = None,
+        start: int = 0,
+        end: int = 0,
+        status_display_type: int = 0,
+        *,
+        future: Future[bool] | None = None,
+    ) -> None:
+        if self.client is None:
+            raise RuntimeError("Discord client is not initialised")
 
-        garbages: list[tuple[cffi.FFI.CData, Callable[[Any], None] | None]] = []
+        strings = self._strings
+        activity = self._activity
+        timestamps = self._timestamps
+        assets = self._assets
+        has_timestamps = has_assets = False
+        button_count = 0
 
+        C.Discord_Activity_Init(activity)  # type: ignore
         try:
-            activity = ffi.new("Discord_Activity *")  # type: ignore
-            C.Discord_Activity_Init(activity)  # type: ignore
             C.Discord_Activity_SetType(activity, type_)  # type: ignore
-            garbages.append((activity, C.Discord_Activity_Drop))  # type: ignore
-
-            ptr, buf = _enc_c_str(state)
-            if ptr != ffi.NULL:
-                C.Discord_Activity_SetState(activity, ptr)  # type: ignore
-                garbages.append((buf, None))
-
-            ptr, buf = _enc_c_str(details)
-            if ptr != ffi.NULL:
-                C.Discord_Activity_SetDetails(activity, ptr)  # type: ignore
-                garbages.append((buf, None))
 
-            ptr, buf = _enc_c_str(state_url)
-            if ptr != ffi.NULL:
-                C.Discord_Activity_SetStateUrl(activity, ptr)  # type: ignore
-                garbages.append((buf, None))
-
-            ptr, buf = _enc_c_str(details_url)
-            if ptr != ffi.NULL:
-                C.Discord_Activity_SetDetailsUrl(activity, ptr)  # type: ignore
-                garbages.append((buf, None))
+            if state:
+                C.Discord_Activity_SetState(activity, strings.get(state))  # type: ignore
+            if details:
+                C.Discord_Activity_SetDetails(activity, strings.get(details))  # type: ignore
+            if state_url:
+                C.Discord_Activity_SetStateUrl(activity, strings.get(state_url))  # type: ignore
+            if details_url:
+                C.Discord_Activity_SetDetailsUrl(activity, strings.get(details_url))  # type: ignore
 
             if start > 0:
-                timestamps = ffi.new("Discord_ActivityTimestamps *")  # type: ignore
                 C.Discord_ActivityTimestamps_Init(timestamps)  # type: ignore
+                has_timestamps = True
                 C.Discord_ActivityTimestamps_SetStart(timestamps, start)  # type: ignore
                 if end > 0:
                     C.Discord_ActivityTimestamps_SetEnd(timestamps, end)  # type: ignore
                 C.Discord_Activity_SetTimestamps(activity, timestamps)  # type: ignore
-                garbages.append((timestamps, C.Discord_ActivityTimestamps_Drop))  # type: ignore
 
             # I'm assuming the URL won't even show so don't bother checking for URLs here
             if large_image or large_text or small_image or small_text:
-                assets = ffi.new("Discord_ActivityAssets *")  # type: ignore
                 C.Discord_ActivityAssets_Init(assets)  # type: ignore
-                garbages.append((assets, C.Discord_ActivityAssets_Drop))  # type: ignore
-
-                def set_asset(
-                    text: str,
-                    image: str,
-                    url: str,
-                    text_setter: cffi.FFI.CData,
-                    image_setter: cffi.FFI.CData,
-                    url_setter: cffi.FFI.CData,
-                ) -> None:
-                    ptr, buf = _enc_c_str(text)
-                    if ptr != ffi.NULL:
-                        garbages.append((buf, None))
-                        text_setter(assets, ptr)
-
-                    ptr, buf = _enc_c_str(image)
-                    if ptr != ffi.NULL:
-                        garbages.append((buf, None))
-                        image_setter(assets, ptr)
-
-                    ptr, buf = _enc_c_str(url)
-                    if ptr != ffi.NULL:
-                        garbages.append((buf, None))
-                        url_setter(assets, ptr)
-
-                set_asset(
-                    large_text,
-                    large_image,
-                    large_url,
-                    C.Discord_ActivityAssets_SetLargeText,  # type: ignore
-                    C.Discord_ActivityAssets_SetLargeImage,  # type: ignore
-                    C.Discord_ActivityAssets_SetLargeUrl,  # type: ignore
-                )
-                set_asset(
-                    small_text,
-                    small_image,
-                    small_url,
-                    C.Discord_ActivityAssets_SetSmallText,  # type: ignore
-                    C.Discord_ActivityAssets_SetSmallImage,  # type: ignore
-                    C.Discord_ActivityAssets_SetSmallUrl,  # type: ignore
-                )
+                has_assets = True
+
+                if large_text:
+                    C.Discord_ActivityAssets_SetLargeText(
+                        assets, strings.get(large_text)
+                    )  # type: ignore
+                if large_image:
+                    C.Discord_ActivityAssets_SetLargeImage(
+                        assets, strings.get(large_image)
+                    )  # type: ignore
+                if large_url:
+                    C.Discord_ActivityAssets_SetLargeUrl(assets, strings.get(large_url))  # type: ignore
+                if small_text:
+                    C.Discord_ActivityAssets_SetSmallText(
+                        assets, strings.get(small_text)
+                    )  # type: ignore
+                if small_image:
+                    C.Discord_ActivityAssets_SetSmallImage(
+                        assets, strings.get(small_image)
+                    )  # type: ignore
+                if small_url:
+                    C.Discord_ActivityAssets_SetSmallUrl(assets, strings.get(small_url))  # type: ignore
 
                 C.Discord_Activity_SetAssets(activity, assets)  # type: ignore
 
@@ -588,51 +1060,249 @@ class Discord:
                 if not label or not url:
                     continue
 
-                c_button = ffi.new("Discord_ActivityButton *")  # type: ignore
+                c_button = self._buttons[button_count]
                 C.Discord_ActivityButton_Init(c_button)  # type: ignore
-
-                ptr, buf = _enc_c_str(label)
-                C.Discord_ActivityButton_SetLabel(c_button, ptr[0])  # type: ignore
-                garbages.append((buf, None))
-
-                ptr, buf = _enc_c_str(url)
-                C.Discord_ActivityButton_SetUrl(c_button, ptr[0])  # type: ignore
-                garbages.append((buf, None))
-
+                button_count += 1
+                C.Discord_ActivityButton_SetLabel(c_button, strings.get(label)[0])  # type: ignore
+                C.Discord_ActivityButton_SetUrl(c_button, strings.get(url)[0])  # type: ignore
                 C.Discord_Activity_AddButton(activity, c_button)  # type: ignore
-                garbages.append((c_button, C.Discord_ActivityButton_Drop))  # type: ignore
 
             if status_display_type > 0:
-                c_display_type = ffi.new(  # type: ignore
-                    "Discord_StatusDisplayTypes *", status_display_type
-                )
-                C.Discord_Activity_SetStatusDisplayType(activity, c_display_type)  # type: ignore
-
-            future_handle = ffi.NULL
-            if future:
-                future_handle = ffi.new_handle(future)  # type: ignore
-                future._handle = future_handle  # type: ignore
+                self._display_type[0] = status_display_type
+                C.Discord_Activity_SetStatusDisplayType(activity, self._display_type)  # type: ignore
 
+            key = next(_update_keys)
+            _PENDING_UPDATES[key] = self, future
+            self.begin_request()
             C.Discord_Client_UpdateRichPresence(  # type: ignore
                 self.client,
                 activity,
                 _update_presence_callback,  # type: ignore
                 ffi.NULL,
-                future_handle,
+                ffi.cast("void *", key),  # type: ignore
             )
-            return future
         finally:
-            for buffer, drop in reversed(garbages):
-                _ = drop and drop(buffer)
-
-            garbages.clear()
+            for i in range(button_count):
+                C.Discord_ActivityButton_Drop(self._buttons[i])  # type: ignore
+            if has_assets:
+                C.Discord_ActivityAssets_Drop(assets)  # type: ignore
+            if has_timestamps:
+                C.Discord_ActivityTimestamps_Drop(timestamps)  # type: ignore
+            C.Discord_Activity_Drop(activity)  # type: ignore
 
     def clear_activity(self) -> None:
+        _LOGGER.debug("Received clear activity request, resetting current activity")
+        self.current_activity = {}
+        self._submit("clear_activity", self._clear_activity)
+
+    def _clear_activity(self) -> None:
         if self.client is None:
             raise RuntimeError("Discord client is not initialised")
 
-        _LOGGER.debug("Received clear activity request, resetting current activity")
-        self.current_activity = {}
         C.Discord_Client_ClearRichPresence(  # type: ignore
             self.client,
         )
+
+
+class DiscordPool(DiscordClient):
+    """A Discord client per application ID, all run from one SDK thread.
+
+    Switching to an application that already has a client only clears the
+    previous client's activity, instead of changing the application ID of
+    a single client and authorising it all over again. The least recently
+    used client is dropped once there are more than `size`, and the IDs
+    used last time are warmed up on start.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        *,
+        history_path: Path = APPLICATION_IDS_PATH,
+    ) -> None:
+        self.size = max(size, 1)
+        self.history_path = history_path
+        self.pump = CallbackPump(self._run, busy=self._connecting)
+        self.thread: threading.Thread | None = None
+        self._running = False
+        # least recently used first
+        self._clients: OrderedDict[int, Discord] = OrderedDict()
+        self._active: Discord | None = None
+        self._commands: list[Callable[[], None]] = []
+        self._commands_lock = threading.Lock()
+
+    @property
+    def current_activity(self) -> dict[str, Any]:  # type: ignore[reportIncompatibleVariableOverride]
+        return self._active.current_activity if self._active else {}
+
+    def _connecting(self) -> bool:
+        return any(c._connecting() for c in list(self._clients.values()))  # type: ignore[reportPrivateUsage]
+
+    def _submit(self, run: Callable[[], None]) -> None:
+        with self._commands_lock:
+            self._commands.append(run)
+
+        self.pump.wake()
+
+    def _run(self) -> None:
+        # pool commands first, so that new clients are initialised
+        # before their own commands run
+        with self._commands_lock:
+            commands, self._commands = self._commands, []
+
+        for run in commands:
+            try:
+                run()
+            except Exception:
+                _LOGGER.exception("Pool command failed")
+
+        clients = list(self._clients.values())
+        for client in clients:
+            client._step()  # type: ignore[reportPrivateUsage]
+
+        if any(client.client is not None for client in clients):
+            C.Discord_RunCallbacks()  # type: ignore
+
+    def _spawn(self, application_id: int) -> Discord:
+        _LOGGER.debug("Adding a client for app id %d to the pool", application_id)
+        client = self._clients[application_id] = Discord(pump=self.pump)
+        self._submit(partial(client.init, application_id))
+
+        while len(self._clients) > self.size:
+            evicted_id, evicted = self._clients.popitem(last=False)
+            _LOGGER.debug("Evicting the client for app id %d", evicted_id)
+            self._submit(partial(self._drop, evicted))
+
+        return client
+
+    @staticmethod
+    def _drop(client: Discord) -> None:
+        client.drop()
+        client._keyring.shutdown(wait=False)  # type: ignore[reportPrivateUsage]
+
+    def _load_history(self) -> list[int]:
+        try:
+            with self.history_path.open("r", encoding="utf-8") as f:
+                history = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError):
+            _LOGGER.warning("Failed to load %s", self.history_path)
+            return []
+
+        if not isinstance(history, list):
+            return []
+
+        return [i for i in history if isinstance(i, int)]  # type: ignore[reportUnknownVariableType]
+
+    def _save_history(self) -> None:
+        tmp_path = self.history_path.with_suffix(".tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                # most recently used first
+                json.dump(list(reversed(self._clients)), f)
+            os.replace(tmp_path, self.history_path)
+        except OSError as e:
+            _LOGGER.warning("Failed to save %s: %s", self.history_path, e)
+
+    def start(self) -> None:
+        if self.thread is not None:
+            raise RuntimeError("Discord pool is already running")
+
+        # fail early if the library is missing
+        load_library()
+
+        history = self._load_history()[: self.size]
+        _LOGGER.debug("Warming up app ids: %s", history)
+        for application_id in reversed(history):
+            self._spawn(application_id)
+
+        self._running = True
+        self.thread = threading.Thread(
+            target=self.pump.run, args=(lambda: self._running,)
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.thread is None:
+            raise RuntimeError("Discord pool is not running")
+
+        self._save_history()
+        for client in self._clients.values():
+            self._submit(partial(self._drop, client))
+
+        def halt() -> None:
+            self._running = False
+
+        self._submit(halt)
+        self.thread.join()
+        self.thread = None
+        self._clients.clear()
+        self._active = None
+
+    def dump_logs(self) -> None:
+        SDK_LOG.dump()
+
+    def set_application_id(self, application_id: int | str) -> None:
+        application_id = resolve_application_id(application_id)
+
+        if (client := self._clients.get(application_id)) is None:
+            client = self._spawn(application_id)
+        else:
+            self._clients.move_to_end(application_id)
+
+        if client is self._active:
+            return
+
+        if self._active is not None and self._active.current_activity:
+            # activities of other applications would stay up otherwise
+            self._active.clear_activity()
+
+        self._active = client
+
+    def set_activity(
+        self,
+        state: str,
+        details: str,
+        state_url: str = "",
+        details_url: str = "",
+        type_: int = 0,
+        small_text: str = "",
+        small_image: str = "",
+        small_url: str = "",
+        large_text: str = "",
+        large_image: str = "",
+        large_url: str = "",
+        buttons: list[dict[str, str]] | None = None,
+        start: int = 0,
+        end: int = 0,
+        status_display_type: int = 0,
+        *,
+        future: Future[bool] | None = None,
+    ) -> Future[bool] | None:
+        if self._active is None:
+            self.set_application_id(DEFAULT_ANIME_APPLICATION_ID)
+
+        assert self._active is not None
+        return self._active.set_activity(
+            state,
+            details,
+            state_url,
+            details_url,
+            type_,
+            small_text,
+            small_image,
+            small_url,
+            large_text,
+            large_image,
+            large_url,
+            buttons,
+            start,
+            end,
+            status_display_type,
+            future=future,
+        )
+
+    def clear_activity(self) -> None:
+        if self._active is not None:
+            self._active.clear_activity()
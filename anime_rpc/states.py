@@ -7,6 +7,8 @@ from typing import TYPE_CHECKING, Literal, TypedDict
 if TYPE_CHECKING:
     from typing import Generator  # noqa: UP035
 
+from anime_rpc.tracing import TRACE_KEYS
+
 _LOGGER = logging.getLogger("states")
 
 
@@ -38,9 +40,17 @@ class State(TypedDict, total=False):
     # allow str for browser extensions (js)
     application_id: int | str
 
+    # the player or the page went away, which clears the presence right away
+    # instead of waiting out the hold-down
+    stopped: bool
+
+    # see tracing.py, these follow the state through the pipeline
+    trace_id: str
+    captured_at: float  # perf_counter() when the state was produced
+
 
-_KEYS_TO_IGNORE_CMP: tuple[str, ...] = ("position", "origin")
-_KEYS_TO_IGNORE_LOG: tuple[str, ...] = ("position", "duration")
+_KEYS_TO_IGNORE_CMP: tuple[str, ...] = ("position", "origin", *TRACE_KEYS)
+_KEYS_TO_IGNORE_LOG: tuple[str, ...] = ("position", "duration", *TRACE_KEYS)
 
 
 def compare_states(a: State, b: State) -> bool:
@@ -1,4 +1,5 @@
 import logging
+from collections import deque
 from math import ceil
 from time import perf_counter
 
@@ -10,6 +11,69 @@ from anime_rpc.states import State, WatchingState
 _LOGGER = logging.getLogger("timer")
 
 TIME_DISCREPANCY_TOLERANCE_MS = 3_000
+# jumps closer together than this are treated as a single scrub
+SCRUB_WINDOW_MS = 2_000
+# samples older than this don't contribute to the playback rate estimate
+RATE_WINDOW_S = 10.0
+# how much history the estimate needs before it's trusted
+RATE_MIN_SPAN_S = 2.0
+# relative change in the estimated rate that warrants a resync
+RATE_CHANGE_THRESHOLD = 0.1
+# a sample this far off the prediction means the rate has changed,
+# so the fit starts over instead of slowly averaging the old rate out
+RATE_RESTART_TOLERANCE_MS = 250
+# with slow polls a faster rate looks like a seek at first, anything that
+# implies a rate up to this is given the benefit of the doubt
+MAX_PLAUSIBLE_RATE = 4.0
+
+
+class RateEstimator:
+    """Fits the playback rate to a sliding window of (time, position) samples.
+
+    Times are in seconds and positions in ms, the rate is the least squares
+    slope of the two, i.e., 1.0 for normal playback.
+    """
+
+    def __init__(self, window: float = RATE_WINDOW_S, max_samples: int = 32) -> None:
+        self.window = window
+        self._samples: deque[tuple[float, int]] = deque(maxlen=max_samples)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def reset(self) -> None:
+        self._samples.clear()
+
+    def restart(self) -> None:
+        """Drop everything but the latest sample."""
+        while len(self._samples) > 1:
+            self._samples.popleft()
+
+    def add(self, at: float, position: int) -> None:
+        self._samples.append((at, position))
+        while self._samples[0][0] < at - self.window:
+            self._samples.popleft()
+
+    @property
+    def span(self) -> float:
+        if not self._samples:
+            return 0.0
+
+        return self._samples[-1][0] - self._samples[0][0]
+
+    @property
+    def rate(self) -> float | None:
+        if len(self._samples) < 2 or self.span <= 0:
+            return None
+
+        # relative to the first sample to keep the sums small
+        t0, p0 = self._samples[0]
+        n = len(self._samples)
+        mean_t = sum(t - t0 for t, _ in self._samples) / n
+        mean_p = sum(p - p0 for _, p in self._samples) / n
+        cov = sum((t - t0 - mean_t) * (p - p0 - mean_p) for t, p in self._samples)
+        var = sum((t - t0 - mean_t) ** 2 for t, _ in self._samples)
+        return cov / var / 1_000
 
 
 class Timer:
@@ -18,10 +82,18 @@ class Timer:
         self._last_log_time = 0.0
         self._periodic_update_in = 0.0
 
-        # drift tracking internals
-        self._last_sys_time = perf_counter()
+        # rate tracking internals
+        self._last_sample_time = float("-inf")
         self._last_pos: int = -1
-        self._drift_accumulator: float = 0.0
+        self._playing = False
+        self._estimator = RateEstimator()
+        self._reported_rate = 1.0
+        self._after_jump = False
+
+        # scrub tracking internals
+        self._seek_settle = CLI_ARGS.seek_settle / 1_000
+        self._last_jump_time = float("-inf")
+        self._scrubbing = False
 
     def tick(self, state: State, flags: UpdateFlag) -> UpdateFlag:
         now = perf_counter()
@@ -49,47 +121,158 @@ class Timer:
 
         return flags
 
+    @property
+    def rate(self) -> float:
+        """The estimated playback rate, or the last resynced one until then."""
+        if (rate := self._estimator.rate) is not None:
+            return rate
+
+        return self._reported_rate
+
+    def predicted_position(self, at: float | None = None) -> int | None:
+        """Extrapolate the position at `at` (defaults to now) in ms."""
+        if self._last_pos < 0:
+            return None
+
+        if not self._playing:
+            return self._last_pos
+
+        at = perf_counter() if at is None else at
+        return self._extrapolate(at, self.rate)
+
+    def _extrapolate(self, at: float, rate: float) -> int:
+        return round(self._last_pos + rate * (at - self._last_sample_time) * 1_000)
+
     def _check_time_discrepancy(
         self, now: float, flags: UpdateFlag, state: State
     ) -> UpdateFlag:
-        elapsed_sys_ms = (now - self._last_sys_time) * 1_000
-        self._last_sys_time = now
+        # pollers stamp states when they're captured, which is more accurate
+        # than whenever the consumer gets around to them
+        sampled_at = state.get("captured_at", now)
 
         if (pos := state.get("position")) is None:
             self._last_pos = -1
+            self._estimator.reset()
             return flags
 
-        if self._last_pos < 0:
-            self._last_pos = pos
-            return flags
+        if sampled_at == self._last_sample_time:
+            # the last state being replayed, nothing new to learn from it,
+            # but observing pollers post nothing while the position stays put
+            return self._check_settled(now, flags, pos)
+
+        playing = (
+            state.get("watching_state", WatchingState.NOT_AVAILABLE)
+            == WatchingState.PLAYING
+        )
+        after_jump, self._after_jump = self._after_jump, False
 
-        elapsed_video_ms = pos - self._last_pos
-        time_discrepancy = elapsed_video_ms - elapsed_sys_ms
+        if (expected := self.predicted_position(sampled_at)) is None:
+            # nothing to compare the first sample against
+            pass
+        elif (
+            abs(pos - expected) > TIME_DISCREPANCY_TOLERANCE_MS or pos < self._last_pos
+        ):
+            if after_jump and (
+                abs(pos - self._extrapolate(sampled_at, self._reported_rate))
+                <= TIME_DISCREPANCY_TOLERANCE_MS
+            ):
+                # it was a seek after all and playback carried on as before
+                self._estimator.reset()
+            else:
+                flags = self._on_jump(now, flags, pos, sampled_at, playing=playing)
+        elif self._scrubbing:
+            flags = self._check_settled(now, flags, pos)
+            # fit from wherever the scrub ends up
+            self._estimator.reset()
+        elif playing and self._playing:
+            if abs(pos - expected) > RATE_RESTART_TOLERANCE_MS:
+                self._estimator.restart()
+
+            self._estimator.add(sampled_at, pos)
+            flags = self._check_rate(flags)
+
+        if not playing:
+            self._estimator.reset()
+        elif not self._estimator:
+            self._estimator.add(sampled_at, pos)
+
+        self._last_sample_time = sampled_at
+        self._last_pos = pos
+        self._playing = playing
+        return flags
+
+    def _check_settled(self, now: float, flags: UpdateFlag, pos: int) -> UpdateFlag:
+        if self._scrubbing and now - self._last_jump_time >= self._seek_settle:
+            _LOGGER.info("Scrub settled at %s", ms2timestamp(pos))
+            flags |= UpdateFlag.SEEKING
+            self._scrubbing = False
+
+        return flags
+
+    def timeout(self, timeout: float | None) -> float | None:
+        """Shorten `timeout` so that the consumer wakes up once a scrub settles."""
+        if not self._scrubbing:
+            return timeout
+
+        settles_in = self._last_jump_time + self._seek_settle - perf_counter()
+        remaining = max(0.0, settles_in)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _check_rate(self, flags: UpdateFlag) -> UpdateFlag:
+        if (
+            self._estimator.span < RATE_MIN_SPAN_S
+            or (rate := self._estimator.rate) is None
+        ):
+            return flags
 
         if (
-            abs(time_discrepancy) > TIME_DISCREPANCY_TOLERANCE_MS
-            or elapsed_video_ms < 0
+            abs(rate - self._reported_rate)
+            > RATE_CHANGE_THRESHOLD * self._reported_rate
         ):
+            _LOGGER.info("Playback rate changed (~%.2fx). Resyncing...", rate)
+            flags |= UpdateFlag.SPED_UP
+            self._reported_rate = rate
+
+        return flags
+
+    def _on_jump(
+        self,
+        now: float,
+        flags: UpdateFlag,
+        pos: int,
+        sampled_at: float,
+        *,
+        playing: bool,
+    ) -> UpdateFlag:
+        # a lone jump goes through right away, but one that closely follows
+        # another means the user is scrubbing. those are held back until the
+        # position settles so that the presence is only updated once
+        if now - self._last_jump_time > SCRUB_WINDOW_MS / 1_000:
             _LOGGER.info(
                 "Seeking from %s to %s", ms2timestamp(self._last_pos), ms2timestamp(pos)
             )
             flags |= UpdateFlag.SEEKING
-            self._drift_accumulator = 0.0
-        elif (
-            state.get("watching_state", WatchingState.NOT_AVAILABLE)
-            == WatchingState.PLAYING
+            self._scrubbing = False
+        elif not self._scrubbing:
+            _LOGGER.debug("Scrubbing, waiting for the position to settle...")
+            self._scrubbing = True
+
+        self._last_jump_time = now
+
+        elapsed = sampled_at - self._last_sample_time
+        implied_rate = (pos - self._last_pos) / max(elapsed, 1e-3) / 1_000
+        if (
+            playing
+            and self._playing
+            and not self._scrubbing
+            and 0 < implied_rate <= MAX_PLAUSIBLE_RATE
         ):
-            self._drift_accumulator += time_discrepancy
-            observed_speed = elapsed_video_ms / max(elapsed_sys_ms, 1.0)
-            # scale time discrepancy tolerance with playback speed rate
-            dynamic_tolerance = TIME_DISCREPANCY_TOLERANCE_MS * max(1.0, observed_speed)
-
-            if abs(self._drift_accumulator) > dynamic_tolerance:
-                _LOGGER.info(
-                    "Speed drift detected (~%.2fx). Resyncing...", observed_speed
-                )
-                flags |= UpdateFlag.SPED_UP
-                self._drift_accumulator = 0.0
+            # keep the sample from before the jump, if the next one lines up
+            # with it the rate has changed and the fit is already there
+            self._estimator.restart()
+            self._estimator.add(sampled_at, pos)
+            self._after_jump = True
+        else:
+            self._estimator.reset()
 
-        self._last_pos = pos
         return flags
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, TextIO
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from anime_rpc.states import State
+
+_LOGGER = logging.getLogger("tracing")
+
+# keys that identify a state's journey, they never affect the presence
+TRACE_KEYS: tuple[str, ...] = ("trace_id", "captured_at")
+MAX_OPEN_TRACES = 256
+
+_current_trace: ContextVar[tuple[str, float] | None] = ContextVar(
+    "current_trace", default=None
+)
+
+
+def new_trace() -> tuple[str, float]:
+    """Start a trace for the states produced from here on in this context."""
+    trace = os.urandom(8).hex(), perf_counter()
+    _current_trace.set(trace)
+    return trace
+
+
+def stamp(state: State) -> State:
+    """Attach the current trace ID and capture timestamp to `state`."""
+    if trace := _current_trace.get():
+        state["trace_id"], state["captured_at"] = trace
+
+    return state
+
+
+class Tracer:
+    """Writes a span per pipeline stage in the Chrome trace-event format.
+
+    The file is a JSON array with one event per line and no closing bracket,
+    which trace viewers (chrome://tracing, Perfetto) accept as is. Each origin
+    gets its own track and every span carries the trace ID in its args.
+    """
+
+    def __init__(self) -> None:
+        self._file: TextIO | None = None
+        self._lock = threading.Lock()
+        self._epoch = perf_counter()
+        self._pid = os.getpid()
+        self._tids: dict[str, int] = {}
+        # where the last hop of each trace ended
+        self._cursors: OrderedDict[str, float] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def open(self, path: Path) -> None:
+        # line buffered so that a crash doesn't lose the spans leading up to it
+        self._file = path.open("w", encoding="utf-8", buffering=1)
+        self._file.write("[\n")
+        _LOGGER.info("Writing traces to %s", path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, event: dict[str, Any]) -> None:
+        assert self._file is not None
+        self._file.write(json.dumps(event, separators=(",", ":")) + ",\n")
+
+    def _get_tid(self, lane: str) -> int:
+        if (tid := self._tids.get(lane)) is None:
+            tid = self._tids[lane] = len(self._tids) + 1
+            self._write(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": tid,
+                    "args": {"name": lane or "consumer"},
+                }
+            )
+
+        return tid
+
+    def record(
+        self, name: str, state: State, start: float, end: float | None = None
+    ) -> None:
+        if not self.enabled or not (trace_id := state.get("trace_id")):
+            return
+
+        end = perf_counter() if end is None else end
+        with self._lock:
+            if self._file is None:
+                return
+
+            self._cursors[trace_id] = end
+            self._cursors.move_to_end(trace_id)
+            if len(self._cursors) > MAX_OPEN_TRACES:
+                self._cursors.popitem(last=False)
+
+            self._write(
+                {
+                    "name": name,
+                    "cat": "anime_rpc",
+                    "ph": "X",
+                    "ts": round((start - self._epoch) * 1e6, 1),
+                    "dur": round((end - start) * 1e6, 1),
+                    "pid": self._pid,
+                    "tid": self._get_tid(state.get("origin", "")),
+                    "args": {"trace_id": trace_id},
+                }
+            )
+
+    @contextmanager
+    def span(self, name: str, state: State) -> Generator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, state, start)
+
+    def record_since_last(self, name: str, state: State) -> None:
+        """Record the gap since the previous hop, e.g., the time spent queued."""
+        if self._file is None or not (trace_id := state.get("trace_id")):
+            return
+
+        start = self._cursors.get(trace_id, state.get("captured_at"))
+        if start is not None:
+            self.record(name, state, start)
+
+
+TRACER = Tracer()
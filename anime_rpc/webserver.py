@@ -25,15 +25,18 @@ from aiohttp.web import (
     WebSocketResponse,
 )
 
+from anime_rpc.mailbox import Mailbox
 from anime_rpc.metadata_providers import BaseMetadataProvider
+from anime_rpc.metrics import REGISTRY
 from anime_rpc.states import State, WatchingState
+from anime_rpc.tracing import new_trace, stamp
 
 PORT = 56727
 _LOGGER = logging.getLogger("webserver")
 
 
 def ws_handler(
-    queue: asyncio.Queue[State],
+    mailbox: Mailbox,
 ) -> Callable[[Request], Coroutine[Any, Any, WebSocketResponse | Response]]:
     async def wrapper(request: Request) -> WebSocketResponse | Response:
         resp = WebSocketResponse()
@@ -56,13 +59,14 @@ def ws_handler(
                         )
                     assert "origin" in data
                     origin = data["origin"]
-                    await queue.put(data)
+                    new_trace()
+                    mailbox.put(stamp(data))
                     continue
 
                 break
         finally:
             # clear presence
-            await queue.put(State(origin=origin))
+            mailbox.put(State(origin=origin, stopped=True))
 
         return resp
 
@@ -89,6 +93,10 @@ async def search_handler(request: Request) -> Response:
     return json_response(results)
 
 
+async def metrics_handler(request: Request) -> Response:
+    return Response(text=REGISTRY.render(), content_type="text/plain")
+
+
 async def pollers_handler(request: Request) -> Response:
     return json_response(request.app["pollers"])
 
@@ -127,22 +135,29 @@ async def pollers_sse_handler(request: Request) -> StreamResponse:
 
 
 async def get_app(
-    queue: asyncio.Queue[State], metadata_providers: dict[str, BaseMetadataProvider]
+    mailbox: Mailbox, metadata_providers: dict[str, BaseMetadataProvider]
 ) -> Application:
     app = Application()
     app["metadata_providers"] = metadata_providers
     app["sse_clients"] = []
     app["pollers"] = {
         p.origin(): PollerStatus(
-            {"active": False, "filedir": None, "display_name": p.display_name}
+            {
+                "active": False,
+                "filedir": None,
+                "display_name": p.display_name,
+                "interval": CLI_ARGS.poll_interval,
+                "schedule": "steady",
+            }
         )
         for p in CLI_ARGS.pollers
     }
 
-    app.router.add_get("/ws", ws_handler(queue))
+    app.router.add_get("/ws", ws_handler(mailbox))
     app.router.add_get("/search", search_handler)
     app.router.add_get("/pollers", pollers_handler)
     app.router.add_get("/pollers/events", pollers_sse_handler)
+    app.router.add_get("/metrics", metrics_handler)
     cors = aiohttp_cors.setup(
         app,
         defaults={
@@ -0,0 +1,82 @@
+"""Micro-benchmark BasePoller.get_state on an unchanged file and config.
+
+"uncached" clears the match caches before every call, which is what
+every poll tick used to do; "cached" is the steady state.
+
+Usage: python -m benchmarks.bench_get_state [--number N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from anime_rpc.config import Config
+from anime_rpc.pollers.base_poller import BasePoller, Vars, clear_match_caches
+from anime_rpc.states import WatchingState
+
+FILE = "[EMBER] Sousou no Frieren - 07 - Like a Fairy Tale.mkv"
+MEDIA_TITLE = "Sousou no Frieren - 07 - Like a Fairy Tale"
+CONFIG = Config(
+    title="Sousou no Frieren",
+    image_url="",
+    url="",
+    rewatching=False,
+    application_id=0,
+    match=r"Sousou no Frieren - %ep% - %title%",
+)
+VARS = Vars(
+    file=FILE,
+    filedir="/videos/Sousou no Frieren",
+    state=WatchingState.PLAYING,
+    position=0,
+    duration=1_440_000,
+)
+
+
+class BenchPoller(BasePoller):
+    @classmethod
+    def origin(cls) -> str:
+        return "bench"
+
+    @property
+    def display_name(self) -> str:
+        return "bench"
+
+    async def get_vars(self, client: object) -> Vars | None:  # type: ignore[reportIncompatibleMethodOverride]
+        return VARS
+
+    # keep file IO out of the picture
+    async def parse_media_info(self, file: str, filedir: str) -> str:
+        return MEDIA_TITLE
+
+
+async def bench(name: str, number: int, *, cached: bool) -> None:
+    poller = BenchPoller()
+    state = await poller.get_state(VARS, CONFIG)
+    assert state.get("episode") == "7", state
+
+    start = time.perf_counter()
+    for _ in range(number):
+        if not cached:
+            clear_match_caches()
+        await poller.get_state(VARS, CONFIG)
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:>8}: {elapsed / number * 1_000_000:6.2f} us/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmark BasePoller.get_state."
+    )
+    parser.add_argument("--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(bench("uncached", args.number, cached=False))
+    asyncio.run(bench("cached", args.number, cached=True))
+
+
+if __name__ == "__main__":
+    main()
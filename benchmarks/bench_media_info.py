@@ -0,0 +1,88 @@
+"""Compare the native container title reader against pymediainfo.
+
+Generates a corpus of Matroska and MP4 files (padded with a dummy
+payload so they resemble real episodes) and times both parsers.
+
+Usage: python -m benchmarks.bench_media_info [--files N] [--size-mib N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from anime_rpc.containers import read_title
+from tests.media_files import make_mkv, make_mp4
+
+try:
+    from pymediainfo import MediaInfo
+except ImportError:
+    MediaInfo = None
+
+
+def generate_corpus(directory: Path, count: int, padding: int) -> list[Path]:
+    paths: list[Path] = []
+    for i in range(count):
+        title = f"Episode {i + 1:02} - Benchmark"
+        for ext, make in ((".mkv", make_mkv), (".mp4", make_mp4)):
+            path = directory / f"{i:03}{ext}"
+            path.write_bytes(make(title, padding))
+            paths.append(path)
+
+    return paths
+
+
+def parse_with_mediainfo(path: Path) -> str:
+    assert MediaInfo is not None
+    metadata = MediaInfo.parse(path)
+    return str(metadata.general_tracks[0].title or "").strip()
+
+
+def bench(name: str, parser: Callable[[Path], str], paths: list[Path]) -> None:
+    titles = [parser(p) for p in paths]
+    assert all(titles), f"{name} failed to read some titles"
+
+    seconds = min(timeit.repeat(lambda: [parser(p) for p in paths], number=1, repeat=3))
+
+    tracemalloc.start()
+    for p in paths:
+        parser(p)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name:>10}: {seconds / len(paths) * 1_000:8.3f} ms/file, "
+        f"peak Python allocations {peak / 1024:8.1f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the native container title reader against pymediainfo."
+    )
+    parser.add_argument("--files", type=int, default=25)
+    parser.add_argument("--size-mib", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate_corpus(Path(tmp), args.files, args.size_mib * 1024 * 1024)
+        print(f"{len(paths)} files of ~{args.size_mib} MiB each")
+
+        bench("native", read_title, paths)
+        if MediaInfo is None:
+            print("pymediainfo isn't installed, skipping")
+            sys.exit(0)
+
+        assert [read_title(p) for p in paths] == [
+            parse_with_mediainfo(p) for p in paths
+        ], "titles differ between parsers"
+        bench("mediainfo", parse_with_mediainfo, paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark Presence.update against the loopback Discord backend.
+
+Every update differs from the last one, so each goes all the way to the
+backend and waits for its acknowledgement. To load the whole pipeline
+instead, replay a recording headlessly:
+
+    python -m anime_rpc --discord-backend loopback --replay FILE --replay-fast
+
+Usage: python -m benchmarks.bench_presence [--number N] [--latency SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from anime_rpc.loopback import LoopbackClient
+from anime_rpc.presence import Presence, UpdateFlag
+from anime_rpc.states import State, WatchingState
+
+STATE = State(
+    origin="bench",
+    title="Sousou no Frieren",
+    episode="7",
+    episode_title="Like a Fairy Tale",
+    position=0,
+    duration=1_440_000,
+    rewatching=False,
+    watching_state=WatchingState.PLAYING,
+)
+
+
+async def bench(number: int, client: LoopbackClient) -> list[float]:
+    presence = Presence(client)
+    last_state = State()
+    latencies: list[float] = []
+
+    for i in range(number):
+        state = State({**STATE, "episode": str(i)})
+        start = time.perf_counter()
+        last_state = await presence.update(state, last_state, flags=UpdateFlag(0))
+        assert presence.last_update is not None
+        await presence.last_update
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark Presence.update against the loopback backend."
+    )
+    parser.add_argument("--number", type=int, default=5_000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    client = LoopbackClient(latency=args.latency)
+    client.start()
+    try:
+        start = time.perf_counter()
+        latencies = asyncio.run(bench(args.number, client))
+        elapsed = time.perf_counter() - start
+    finally:
+        client.stop()
+
+    assert len(client.activities()) == args.number
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"throughput: {args.number / elapsed:8.0f} updates/s")
+    print(f"       p50: {quantiles[49] * 1_000:8.3f} ms")
+    print(f"       p99: {quantiles[98] * 1_000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark the Discord callback pump against the old fixed 100 Hz loop.
+
+The SDK is simulated: each submitted update is acknowledged by the first
+callback run after `latency` seconds. Reports wakeups per second and how
+long acknowledgements waited for a callback run past their due time.
+
+Usage: python -m benchmarks.bench_pump [--duration S] [--rate N] [--latency S]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import threading
+import time
+from collections.abc import Callable
+
+from anime_rpc.pump import CallbackPump
+
+
+class FakeSDK:
+    def __init__(self, latency: float, on_ack: Callable[[], None]) -> None:
+        self.latency = latency
+        self.on_ack = on_ack
+        self.runs = 0
+        self.lags: list[float] = []
+        self._due: list[float] = []
+        self._lock = threading.Lock()
+
+    def submit(self) -> None:
+        with self._lock:
+            self._due.append(time.perf_counter() + self.latency)
+
+    def run_callbacks(self) -> None:
+        self.runs += 1
+        now = time.perf_counter()
+        with self._lock:
+            acked = [due for due in self._due if due <= now]
+            self._due = [due for due in self._due if due > now]
+
+        for due in acked:
+            self.lags.append(now - due)
+            self.on_ack()
+
+
+def sleep_loop(sdk: FakeSDK, alive: Callable[[], bool]) -> None:
+    while alive():
+        sdk.run_callbacks()
+        time.sleep(1 / 100)
+
+
+def bench(name: str, duration: float, rate: float, latency: float) -> None:
+    pump: CallbackPump | None = None
+    sdk = FakeSDK(latency, lambda: pump and pump.done())
+    alive = True
+
+    if name == "pump":
+        pump = CallbackPump(sdk.run_callbacks)
+        thread = threading.Thread(target=pump.run, args=(lambda: alive,))
+    else:
+        thread = threading.Thread(target=sleep_loop, args=(sdk, lambda: alive))
+
+    thread.start()
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        if rate:
+            sdk.submit()
+            _ = pump and pump.begin()
+        time.sleep(min(1 / rate if rate else duration, duration - elapsed))
+
+    alive = False
+    _ = pump and pump.wake()
+    thread.join()
+
+    print(f"{name:>6}: {sdk.runs / duration:8.1f} wakeups/s", end="")
+    if sdk.lags:
+        print(f", ack lag p50 {statistics.median(sdk.lags) * 1_000:.2f} ms", end="")
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the callback pump against a fixed 100 Hz loop."
+    )
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, default=0.2, help="updates/s")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    for rate in (0, args.rate):
+        print(f"{rate} updates/s:")
+        for name in ("sleep", "pump"):
+            bench(name, args.duration, rate, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Minimal Matroska and MP4 files for exercising the container readers."""
+
+from __future__ import annotations
+
+import struct
+
+
+def _ebml_size(size: int) -> bytes:
+    # always use 8-byte sizes, it's valid and keeps things simple
+    return (0x01 << 56 | size).to_bytes(8, "big")
+
+
+def ebml_element(id_: int, payload: bytes) -> bytes:
+    return (
+        id_.to_bytes((id_.bit_length() + 7) // 8, "big")
+        + _ebml_size(len(payload))
+        + payload
+    )
+
+
+def make_mkv(title: str, padding: int) -> bytes:
+    header = ebml_element(
+        0x1A45DFA3,
+        ebml_element(0x4282, b"matroska")  # DocType
+        + ebml_element(0x4287, b"\x04")  # DocTypeVersion
+        + ebml_element(0x4285, b"\x02"),  # DocTypeReadVersion
+    )
+    info = ebml_element(
+        0x1549A966,
+        ebml_element(0x2AD7B1, (1_000_000).to_bytes(3, "big"))  # TimestampScale
+        + ebml_element(0x4D80, b"anime_rpc")  # MuxingApp
+        + ebml_element(0x5741, b"anime_rpc")  # WritingApp
+        + ebml_element(0x4489, struct.pack(">d", 1_440_000.0))  # Duration
+        + ebml_element(0x7BA9, title.encode()),  # Title
+    )
+    # like mkvmerge, leave a void element before the segment info
+    void = ebml_element(0xEC, b"\x00" * 4_000)
+    cluster = ebml_element(0x1F43B675, b"\x00" * padding)
+    return header + ebml_element(0x18538067, void + info + cluster)
+
+
+def mp4_atom(type_: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", len(payload) + 8, type_) + payload
+
+
+def make_mp4(title: str, padding: int) -> bytes:
+    ftyp = mp4_atom(b"ftyp", b"isom\x00\x00\x02\x00isomiso2mp41")
+    data = mp4_atom(b"data", b"\x00\x00\x00\x01\x00\x00\x00\x00" + title.encode())
+    hdlr = mp4_atom(b"hdlr", b"\x00" * 8 + b"mdirappl" + b"\x00" * 9)
+    meta = mp4_atom(
+        b"meta",
+        b"\x00\x00\x00\x00" + hdlr + mp4_atom(b"ilst", mp4_atom(b"\xa9nam", data)),
+    )
+    mvhd = mp4_atom(b"mvhd", b"\x00" * 100)
+    moov = mp4_atom(b"moov", mvhd + mp4_atom(b"udta", meta))
+    # moov at the end, as written by most muxers without faststart
+    return ftyp + mp4_atom(b"mdat", b"\x00" * padding) + moov
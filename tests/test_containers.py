@@ -0,0 +1,50 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from anime_rpc.containers import MAX_READ, ContainerError, read_title
+from tests.media_files import ebml_element, make_mkv, make_mp4
+
+TITLE = "Sousou no Frieren - 01 - The Journey's End"
+
+
+@pytest.mark.parametrize("make", [make_mkv, make_mp4])
+def test_read_title(tmp_path: Path, make: Callable[[str, int], bytes]) -> None:
+    path = tmp_path / "episode"
+    path.write_bytes(make(TITLE, 1024))
+    assert read_title(path) == TITLE
+
+
+def test_matroska_without_title(tmp_path: Path) -> None:
+    path = tmp_path / "episode.mkv"
+    path.write_bytes(make_mkv("", 1024))
+    assert read_title(path) == ""
+
+
+def test_matroska_info_past_first_read(tmp_path: Path) -> None:
+    info = ebml_element(0x1549A966, ebml_element(0x7BA9, TITLE.encode()))
+    void = ebml_element(0xEC, b"\x00" * MAX_READ)
+    seek = ebml_element(
+        0x4DBB,
+        ebml_element(0x53AB, (0x1549A966).to_bytes(4, "big"))
+        + ebml_element(0x53AC, (0).to_bytes(8, "big")),
+    )
+    seek_head = ebml_element(0x114D9B74, seek)
+    seek_position = len(seek_head) + len(void)
+    seek = seek.replace((0).to_bytes(8, "big"), seek_position.to_bytes(8, "big"))
+    seek_head = ebml_element(0x114D9B74, seek)
+
+    path = tmp_path / "episode.mkv"
+    path.write_bytes(
+        ebml_element(0x1A45DFA3, ebml_element(0x4282, b"matroska"))
+        + ebml_element(0x18538067, seek_head + void + info)
+    )
+    assert read_title(path) == TITLE
+
+
+def test_unsupported_container(tmp_path: Path) -> None:
+    path = tmp_path / "episode.avi"
+    path.write_bytes(b"RIFF\x00\x00\x00\x00AVI LIST")
+    with pytest.raises(ContainerError):
+        read_title(path)
@@ -0,0 +1,157 @@
+import asyncio
+from typing import Any, cast
+
+import pytest
+
+from anime_rpc import enrichment
+from anime_rpc.enrichment import MetadataEnricher
+from anime_rpc.mailbox import Mailbox
+from anime_rpc.metadata_providers import BaseMetadataProvider
+from anime_rpc.states import State
+
+URL = "https://myanimelist.net/anime/52991"
+
+
+class SlowProvider:
+    name = "slow"
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    def extract_id(self, url: str) -> str | None:
+        return url.rsplit("/", 1)[-1]
+
+    async def update_episode_title_in(self, state: State) -> State:
+        return state
+
+    async def update_missing_metadata_in(self, state: State) -> State:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        state["title"] = "Sousou no Frieren"
+        return state
+
+
+def _make_enricher(
+    provider: SlowProvider, mailbox: Mailbox, *, stage_timeout: float = 1
+) -> MetadataEnricher:
+    providers = cast("dict[str, BaseMetadataProvider]", {"slow": provider})
+    return MetadataEnricher(
+        providers,
+        mailbox,
+        fetch_episode_titles=False,
+        stage_timeout=stage_timeout,
+        inline_grace=0.01,
+    )
+
+
+def test_publishes_before_slow_metadata() -> None:
+    async def run() -> tuple[Any, ...]:
+        mailbox = Mailbox()
+        provider = SlowProvider(delay=0.05)
+        enricher = _make_enricher(provider, mailbox)
+        state = State(origin="mpv", url=URL, episode="1")
+        mailbox.put(state)
+        mailbox.arbitrate("")
+
+        first = await enricher.enrich(state)
+        # the follow-up is delivered through the mailbox
+        await asyncio.wait_for(mailbox.wait(), timeout=1)
+        redelivered, _ = mailbox.arbitrate("mpv")
+        assert redelivered is not None
+        second = await enricher.enrich(redelivered)
+        await enricher.close()
+        return first, second, provider.calls
+
+    first, second, calls = asyncio.run(run())
+    assert "title" not in first
+    assert second["title"] == "Sousou no Frieren"
+    assert calls == 1
+
+
+def test_slow_provider_times_out() -> None:
+    async def run() -> tuple[State, int]:
+        mailbox = Mailbox()
+        provider = SlowProvider(delay=10)
+        enricher = _make_enricher(provider, mailbox, stage_timeout=0.02)
+        state = State(origin="mpv", url=URL, episode="1")
+
+        await enricher.enrich(state)
+        await asyncio.sleep(0.05)
+        # a failed provider isn't hammered on every tick
+        result = await enricher.enrich(state)
+        await enricher.close()
+        return result, provider.calls
+
+    result, calls = asyncio.run(run())
+    assert "title" not in result
+    assert calls == 1
+
+
+def test_metadata_cache_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(enrichment, "MAX_CACHED_METADATA", 2)
+
+    async def run() -> int:
+        provider = SlowProvider(delay=0)
+        enricher = _make_enricher(provider, Mailbox())
+        for url in (f"{URL}1", f"{URL}2", f"{URL}1", f"{URL}3"):
+            state = await enricher.enrich(State(origin="mpv", url=url, episode="1"))
+            assert state["title"] == "Sousou no Frieren"
+
+        # the least recently used one was evicted, the others are still there
+        for url in (f"{URL}1", f"{URL}3", f"{URL}2"):
+            await enricher.enrich(State(origin="mpv", url=url, episode="1"))
+
+        await enricher.close()
+        return provider.calls
+
+    assert asyncio.run(run()) == 4
+
+
+class SharedStateProvider(SlowProvider):
+    """Like the caching providers, keeps the current query on itself."""
+
+    def __init__(self, delay: float) -> None:
+        super().__init__(delay)
+        self._url = ""
+        self.overlapped = False
+
+    async def update_missing_metadata_in(self, state: State) -> State:
+        self.overlapped |= bool(self._url)
+        self._url = state["url"]
+        await asyncio.sleep(self.delay)
+        state["title"] = self._url.rsplit("/", 1)[-1]
+        self._url = ""
+        return state
+
+
+def test_provider_calls_dont_overlap() -> None:
+    async def run() -> tuple[list[str], bool]:
+        provider = SharedStateProvider(delay=0.02)
+        enricher = _make_enricher(provider, Mailbox())
+        urls = [f"{URL}1", f"{URL}2"]
+        for url in urls:
+            await enricher.enrich(State(origin="mpv", url=url, episode="1"))
+
+        await asyncio.sleep(0.1)
+        titles = [enricher.apply(State(url=url, episode="1"))["title"] for url in urls]
+        await enricher.close()
+        return titles, provider.overlapped
+
+    titles, overlapped = asyncio.run(run())
+    assert titles == ["529911", "529912"]
+    assert not overlapped
+
+
+def test_timed_out_call_finishes_before_the_next() -> None:
+    async def run() -> bool:
+        provider = SharedStateProvider(delay=0.05)
+        enricher = _make_enricher(provider, Mailbox(), stage_timeout=0.02)
+        for url in (f"{URL}1", f"{URL}2"):
+            await enricher.enrich(State(origin="mpv", url=url, episode="1"))
+
+        await asyncio.sleep(0.2)
+        await enricher.close()
+        return provider.overlapped
+
+    assert not asyncio.run(run())
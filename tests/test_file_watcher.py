@@ -0,0 +1,96 @@
+import threading
+import time
+from io import TextIOWrapper
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from anime_rpc import file_watcher
+from anime_rpc.file_watcher import DELETED, MODIFIED, EventHandler
+
+
+class FakeSubscription:
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self.items: list[str | None] = []
+        self.received = threading.Event()
+
+    @staticmethod
+    def parser(f: TextIOWrapper) -> str:
+        return f.read()
+
+    def put(self, item: str | None, threaded: bool = False) -> None:
+        self.items.append(item)
+        self.received.set()
+
+
+class FakeManager:
+    def __init__(self) -> None:
+        self.subscriptions: dict[Path, set[Any]] = {}
+
+
+@pytest.fixture
+def watched(tmp_path: Path) -> tuple[FakeManager, FakeSubscription]:
+    path = tmp_path / ".rpc"
+    path.write_text("")
+    subscription = FakeSubscription(path)
+    manager = FakeManager()
+    manager.subscriptions[path] = {subscription}
+    return manager, subscription
+
+
+def test_bursts_are_dispatched_once(
+    watched: tuple[FakeManager, FakeSubscription],
+) -> None:
+    manager, subscription = watched
+    handler = EventHandler(manager, debounce=0.05)  # type: ignore
+    handler.start()
+
+    try:
+        start = time.perf_counter()
+        for content in ("a", "ab", "abc"):
+            subscription.file_path.write_text(content)
+            handler.put(subscription.file_path, MODIFIED)
+
+        assert subscription.received.wait(1)
+        latency = time.perf_counter() - start
+        time.sleep(0.1)
+    finally:
+        handler.stop()
+
+    assert subscription.items == ["abc"]
+    assert latency < 0.5
+
+
+def test_latest_event_wins(watched: tuple[FakeManager, FakeSubscription]) -> None:
+    manager, subscription = watched
+    handler = EventHandler(manager, debounce=0.01)  # type: ignore
+    handler.start()
+
+    try:
+        handler.put(subscription.file_path, MODIFIED)
+        handler.put(subscription.file_path, DELETED)
+        assert subscription.received.wait(1)
+    finally:
+        handler.stop()
+
+    assert subscription.items == [None]
+
+
+def test_debounce_is_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(file_watcher, "perf_counter", lambda: now[0])
+    handler = EventHandler(FakeManager(), debounce=0.1, max_debounce=0.25)  # type: ignore
+    path = Path("a")
+
+    handler.put(path, MODIFIED)
+    assert handler.pending[path].due == pytest.approx(0.1)
+
+    # an editor that keeps writing still gets its change through
+    for now[0] in (0.05, 0.1, 0.15, 0.2):
+        handler.put(path, MODIFIED)
+    assert handler.pending[path].due == pytest.approx(0.25)
+
+    handler.discard(path)
+    assert not handler.pending
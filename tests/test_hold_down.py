@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import suppress
+
+import pytest
+
+from anime_rpc.asyncio_helper import Bail
+from anime_rpc.cli import CLI_ARGS
+from anime_rpc.loopback import LoopbackClient
+from anime_rpc.mailbox import Mailbox
+from anime_rpc.main import consumer_loop
+from anime_rpc.states import State, WatchingState
+
+PLAYING = State(
+    origin="mpv",
+    title="Sousou no Frieren",
+    episode="1",
+    position=60_000,
+    duration=1_440_000,
+    rewatching=False,
+    watching_state=WatchingState.PLAYING,
+)
+
+
+def _run(states: list[tuple[float, State]]) -> list[str]:
+    client = LoopbackClient(latency=0)
+
+    async def run() -> None:
+        mailbox = Mailbox()
+        event = asyncio.Event()
+        consumer = asyncio.create_task(consumer_loop(event, mailbox, {}, client))
+        for delay, state in states:
+            await asyncio.sleep(delay)
+            mailbox.put(State(**state))
+
+        # let the last state through before shutting down
+        await asyncio.sleep(0.02)
+        event.set()
+        with suppress(Bail):
+            await consumer
+
+    client.start()
+    try:
+        asyncio.run(run())
+    finally:
+        client.stop()
+
+    return [c.method for c in client.calls if c.method != "set_application_id"]
+
+
+@pytest.fixture(autouse=True)
+def hold_down(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(CLI_ARGS, "clear_hold_down", 100)
+
+
+def test_transient_empty_state_doesnt_clear() -> None:
+    methods = _run(
+        [
+            (0, PLAYING),
+            (0.02, State(origin="mpv")),
+            (0.02, PLAYING),
+            (0.2, PLAYING),
+        ]
+    )
+    assert methods == ["set_activity"]
+
+
+def test_clear_after_hold_down() -> None:
+    methods = _run([(0, PLAYING), (0.02, State(origin="mpv")), (0.2, PLAYING)])
+    assert methods == ["set_activity", "clear_activity", "set_activity"]
+
+
+def test_stop_clears_right_away() -> None:
+    stopped = State({**PLAYING, "watching_state": WatchingState.STOPPED})
+    methods = _run([(0, PLAYING), (0.02, stopped), (0.05, PLAYING)])
+    assert methods == ["set_activity", "clear_activity", "set_activity"]
+
+
+def test_invalid_state_isnt_replayed_over_the_hold() -> None:
+    untitled = State({k: v for k, v in PLAYING.items() if k != "title"})
+    methods = _run([(0, PLAYING), (0.02, untitled), (0.6, untitled)])
+    assert methods == ["set_activity", "clear_activity"]
+
+
+def test_player_exit_clears_right_away() -> None:
+    exited = State(origin="mpv", stopped=True)
+    methods = _run([(0, PLAYING), (0.02, exited), (0.05, PLAYING)])
+    assert methods == ["set_activity", "clear_activity", "set_activity"]
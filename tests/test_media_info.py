@@ -0,0 +1,77 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from anime_rpc import media_info
+from anime_rpc.media_info import MediaTitleCache
+
+
+@pytest.fixture
+def files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    monkeypatch.setattr(media_info, "parse_title", lambda path: path.stem.title())
+    paths = [tmp_path / f"episode {i}.mkv" for i in range(3)]
+    for path in paths:
+        path.write_bytes(b"")
+
+    return paths
+
+
+def test_playing_file_isnt_stat_every_poll(
+    files: list[Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stats: list[Path] = []
+    get_cache_key = media_info._get_cache_key  # type: ignore[reportPrivateUsage]
+
+    def counting_get_cache_key(path: Path) -> media_info.CacheKey:
+        stats.append(path)
+        return get_cache_key(path)
+
+    monkeypatch.setattr(media_info, "_get_cache_key", counting_get_cache_key)
+    now = [0.0]
+    monkeypatch.setattr(media_info, "perf_counter", lambda: now[0])
+    cache = MediaTitleCache(files[0].parent / "titles.json", recheck_interval=10)
+
+    async def run() -> list[str]:
+        titles = [await cache.get(files[0]) for _ in range(3)]
+        now[0] = 11
+        titles.append(await cache.get(files[0]))
+        await cache.flush()
+        return titles
+
+    assert asyncio.run(run()) == ["Episode 0"] * 4
+    assert stats == [files[0]] * 2
+
+
+def test_new_titles_are_saved_together(
+    files: list[Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    saves: list[int] = []
+    save = MediaTitleCache._save  # type: ignore[reportPrivateUsage]
+
+    def counting_save(self: MediaTitleCache, entries: dict[str, str]) -> None:
+        saves.append(len(entries))
+        save(self, entries)
+
+    monkeypatch.setattr(MediaTitleCache, "_save", counting_save)
+    path = files[0].parent / "titles.json"
+    cache = MediaTitleCache(path, save_delay=0.05)
+
+    async def run() -> None:
+        for file in files[:2]:
+            await cache.get(file)
+
+        await asyncio.sleep(0.1)
+        await cache.get(files[2])
+        # whatever's left is saved on shutdown
+        await cache.flush()
+        await cache.flush()
+
+    asyncio.run(run())
+    assert saves == [2, 3]
+    assert sorted(json.loads(path.read_text()).values()) == [
+        "Episode 0",
+        "Episode 1",
+        "Episode 2",
+    ]
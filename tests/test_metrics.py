@@ -0,0 +1,62 @@
+import pytest
+
+from anime_rpc.metrics import Counter, Histogram, Registry
+
+
+def test_render_prometheus_text(monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = Registry()
+    monkeypatch.setattr("anime_rpc.metrics.REGISTRY", registry)
+
+    histogram = Histogram(
+        "stage_seconds", "Stage latency.", ("stage",), buckets=(0.1, 1)
+    )
+    histogram.observe(0.05, stage="poll")
+    histogram.observe(0.5, stage="poll")
+    histogram.observe(2, stage="poll")
+    counter = Counter("updates_total", "Updates.", ("result",))
+    counter.inc(result="sent")
+    counter.inc(result="sent")
+
+    assert registry.render().splitlines() == [
+        "# HELP stage_seconds Stage latency.",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="poll",le="0.1"} 1',
+        'stage_seconds_bucket{stage="poll",le="1"} 2',
+        'stage_seconds_bucket{stage="poll",le="+Inf"} 3',
+        'stage_seconds_sum{stage="poll"} 2.55',
+        'stage_seconds_count{stage="poll"} 3',
+        "# HELP updates_total Updates.",
+        "# TYPE updates_total counter",
+        'updates_total{result="sent"} 2',
+    ]
+
+
+def test_labels_must_match(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("anime_rpc.metrics.REGISTRY", Registry())
+    counter = Counter("calls_total", "Calls.", ("provider",))
+
+    with pytest.raises(ValueError):
+        counter.inc(kind="metadata")
+
+
+def test_render_snapshots_the_samples(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("anime_rpc.metrics.REGISTRY", Registry())
+    counter = Counter("calls_total", "Calls.", ("provider",))
+    histogram = Histogram("call_seconds", "Calls.", ("provider",), buckets=(1,))
+    counter.inc(provider="anilist")
+    histogram.observe(0.5, provider="anilist")
+
+    # as if other threads got in while the registry is being rendered
+    counter_lines = counter.render()
+    histogram_lines = histogram.render()
+    next(counter_lines), next(counter_lines), next(counter_lines)
+    next(histogram_lines), next(histogram_lines), next(histogram_lines)
+    counter.inc(provider="myanimelist")
+    histogram.observe(2, provider="myanimelist")
+
+    assert list(counter_lines) == []
+    assert list(histogram_lines) == [
+        'call_seconds_bucket{provider="anilist",le="+Inf"} 1',
+        'call_seconds_sum{provider="anilist"} 0.5',
+        'call_seconds_count{provider="anilist"} 1',
+    ]
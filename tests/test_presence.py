@@ -0,0 +1,88 @@
+import asyncio
+
+from anime_rpc.loopback import LoopbackClient
+from anime_rpc.presence import Presence, UpdateFlag
+from anime_rpc.states import State, WatchingState
+
+PLAYING = State(
+    origin="mpv",
+    title="Sousou no Frieren",
+    episode="1",
+    position=60_000,
+    duration=1_440_000,
+    rewatching=False,
+    watching_state=WatchingState.PLAYING,
+)
+
+
+def test_update_through_loopback() -> None:
+    client = LoopbackClient(latency=0.01)
+
+    async def run() -> None:
+        presence = Presence(client)
+        last_state = await presence.update(PLAYING, State(), flags=UpdateFlag(0))
+        # identical states are suppressed
+        last_state = await presence.update(PLAYING, last_state, flags=UpdateFlag(0))
+        await presence.update(State(), last_state, flags=UpdateFlag(0))
+
+    client.start()
+    try:
+        asyncio.run(run())
+    finally:
+        client.stop()
+
+    assert [c.method for c in client.calls] == [
+        "set_application_id",
+        "set_activity",
+        "clear_activity",
+    ]
+    activity = client.calls[1].args
+    assert activity["details"] == "Sousou no Frieren"
+    assert activity["end"] - activity["start"] == 1_440
+
+
+def test_loopback_failures_and_reconnects() -> None:
+    client = LoopbackClient(latency=0)
+
+    async def run() -> list[bool]:
+        loop = asyncio.get_running_loop()
+        results: list[bool] = []
+        for succeed in (False, True):
+            client.failure_rate = 0 if succeed else 1
+            future: asyncio.Future[bool] = loop.create_future()
+            client.set_activity("Episode 1", "Sousou no Frieren", future=future)
+            results.append(await asyncio.wait_for(future, timeout=1))
+
+        return results
+
+    client.start()
+    try:
+        assert asyncio.run(run()) == [False, True]
+        client.disconnect()
+        client.reconnect()
+    finally:
+        client.stop()
+
+    # the current activity is restored on reconnect
+    assert client.activities()[-1] == client.activities()[-2]
+
+
+def test_update_waits_for_the_ack_unless_told_not_to() -> None:
+    client = LoopbackClient(latency=0.05)
+
+    async def run() -> list[bool]:
+        done: list[bool] = []
+        for wait_for_ack in (True, False):
+            presence = Presence(client, wait_for_ack=wait_for_ack)
+            await presence.update(PLAYING, State(), flags=UpdateFlag(0))
+            assert presence.last_update is not None
+            done.append(presence.last_update.done())
+            await presence.last_update
+
+        return done
+
+    client.start()
+    try:
+        assert asyncio.run(run()) == [True, False]
+    finally:
+        client.stop()
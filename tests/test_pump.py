@@ -0,0 +1,67 @@
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+
+from anime_rpc.pump import CallbackPump
+
+
+class Callbacks:
+    def __init__(self) -> None:
+        self.runs = 0
+
+    def __call__(self) -> None:
+        self.runs += 1
+
+
+@contextmanager
+def pumping(pump: CallbackPump) -> Generator[None]:
+    alive = True
+    thread = threading.Thread(target=pump.run, args=(lambda: alive,))
+    thread.start()
+    try:
+        yield
+    finally:
+        alive = False
+        pump.wake()
+        thread.join()
+
+
+def test_idle_pump_backs_off() -> None:
+    callbacks = Callbacks()
+    pump = CallbackPump(callbacks, busy_interval=0.001, idle_interval=0.1)
+
+    with pumping(pump):
+        time.sleep(0.35)
+
+    assert callbacks.runs <= 5
+
+
+def test_pump_runs_fast_while_in_flight() -> None:
+    callbacks = Callbacks()
+    pump = CallbackPump(callbacks, busy_interval=0.001, idle_interval=10)
+
+    with pumping(pump):
+        pump.begin()
+        time.sleep(0.1)
+        pump.done()
+        time.sleep(0.05)
+        runs = callbacks.runs
+
+        time.sleep(0.1)
+        assert callbacks.runs - runs <= 1
+
+    assert runs >= 20
+
+
+def test_wake_runs_callbacks_right_away() -> None:
+    callbacks = Callbacks()
+    pump = CallbackPump(callbacks, idle_interval=10)
+
+    with pumping(pump):
+        time.sleep(0.05)
+        assert callbacks.runs == 1
+
+        pump.wake()
+        time.sleep(0.05)
+        assert callbacks.runs == 2
@@ -0,0 +1,63 @@
+import asyncio
+
+from anime_rpc.loopback import LoopbackClient
+from anime_rpc.metrics import RATE_LIMITED
+from anime_rpc.rate_limit import RateLimitedClient
+
+
+def test_latest_update_wins_while_limited() -> None:
+    loopback = LoopbackClient(latency=0)
+    client = RateLimitedClient(loopback, burst=2, period=0.2)
+    coalesced = RATE_LIMITED.get(outcome="coalesced")
+    deferred = RATE_LIMITED.get(outcome="deferred")
+
+    async def run() -> list[bool]:
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[bool]] = []
+        for i in range(5):
+            future: asyncio.Future[bool] = loop.create_future()
+            client.set_application_id("anime")
+            client.set_activity(f"Episode {i}", "Sousou no Frieren", future=future)
+            futures.append(future)
+
+        # the first two go straight through
+        assert [a["state"] for a in loopback.activities()] == [
+            "Episode 0",
+            "Episode 1",
+        ]
+        return await asyncio.wait_for(asyncio.gather(*futures), timeout=1)
+
+    loopback.start()
+    try:
+        results = asyncio.run(run())
+    finally:
+        client.stop()
+
+    assert results == [True, True, False, False, True]
+    assert [a["state"] for a in loopback.activities()] == [
+        "Episode 0",
+        "Episode 1",
+        "Episode 4",
+    ]
+    assert RATE_LIMITED.get(outcome="coalesced") - coalesced == 2
+    # each held back update is counted once
+    assert RATE_LIMITED.get(outcome="deferred") - deferred == 1
+
+
+def test_clear_replaces_pending_update() -> None:
+    loopback = LoopbackClient(latency=0)
+    client = RateLimitedClient(loopback, burst=1, period=0.05)
+
+    async def run() -> None:
+        client.set_activity("Episode 1", "Sousou no Frieren")
+        client.set_activity("Episode 2", "Sousou no Frieren")
+        client.clear_activity()
+        await asyncio.sleep(0.1)
+
+    loopback.start()
+    try:
+        asyncio.run(run())
+    finally:
+        client.stop()
+
+    assert [c.method for c in loopback.calls] == ["set_activity", "clear_activity"]
@@ -0,0 +1,65 @@
+import pytest
+
+from anime_rpc import reconnect
+from anime_rpc.reconnect import Reconnector
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [0.0]
+    monkeypatch.setattr(reconnect, "perf_counter", lambda: now[0])
+    # always wait the full delay
+    monkeypatch.setattr(reconnect.random, "uniform", lambda _, b: b)  # type: ignore
+    return now
+
+
+def test_backoff_doubles_up_to_the_cap(clock: list[float]) -> None:
+    link = Reconnector(base=1.0, cap=4.0)
+    delays: list[float] = []
+
+    for _ in range(5):
+        link.disconnected(retry=True)
+        start = clock[0]
+        while not link.due():
+            clock[0] += 0.5
+        delays.append(clock[0] - start)
+
+    assert delays == [1.0, 2.0, 4.0, 4.0, 4.0]
+    assert link.attempts == 5
+
+
+def test_repeated_disconnects_keep_the_pending_retry(clock: list[float]) -> None:
+    link = Reconnector(base=1.0)
+    link.disconnected(retry=True)
+    clock[0] = 0.5
+    link.disconnected(retry=True)
+
+    assert link.attempts == 1
+    clock[0] = 1.0
+    assert link.due()
+    assert not link.due()
+
+
+def test_no_retry_without_asking(clock: list[float]) -> None:
+    link = Reconnector()
+    link.disconnected(retry=False)
+    clock[0] = 1_000
+
+    assert link.online is False
+    assert not link.due()
+
+
+def test_connected_reports_downtime(clock: list[float]) -> None:
+    link = Reconnector()
+    assert link.connected() is None
+
+    clock[0] = 10
+    link.disconnected(retry=True)
+    clock[0] = 12
+    link.disconnected(retry=True)
+    clock[0] = 15
+
+    assert link.connected() == 5
+    assert link.online
+    assert link.attempts == 0
+    assert not link.due()
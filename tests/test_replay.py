@@ -0,0 +1,61 @@
+import asyncio
+from pathlib import Path
+
+from anime_rpc.mailbox import Mailbox
+from anime_rpc.replay import StateRecorder, read_recording, replay_states
+from anime_rpc.states import State, WatchingState
+from anime_rpc.tracing import new_trace, stamp
+
+PLAYING = State(
+    origin="mpv",
+    title="Sousou no Frieren",
+    episode="1",
+    position=0,
+    duration=1_440_000,
+    watching_state=WatchingState.PLAYING,
+)
+
+
+def _record(path: Path, states: list[State]) -> None:
+    recorder = StateRecorder(path)
+    recorder.open()
+    mailbox = Mailbox(recorder)
+    for state in states:
+        new_trace()
+        mailbox.put(stamp(State(**state)))
+    recorder.close()
+
+
+def test_record_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "states.jsonl"
+    states = [PLAYING, State({**PLAYING, "position": 1_000}), State(origin="mpv")]
+    _record(path, states)
+
+    recorded = list(read_recording(path))
+    assert [state for _, state in recorded] == states
+    assert recorded[0][1].get("watching_state") is WatchingState.PLAYING
+    assert [t for t, _ in recorded] == sorted(t for t, _ in recorded)
+
+
+def test_fast_replay_doesnt_coalesce(tmp_path: Path) -> None:
+    path = tmp_path / "states.jsonl"
+    _record(path, [State({**PLAYING, "position": i * 1_000}) for i in range(50)])
+
+    async def run() -> list[int]:
+        mailbox = Mailbox()
+        event = asyncio.Event()
+        positions: list[int] = []
+
+        async def consume() -> None:
+            while True:
+                await mailbox.wait()
+                state, _ = mailbox.arbitrate("mpv")
+                assert state is not None
+                positions.append(state.get("position", -1))
+
+        consumer = asyncio.create_task(consume())
+        await replay_states(path, mailbox, event, fast=True)
+        consumer.cancel()
+        return positions
+
+    assert asyncio.run(run()) == [i * 1_000 for i in range(50)]
@@ -0,0 +1,327 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import cffi
+import pytest
+
+from anime_rpc import social_sdk
+from anime_rpc.discord_client import get_client
+from anime_rpc.social_sdk import Discord, DiscordPool
+
+Calls = list[tuple[str, dict[str, Any]]]
+
+
+@pytest.fixture
+def discord(monkeypatch: pytest.MonkeyPatch) -> tuple[Discord, Calls]:
+    discord = Discord()
+    calls: Calls = []
+
+    def record(name: str) -> Any:
+        return lambda *_, **kwargs: calls.append((name, kwargs))  # type: ignore
+
+    # pretend to be initialised, nothing below touches the SDK
+    discord.client = object()  # type: ignore
+    monkeypatch.setattr(discord, "_set_activity", record("set_activity"))
+    monkeypatch.setattr(discord, "_clear_activity", record("clear_activity"))
+    monkeypatch.setattr(discord, "_set_application_id", record("app"))
+    return discord, calls
+
+
+def test_commands_wait_for_the_sdk_thread(discord: tuple[Discord, Calls]) -> None:
+    client, calls = discord
+    client.set_application_id("anime")
+    client.set_activity("Episode 1", "Frieren")
+
+    assert calls == []
+    assert client.current_activity["details"] == "Frieren"
+
+    client._run_commands()  # type: ignore[reportPrivateUsage]
+    assert [name for name, _ in calls] == ["app", "set_activity"]
+
+
+def test_latest_activity_command_wins(discord: tuple[Discord, Calls]) -> None:
+    client, calls = discord
+
+    async def run() -> tuple[bool, bool]:
+        superseded: asyncio.Future[bool] = asyncio.Future()
+        client.set_activity("Episode 1", "Frieren", future=superseded)
+        client.clear_activity()
+        client.set_application_id("anime")
+        latest: asyncio.Future[bool] = asyncio.Future()
+        client.set_activity("Episode 2", "Frieren", future=latest)
+
+        client._run_commands()  # type: ignore[reportPrivateUsage]
+        return await superseded, latest.done()
+
+    superseded, latest_done = asyncio.run(run())
+
+    assert [name for name, _ in calls] == ["app", "set_activity"]
+    assert calls[1][1]["state"] == "Episode 2"
+    # resolved by the SDK callback, not by the batching
+    assert superseded is False
+    assert not latest_done
+
+
+def test_parsed_header_is_cached(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(social_sdk, "FFI_CACHE_DIR", tmp_path)
+    ffi = social_sdk.load_ffi()
+    assert [p.suffix for p in tmp_path.iterdir()] == [".py"]
+
+    def cdef(*_: Any) -> None:
+        raise AssertionError("header parsed again")
+
+    monkeypatch.setattr(cffi.FFI, "cdef", cdef)
+    cached = social_sdk.load_ffi()
+    assert cached.sizeof("Discord_String") == ffi.sizeof("Discord_String")
+
+
+def test_unchanged_strings_reuse_their_buffers() -> None:
+    strings = social_sdk.CStringCache(maxsize=2)
+    title = strings.get("Sousou no Frieren")
+
+    assert strings.get("Sousou no Frieren") is title
+    assert social_sdk.ffi.buffer(title.ptr, title.size)[:] == b"Sousou no Frieren"
+    assert strings.get("") == social_sdk.ffi.NULL
+
+    strings.get("Episode 1")
+    strings.get("Episode 2")
+    assert len(strings) == 2
+    assert strings.get("Sousou no Frieren") is not title
+
+
+def test_refresh_tokens_are_read_once(
+    monkeypatch: pytest.MonkeyPatch, discord: tuple[Discord, Calls]
+) -> None:
+    client, _ = discord
+    reads: list[str] = []
+    authorized: list[tuple[int, str | None]] = []
+
+    def get_password(service: str, key: str) -> str:
+        reads.append(key)
+        return "refresh"
+
+    monkeypatch.setattr(social_sdk.keyring, "get_password", get_password)
+    monkeypatch.setattr(client, "_authorize", lambda *args: authorized.append(args))
+
+    client._request_authorization(1)  # type: ignore[reportPrivateUsage]
+    client._keyring.shutdown()  # type: ignore[reportPrivateUsage]
+    client._run_commands()  # type: ignore[reportPrivateUsage]
+    client._request_authorization(1)  # type: ignore[reportPrivateUsage]
+
+    assert reads == ["refresh_token:1"]
+    assert authorized == [(1, "refresh"), (1, "refresh")]
+
+
+def test_access_token_is_refreshed_before_expiry(
+    monkeypatch: pytest.MonkeyPatch, discord: tuple[Discord, Calls]
+) -> None:
+    client, _ = discord
+    now = 100.0
+    refreshed: list[str] = []
+    monkeypatch.setattr(social_sdk, "perf_counter", lambda: now)
+    monkeypatch.setattr(client, "authorize_with_refresh_token", refreshed.append)
+    monkeypatch.setattr(social_sdk.keyring, "set_password", lambda *_: None)
+    client.last_application_id = 1  # type: ignore
+    client.save_refresh_token("refresh")
+
+    client.schedule_refresh(3_600)
+    now += 3_600 - social_sdk.TOKEN_REFRESH_MARGIN - 1
+    client._check_refresh()  # type: ignore[reportPrivateUsage]
+    assert refreshed == []
+
+    now += 1
+    client._check_refresh()  # type: ignore[reportPrivateUsage]
+    client._check_refresh()  # type: ignore[reportPrivateUsage]
+    assert refreshed == ["refresh"]
+
+
+def test_pool_switches_without_reauthorising(tmp_path: Path) -> None:
+    pool = DiscordPool(2, history_path=tmp_path / "ids.json")
+
+    pool.set_application_id(1)
+    first = pool._active  # type: ignore[reportPrivateUsage]
+    pool.set_activity("Episode 1", "Frieren")
+    pool.set_application_id(2)
+    pool.set_application_id(1)
+
+    # the same client again, with its old activity cleared when switching away
+    assert pool._active is first  # type: ignore[reportPrivateUsage]
+    assert first is not None
+    commands = first._commands  # type: ignore[reportPrivateUsage]
+    assert [c.name for c in commands] == ["set_activity", "clear_activity"]
+
+    # the least recently used one goes
+    pool.set_application_id(3)
+    assert list(pool._clients) == [1, 3]  # type: ignore[reportPrivateUsage]
+
+    pool._save_history()  # type: ignore[reportPrivateUsage]
+    warm = DiscordPool(2, history_path=tmp_path / "ids.json")
+    assert warm._load_history() == [3, 1]  # type: ignore[reportPrivateUsage]
+
+
+def test_latest_activity_is_replayed_after_reconnecting(
+    discord: tuple[Discord, Calls],
+) -> None:
+    client, calls = discord
+    client.on_connected()
+    client.on_disconnected()
+
+    async def run() -> tuple[bool, asyncio.Future[bool]]:
+        superseded: asyncio.Future[bool] = asyncio.Future()
+        client.set_activity("Episode 1", "Frieren", future=superseded)
+        client._run_commands()  # type: ignore[reportPrivateUsage]
+        latest: asyncio.Future[bool] = asyncio.Future()
+        client.set_activity("Episode 2", "Frieren", future=latest)
+        client._run_commands()  # type: ignore[reportPrivateUsage]
+        return await superseded, latest
+
+    superseded, latest = asyncio.run(run())
+    assert superseded is False
+    assert calls == []
+
+    client.on_connected()
+    client.on_connected()
+    assert len(calls) == 1
+    assert calls[0][1]["state"] == "Episode 2"
+    # left for the SDK callback to resolve
+    assert calls[0][1]["future"] is latest
+    assert not latest.done()
+
+
+def test_rejected_update_keeps_the_link(
+    discord: tuple[Discord, Calls], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client, _ = discord
+    client.on_connected()
+    errors = {
+        "Discord_ErrorType_NetworkError": 1,
+        "Discord_ErrorType_ClientNotReady": 3,
+    }
+    error_type = 6  # Discord_ErrorType_ValidationError
+    monkeypatch.setattr(
+        social_sdk,
+        "C",
+        SimpleNamespace(
+            Discord_ClientResult_Successful=lambda _: False,
+            Discord_ClientResult_Type=lambda _: error_type,
+            Discord_ClientResult_Error=None,
+            **errors,
+        ),
+    )
+    monkeypatch.setattr(social_sdk, "_handle_discord_error", lambda *_: None)
+
+    def fail_update() -> None:
+        key = next(social_sdk._update_keys)  # type: ignore[reportPrivateUsage]
+        social_sdk._PENDING_UPDATES[key] = client, None  # type: ignore[reportPrivateUsage]
+        social_sdk._update_presence_callback(  # type: ignore[reportPrivateUsage]
+            social_sdk.ffi.NULL, social_sdk.ffi.cast("void *", key)
+        )
+
+    fail_update()
+    assert client.link.online
+
+    error_type = errors["Discord_ErrorType_NetworkError"]
+    fail_update()
+    assert client.link.online is False
+
+
+def test_rpc_reconnects_by_restoring_the_activity(
+    discord: tuple[Discord, Calls], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client, calls = discord
+    monkeypatch.setattr(client, "_sync_log_severity", lambda: None)
+    monkeypatch.setattr(client.link, "due", lambda: True)
+    client.set_activity("Episode 1", "Frieren")
+    client.on_disconnected()
+
+    # the update going through is how the connection is known to be back
+    client._step()  # type: ignore[reportPrivateUsage]
+    assert [c[1]["state"] for c in calls] == ["Episode 1"]
+
+    # anything that came in while that was in flight is restored too
+    client.set_activity("Episode 2", "Frieren")
+    client._run_commands()  # type: ignore[reportPrivateUsage]
+    client.on_connected(restore=False)
+    assert [c[1]["state"] for c in calls] == ["Episode 1", "Episode 2"]
+    assert client.link.online
+
+
+def test_log_severity_follows_the_logger(
+    discord: tuple[Discord, Calls], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client, _ = discord
+    registered: list[int] = []
+
+    class FakeC:
+        @staticmethod
+        def Discord_Client_AddLogCallback(*args: Any) -> None:
+            registered.append(args[-1])
+
+    monkeypatch.setattr(social_sdk, "C", FakeC)
+    monkeypatch.setattr(social_sdk.CLI_ARGS, "use_oauth2", False)
+    logger = social_sdk._LOGGER  # type: ignore[reportPrivateUsage]
+    monkeypatch.setattr(logger, "level", logger.level)
+
+    logger.setLevel("WARNING")
+    client._sync_log_severity()  # type: ignore[reportPrivateUsage]
+    logger.setLevel("ERROR")
+    client._sync_log_severity()  # type: ignore[reportPrivateUsage]
+    assert client.log_severity == social_sdk.LoggingSeverity.ERROR
+
+    # raising it is up to the callback, lowering it registers the gap
+    logger.setLevel("DEBUG")
+    client._sync_log_severity()  # type: ignore[reportPrivateUsage]
+    logger.setLevel("INFO")
+    client._sync_log_severity()  # type: ignore[reportPrivateUsage]
+    assert registered == [3, 1]
+    assert client.log_severity == social_sdk.LoggingSeverity.INFO
+
+
+def test_log_lines_below_logging_go_to_the_buffer(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    sdk_log = social_sdk.SDKLog(size=2)
+    monkeypatch.setattr(social_sdk, "SDK_LOG", sdk_log)
+
+    class Instance:
+        log_severity = social_sdk.LoggingSeverity.VERBOSE
+
+    instance = Instance()
+    handle = social_sdk.ffi.new_handle((instance, social_sdk.LoggingSeverity.NONE))
+    buffers: list[Any] = []
+
+    def log(message: str, severity: int) -> None:
+        buffers.append(buf := social_sdk.ffi.new("char[]", message.encode()))
+        string = social_sdk.ffi.new("Discord_String *")
+        string.ptr, string.size = buf, len(message)  # type: ignore
+        social_sdk._log_callback(string[0], severity, handle)  # type: ignore[reportPrivateUsage]
+
+    with caplog.at_level("INFO", logger="social_sdk"):
+        for i in range(3):
+            log(f"verbose {i}", 1)
+        log("info", 2)
+        assert len(sdk_log) == 2
+        assert not caplog.records
+
+        # raised at runtime, the SDK still calls back for these
+        instance.log_severity = social_sdk.LoggingSeverity.INFO
+        log("verbose 3", 1)
+        assert len(sdk_log) == 2
+
+        log("boom", 4)
+
+    assert len(sdk_log) == 0
+    dump, error = caplog.records
+    assert "verbose 2" in dump.getMessage() and "verbose 0" not in dump.getMessage()
+    assert error.getMessage() == "Log callback: boom"
+
+
+def test_pool_is_opt_in() -> None:
+    assert social_sdk.CLI_ARGS.discord_pool_size == 1
+    assert type(get_client("sdk")) is Discord
+    assert type(get_client("sdk", pool_size=1)) is Discord
+    assert type(get_client("sdk", pool_size=3)) is DiscordPool
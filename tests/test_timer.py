@@ -0,0 +1,158 @@
+import pytest
+
+from anime_rpc import timer
+from anime_rpc.presence import UpdateFlag
+from anime_rpc.states import State, WatchingState
+from anime_rpc.timer import Timer
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(timer, "perf_counter", clock)
+    monkeypatch.setattr(timer.CLI_ARGS, "periodic_forced_updates", False)
+    monkeypatch.setattr(timer.CLI_ARGS, "seek_settle", 1_000)
+    return clock
+
+
+def playing(position: int) -> State:
+    return State(origin="mpv", position=position, watching_state=WatchingState.PLAYING)
+
+
+def feed(t: Timer, clock: Clock, samples: list[tuple[float, int]]) -> list[bool]:
+    seeks: list[bool] = []
+    for at, position in samples:
+        clock.now = 100.0 + at
+        seeks.append(UpdateFlag.SEEKING in t.tick(playing(position), UpdateFlag(0)))
+
+    return seeks
+
+
+def test_single_seek_is_immediate(clock: Clock) -> None:
+    t = Timer()
+    seeks = feed(t, clock, [(0, 0), (1, 1_000), (2, 600_000), (3, 601_000)])
+    assert seeks == [False, False, True, False]
+
+
+def test_scrub_is_coalesced(clock: Clock) -> None:
+    t = Timer()
+    samples = [
+        (0.0, 0),
+        # the user drags the seek bar, one jump per poll
+        (0.25, 100_000),
+        (0.5, 200_000),
+        (0.75, 300_000),
+        (1.0, 400_000),
+        # and lets go
+        (1.5, 400_500),
+        (2.0, 401_000),
+        (2.5, 401_500),
+        (3.0, 402_000),
+    ]
+    seeks = feed(t, clock, samples)
+    # the first jump goes through, then one more once it settles
+    assert seeks == [False, True, False, False, False, False, True, False, False]
+
+
+def rates(t: Timer, clock: Clock, samples: list[tuple[float, int]]) -> list[bool]:
+    sped_up: list[bool] = []
+    for at, position in samples:
+        clock.now = 100.0 + at
+        sped_up.append(UpdateFlag.SPED_UP in t.tick(playing(position), UpdateFlag(0)))
+
+    return sped_up
+
+
+def stream(rate: float, seconds: int, *, start: int = 0) -> list[tuple[float, int]]:
+    return [(start + s, round((start + s * rate) * 1_000)) for s in range(seconds)]
+
+
+@pytest.mark.parametrize("rate", [1.0, 1.5, 2.0])
+def test_rate_is_estimated(clock: Clock, rate: float) -> None:
+    t = Timer()
+    sped_up = rates(t, clock, stream(rate, 10))
+
+    assert t.rate == pytest.approx(rate)
+    # normal playback never resyncs, anything else only once
+    assert sum(sped_up) == (rate != 1.0)
+    assert t.predicted_position(109.5) == round(9.5 * rate * 1_000)
+
+
+def test_rate_change_mid_stream(clock: Clock) -> None:
+    t = Timer()
+    samples = stream(1.0, 10) + [(10 + s, 10_000 + s * 2_000) for s in range(10)]
+    sped_up = rates(t, clock, samples)
+
+    assert sum(sped_up) == 1
+    assert t.rate == pytest.approx(2.0)
+
+
+def test_jitter_is_not_a_rate_change(clock: Clock) -> None:
+    t = Timer()
+    jitter = [0, 40, -30, 20, -40, 10, 30, -20, 0, 40] * 3
+    samples = [(s, s * 1_000 + j) for s, j in enumerate(jitter)]
+
+    assert not any(rates(t, clock, samples))
+    assert t.rate == pytest.approx(1.0, abs=0.02)
+
+
+def test_slow_polls_at_high_rate(clock: Clock) -> None:
+    t = Timer()
+    samples = [(s * 5, s * 10_000) for s in range(6)]
+    seeks = feed(t, clock, samples)
+
+    # the first poll can't tell a 2x stream from a seek, the rest can
+    assert seeks == [False, True, False, False, False, False]
+    assert t.rate == pytest.approx(2.0)
+
+
+def test_replayed_state_is_not_a_sample(clock: Clock) -> None:
+    t = Timer()
+    rates(t, clock, stream(1.5, 5))
+
+    # the consumer replays the last state when nothing new comes in
+    state = playing(6_000)
+    state["captured_at"] = 104.0
+    clock.now = 105.0
+    t.tick(state, UpdateFlag(0))
+    clock.now = 106.0
+    flags = t.tick(state, UpdateFlag(0))
+
+    assert not flags
+    assert t.rate == pytest.approx(1.5)
+    assert t.predicted_position() == 9_000
+
+
+def test_slow_polls_seek_is_not_a_rate_change(clock: Clock) -> None:
+    t = Timer()
+    samples = [(0, 0), (5, 5_000), (10, 20_000), (15, 25_000), (20, 30_000)]
+    seeks = feed(t, clock, samples)
+
+    assert seeks == [False, False, True, False, False]
+    assert t.rate == pytest.approx(1.0)
+
+
+def test_scrub_settles_without_new_samples(clock: Clock) -> None:
+    t = Timer()
+    feed(t, clock, [(0.0, 0), (0.25, 100_000), (0.5, 200_000)])
+
+    # an observing poller posts nothing once the position stays put
+    assert t.timeout(None) == pytest.approx(1.0)
+    assert t.timeout(0.5) == pytest.approx(0.5)
+
+    # so the consumer wakes up and replays the last state
+    state = playing(200_000)
+    clock.now = 101.5
+    state["captured_at"] = 100.5
+    flags = t.tick(state, UpdateFlag(0))
+
+    assert UpdateFlag.SEEKING in flags
+    assert t.timeout(None) is None
@@ -0,0 +1,39 @@
+import json
+from pathlib import Path
+
+from anime_rpc.mailbox import is_empty_state
+from anime_rpc.states import State, compare_states
+from anime_rpc.tracing import Tracer, new_trace, stamp
+
+
+def test_trace_file_is_chrome_trace(tmp_path: Path) -> None:
+    tracer = Tracer()
+    path = tmp_path / "trace.json"
+    tracer.open(path)
+
+    trace_id, _ = new_trace()
+    state = stamp(State(origin="mpv"))
+    with tracer.span("get_vars", state):
+        pass
+    tracer.record_since_last("queue", state)
+    # untraced states are skipped
+    tracer.record("render", State(origin="web"), 0)
+    tracer.close()
+
+    # the closing bracket is optional for trace viewers
+    events = json.loads(path.read_text().rstrip().rstrip(",") + "]")
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [s["name"] for s in spans] == ["get_vars", "queue"]
+    assert all(s["args"]["trace_id"] == trace_id for s in spans)
+    # the queue span starts where the previous hop ended
+    assert spans[1]["ts"] >= spans[0]["ts"] + spans[0]["dur"] - 0.1
+
+
+def test_trace_keys_dont_affect_states() -> None:
+    new_trace()
+    assert is_empty_state(stamp(State(origin="mpv")))
+    a = stamp(State(origin="mpv", title="Frieren"))
+    new_trace()
+    b = stamp(State(origin="mpv", title="Frieren"))
+    assert a.get("trace_id") != b.get("trace_id")
+    assert compare_states(a, b)